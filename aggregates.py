@@ -0,0 +1,291 @@
+import copy
+import time
+import threading
+from collections import namedtuple
+import numpy as np
+import pandas as pd
+
+
+class CountryRollup:
+    """Country x day totals stored as cumulative sums, so any date range is two lookups."""
+
+    MEASURES = ['totalprice', 'total_orders', 'unique_customers']
+
+    def __init__(self, data):
+        self.columns = self.MEASURES + ['rows']
+        self.days = pd.DatetimeIndex([])
+        self.countries = pd.Index([])
+        self.cube = np.zeros((0, 0, len(self.columns)))
+        self.add(data)
+
+    def add(self, data):
+        """Fold rows into the totals; days and countries not seen before get their own cells."""
+        daily = data.groupby(['date', 'country'])[self.MEASURES].sum()
+        daily['rows'] = data.groupby(['date', 'country']).size()
+        days = self.days.union(daily.index.get_level_values('date').unique())
+        countries = self.countries.union(daily.index.get_level_values('country').unique())
+
+        # Dense day x country x measure cube, re-laid on the wider axes when new keys arrive
+        cube = np.zeros((len(days), len(countries), len(self.columns)))
+        cube[np.ix_(days.get_indexer(self.days), countries.get_indexer(self.countries))] = self.cube
+        day_index = days.get_indexer(daily.index.get_level_values('date'))
+        country_index = countries.get_indexer(daily.index.get_level_values('country'))
+        cube[day_index, country_index] += daily[self.columns].to_numpy(dtype=float)
+
+        self.days, self.countries, self.cube = days, countries, cube
+        # Leading row of zeros for empty prefixes
+        self.cumulative = np.concatenate([np.zeros((1,) + cube.shape[1:]), cube.cumsum(axis=0)])
+        return self
+
+    def totals(self, start, end):
+        """Per-country revenue, orders, customers and average order value for start..end inclusive."""
+        first = self.days.searchsorted(pd.Timestamp(start), side='left')
+        last = self.days.searchsorted(pd.Timestamp(end), side='right')
+        window = self.cumulative[last] - self.cumulative[first]
+
+        metrics = pd.DataFrame(window, columns=self.columns)
+        metrics.insert(0, 'country', self.countries)
+        # Keep only countries that actually traded in the range, as a groupby would
+        metrics = metrics[metrics['rows'] > 0].drop(columns='rows').reset_index(drop=True)
+
+        metrics[['total_orders', 'unique_customers']] = metrics[['total_orders', 'unique_customers']].round().astype(int)
+        metrics['avg_order_value'] = metrics['totalprice'] / metrics['total_orders']
+        return metrics
+
+
+def _revenue_by(keys, revenue):
+    """Sum revenue per distinct key in a single vectorised pass (NaN keys are dropped)."""
+    codes, uniques = pd.factorize(keys)
+    valid = codes >= 0
+    totals = np.bincount(codes[valid], weights=revenue[valid], minlength=len(uniques))
+    return pd.Series(totals, index=uniques).sort_values(ascending=False, kind='stable')
+
+
+def insights_summary(data):
+    """Compute every statistic on the Insights page together, once per data snapshot."""
+    revenue = data['totalprice'].to_numpy(dtype=float)
+    total_revenue = revenue.sum()
+    total_orders = data['total_orders'].sum()
+    unique_customers = data['unique_customers'].sum()
+
+    country_revenue = _revenue_by(data['country'], revenue)
+    product_revenue = _revenue_by(data['product_name'], revenue)
+
+    # Encode (year, month) as a month number so the trend is one bincount too
+    month_number = data['year'].to_numpy(dtype=np.int64) * 12 + data['month'].to_numpy(dtype=np.int64) - 1
+    first_month = month_number.min() if len(month_number) else 0
+    month_revenue = np.bincount(month_number - first_month, weights=revenue)
+    month_rows = np.bincount(month_number - first_month)
+    months = np.flatnonzero(month_rows) + first_month
+    monthly_sales = pd.DataFrame({
+        'date': pd.to_datetime({'year': months // 12, 'month': months % 12 + 1, 'day': 1}),
+        'totalprice': month_revenue[months - first_month]
+    })
+
+    return {
+        'total_revenue': total_revenue,
+        'total_orders': total_orders,
+        'unique_customers': unique_customers,
+        'avg_order_value': total_revenue / total_orders if total_orders > 0 else 0,
+        'avg_customer_value': total_revenue / unique_customers if unique_customers > 0 else 0,
+        'country_revenue': country_revenue,
+        'top_product': product_revenue.head(1),
+        'total_products': len(product_revenue),
+        'avg_items_per_order': data['quantity'].mean(),
+        'monthly_sales': monthly_sales
+    }
+
+
+PROFILE_NUMERIC = ['quantity', 'unitprice', 'totalprice']
+PROFILE_CATEGORICAL = ['country', 'product_name']
+PROFILE_TOTALS = ['totalprice', 'total_orders', 'unique_customers']
+
+
+def _describe_counts(counts):
+    """Reproduce DataFrame.describe() for one column from its value counts."""
+    counts = counts.sort_index()
+    values = counts.index.to_numpy(dtype=float)
+    weights = counts.to_numpy(dtype=float)
+    n = weights.sum()
+    mean = (values * weights).sum() / n
+    std = np.sqrt((weights * (values - mean) ** 2).sum() / (n - 1)) if n > 1 else np.nan
+
+    # Linear interpolation between order statistics, as pandas' quantile does
+    cumulative = weights.cumsum()
+    def quantile(q):
+        position = (n - 1) * q
+        lower = values[np.searchsorted(cumulative, np.floor(position), side='right')]
+        upper = values[np.searchsorted(cumulative, np.ceil(position), side='right')]
+        return lower + (upper - lower) * (position - np.floor(position))
+
+    return pd.Series({
+        'count': n, 'mean': mean, 'std': std, 'min': values[0],
+        '25%': quantile(0.25), '50%': quantile(0.5), '75%': quantile(0.75), 'max': values[-1]
+    })
+
+
+def update_profile(profile, new_rows):
+    """Fold newly arrived rows into a dataset profile without rescanning earlier data."""
+    profile = profile or {'records': 0, 'value_counts': {}, 'totals': {}, 'date_min': None, 'date_max': None}
+    if new_rows.empty:
+        return profile
+
+    # Value counts add up exactly, so describe() and top values stay exact after merging
+    value_counts = dict(profile['value_counts'])
+    for column in PROFILE_NUMERIC + PROFILE_CATEGORICAL:
+        # Ordered by value, as add() leaves a merged index, so ties rank alike in full and incremental profiles
+        counts = new_rows[column].value_counts().sort_index()
+        if column in value_counts:
+            counts = value_counts[column].add(counts, fill_value=0).astype(int)
+        value_counts[column] = counts
+
+    totals = {column: profile['totals'].get(column, 0) + new_rows[column].sum() for column in PROFILE_TOTALS}
+    date_min, date_max = new_rows['date'].min(), new_rows['date'].max()
+    if profile['date_min'] is not None:
+        date_min, date_max = min(date_min, profile['date_min']), max(date_max, profile['date_max'])
+
+    return {
+        'records': profile['records'] + len(new_rows),
+        'value_counts': value_counts,
+        'totals': totals,
+        'date_min': date_min,
+        'date_max': date_max,
+        'numeric_summary': pd.DataFrame({column: _describe_counts(value_counts[column]) for column in PROFILE_NUMERIC}),
+        'top_values': {column: value_counts[column].sort_values(ascending=False, kind='stable').head() for column in PROFILE_CATEGORICAL},
+        'distinct': {column: len(value_counts[column]) for column in PROFILE_CATEGORICAL}
+    }
+
+
+def profile_dataset(data):
+    """Profile a loaded snapshot for the Home page summary tabs."""
+    return update_profile(None, data)
+
+
+# One published state of the live aggregates
+LiveState = namedtuple('LiveState', ['rows', 'daily', 'products', 'countries', 'profile', 'version'])
+
+
+class LiveAggregates:
+    """Dashboard rows plus daily, product x day and country x day totals that newly loaded rows are folded into.
+
+    Starts from a snapshot of DASHBOARD_QUERY that covers the sales lines up
+    to a load watermark, and keeps the Home page profile alongside. refresh() polls for rows loaded since and apply()
+    folds them in, building new frames and publishing them with a new
+    version, so a page reading state() sees one consistent snapshot while
+    batches keep arriving. The query groups identical lines of a day into one
+    row, so a batch row whose group already exists only adds its order and
+    customer counts to it. Those distinct counts are summed across batches
+    (an invoice or customer already in the group counts again), which a
+    rebuild from the database corrects.
+    """
+
+    # DASHBOARD_QUERY's grouping columns, in its column order
+    KEYS = ['product_name', 'stockcode', 'quantity', 'unitprice', 'totalprice', 'country', 'year', 'month', 'day', 'date']
+    DAILY = ['totalprice', 'quantity', 'total_orders', 'unique_customers']
+    PRODUCT = ['totalprice', 'quantity', 'total_orders']
+    COUNTS = ['quantity', 'total_orders', 'unique_customers']
+
+    def __init__(self, data, watermark=0, version=None):
+        self._lock = threading.Lock()
+        self._poll_lock = threading.Lock()
+        self.base_version = version
+        self.batches = 0
+        self.watermark = watermark
+        self.polled = time.monotonic()
+        self._keys = pd.MultiIndex.from_frame(data[self.KEYS])
+        self._state = LiveState(
+            data,
+            data.groupby('date')[self.DAILY].sum(),
+            data.groupby(['product_name', 'date'])[self.PRODUCT].sum(),
+            CountryRollup(data),
+            profile_dataset(data),
+            f'{version}+0'
+        )
+
+    def state(self):
+        """The rows and aggregates as of the last applied batch."""
+        with self._lock:
+            return self._state
+
+    def refresh(self, fetch_delta, interval=0):
+        """Fold in the rows loaded since the watermark, at most once per interval seconds; return the state.
+
+        fetch_delta(watermark) returns (rows, new watermark). While one caller
+        polls, the others get the state already published.
+        """
+        if time.monotonic() - self.polled < interval or not self._poll_lock.acquire(blocking=False):
+            return self.state()
+        try:
+            rows, watermark = fetch_delta(self.watermark)
+            self.apply(rows)
+            self.watermark = watermark
+            self.polled = time.monotonic()
+        finally:
+            self._poll_lock.release()
+        return self.state()
+
+    def apply(self, rows):
+        """Fold a batch of dashboard rows into the rows and every aggregate and publish the result."""
+        if rows.empty:
+            return
+        current = self._state
+        positions = self._keys.get_indexer(pd.MultiIndex.from_frame(rows[self.KEYS]))
+        merged = positions >= 0
+
+        # Rows merged into an existing group add nothing to revenue or units, which that group already holds
+        delta = rows.copy()
+        delta.loc[merged, ['totalprice', 'quantity']] = 0
+        daily = current.daily.add(delta.groupby('date')[self.DAILY].sum(), fill_value=0)
+        products = current.products.add(delta.groupby(['product_name', 'date'])[self.PRODUCT].sum(), fill_value=0)
+        # The rollup's cube is small, so copying it leaves readers of the previous state undisturbed
+        countries = copy.deepcopy(current.countries).add(delta)
+
+        data = current.rows
+        if merged.any():
+            counts = data[['total_orders', 'unique_customers']].to_numpy(copy=True)
+            np.add.at(counts, positions[merged], rows[['total_orders', 'unique_customers']].to_numpy()[merged])
+            data = data.assign(total_orders=counts[:, 0], unique_customers=counts[:, 1])
+        added = rows[~merged]
+        data = pd.concat([data, added], ignore_index=True)
+
+        # Only the new rows are profiled; merged rows change no profiled value, just the order and customer totals
+        profile = update_profile(current.profile, added)
+        merged_counts = rows[['total_orders', 'unique_customers']].to_numpy()[merged].sum(axis=0)
+        profile = {**profile, 'totals': {
+            **profile['totals'],
+            'total_orders': profile['totals']['total_orders'] + merged_counts[0],
+            'unique_customers': profile['totals']['unique_customers'] + merged_counts[1]
+        }}
+
+        with self._lock:
+            self.batches += 1
+            self._keys = self._keys.append(pd.MultiIndex.from_frame(added[self.KEYS]))
+            self._state = LiveState(
+                data,
+                daily.astype({column: 'int64' for column in self.COUNTS}),
+                products.astype({column: 'int64' for column in self.COUNTS if column in self.PRODUCT}),
+                countries,
+                profile,
+                f'{self.base_version}+{self.batches}'
+            )
+
+
+def live_overview_metrics(state, start, end, previous_start):
+    """The Overview page's KPIs, monthly trend and top lists from live aggregates, shaped like page_queries.overview_metrics."""
+    start, end, previous_start = pd.Timestamp(start), pd.Timestamp(end), pd.Timestamp(previous_start)
+
+    def kpis(first, last):
+        # One-row frames, so the counts keep their integer dtype
+        window = state.daily.loc[first:last]
+        return pd.DataFrame({column: [window[column].sum()] for column in ['totalprice', 'total_orders', 'unique_customers']})
+
+    product_days = state.products.index.get_level_values('date')
+    in_range = state.products[(product_days >= start) & (product_days <= end)]
+    top_country = state.countries.totals(start, end).nlargest(1, 'totalprice')
+    return {
+        'kpis': kpis(start, end),
+        'previous_kpis': kpis(previous_start, start - pd.Timedelta(days=1)),
+        'trend': state.daily.loc[start:end, 'totalprice'].resample('M').sum().reset_index(),
+        'top_products': in_range.groupby(level='product_name')['totalprice'].sum().nlargest(5).reset_index(),
+        'top_country': top_country.iloc[0] if len(top_country) else None
+    }
@@ -0,0 +1,51 @@
+import os
+import sys
+import json
+import time
+import argparse
+import statistics
+from dotenv import load_dotenv # type: ignore
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import run_query, DASHBOARD_QUERY
+
+
+def time_backend(backend, repeats):
+    """Run the dashboard query repeatedly on one backend and collect wall-clock timings."""
+    timings = []
+    rows = 0
+    for _ in range(repeats):
+        start = time.perf_counter()
+        rows = len(run_query(DASHBOARD_QUERY, backend=backend))
+        timings.append(time.perf_counter() - start)
+    return {
+        'backend': backend,
+        'rows': rows,
+        'repeats': repeats,
+        'min_seconds': round(min(timings), 3),
+        'median_seconds': round(statistics.median(timings), 3)
+    }
+
+
+def main():
+    """Compare the dashboard query on live Postgres against DuckDB over the Parquet snapshot."""
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument('--backends', nargs='+', default=['postgres', 'duckdb'])
+    parser.add_argument('--repeats', type=int, default=5)
+    parser.add_argument('--output', help='Write results to this JSON file')
+    args = parser.parse_args()
+
+    load_dotenv()
+    results = [time_backend(backend, args.repeats) for backend in args.backends]
+    for result in results:
+        print(f"{result['backend']:>8}: {result['rows']:,} rows, "
+              f"median {result['median_seconds']:.3f}s, best {result['min_seconds']:.3f}s")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=4)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+import os
+import sys
+import json
+import time
+import argparse
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import process
+from synthetic_data import write_dataset
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
+
+
+def main():
+    """Benchmark process.py's cleaning step against worker count on a synthetic export."""
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument('--rows', type=int, default=5000000)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4, 8])
+    parser.add_argument('--repeat', type=int, default=3, help='Runs per worker count; the best is reported')
+    parser.add_argument('--input', help='Raw CSV to clean instead of a generated one')
+    parser.add_argument('--output', help='Write results to this JSON file')
+    args = parser.parse_args()
+
+    path = args.input
+    if path is None:
+        # Same file name as suite.py, so the two benchmarks share generated inputs
+        os.makedirs(DATA_DIR, exist_ok=True)
+        path = os.path.join(DATA_DIR, f'online_retail_{args.rows}_seed{args.seed}.csv')
+        if not os.path.exists(path):
+            print(f"Generating {args.rows:,} rows into {path}")
+            write_dataset(path, args.rows, seed=args.seed)
+    data = process.read_raw(path)
+
+    expected = process.process(data)
+    results = []
+    for workers in args.workers:
+        timings = []
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            cleaned = process.process(data, workers=workers)
+            timings.append(time.perf_counter() - start)
+        # The parallel path must reproduce the serial output exactly
+        pd.testing.assert_frame_equal(cleaned, expected)
+        results.append({'workers': workers, 'seconds': round(min(timings), 3)})
+
+    serial = results[0]['seconds'] if args.workers[0] == 1 else None
+    print(f"{len(data):,} raw rows -> {len(expected):,} cleaned, {os.cpu_count()} CPUs")
+    for result in results:
+        if serial:
+            result['speedup'] = round(serial / result['seconds'], 2)
+        print(f"{result['workers']:>3} workers: {result['seconds']:.2f}s"
+              + (f" ({result['speedup']:.2f}x)" if serial else ""))
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'rows': len(data), 'cleaned_rows': len(expected), 'cpus': os.cpu_count(),
+                       'results': results}, f, indent=4)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+import os
+import sys
+import json
+import time
+import argparse
+import resource
+import multiprocessing
+from dotenv import load_dotenv # type: ignore
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import create_db_engine, fetch_dataframe, DASHBOARD_QUERY
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MB (ru_maxrss is KB on Linux, bytes on macOS)."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def measure(mode, chunksize, results):
+    """Fetch the dashboard query once in a fresh process and report time and memory."""
+    load_dotenv()
+    engine = create_db_engine()
+    baseline = peak_rss_mb()
+
+    start = time.perf_counter()
+    with engine.connect() as connection:
+        data = fetch_dataframe(connection, DASHBOARD_QUERY, mode=mode, chunksize=chunksize)
+    elapsed = time.perf_counter() - start
+    engine.dispose()
+
+    results.put({
+        'mode': mode,
+        'chunksize': chunksize,
+        'rows': len(data),
+        'fetch_seconds': round(elapsed, 3),
+        'peak_rss_mb': round(peak_rss_mb(), 1),
+        'fetch_rss_mb': round(peak_rss_mb() - baseline, 1),
+        'frame_mb': round(data.memory_usage(deep=True).sum() / (1024 * 1024), 1)
+    })
+
+
+def main():
+    """Benchmark peak RSS and fetch time of the dashboard query for each fetch mode."""
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument('--modes', nargs='+', default=['client', 'server', 'copy'])
+    parser.add_argument('--chunksize', type=int, default=50000)
+    parser.add_argument('--output', help='Write results to this JSON file')
+    args = parser.parse_args()
+
+    # Every mode runs in its own process so ru_maxrss isn't shared between runs
+    context = multiprocessing.get_context('spawn')
+    results = []
+    for mode in args.modes:
+        queue = context.Queue()
+        process = context.Process(target=measure, args=(mode, args.chunksize, queue))
+        process.start()
+        result = queue.get()
+        process.join()
+        results.append(result)
+        print(f"{mode:>7}: {result['rows']:,} rows in {result['fetch_seconds']:.2f}s, "
+              f"peak RSS {result['peak_rss_mb']:.0f} MB (+{result['fetch_rss_mb']:.0f} MB during fetch), "
+              f"frame {result['frame_mb']:.0f} MB")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=4)
+
+
+if __name__ == "__main__":
+    main()
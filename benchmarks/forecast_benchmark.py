@@ -0,0 +1,116 @@
+import os
+import sys
+import json
+import time
+import argparse
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import product_forecast
+from synthetic_data import START, DAYS
+
+
+def product_days(skus, seed=0):
+    """Synthetic units sold per product and day: long-tailed selling rates with a weekly pattern."""
+    rng = np.random.default_rng(seed)
+    days = pd.date_range(START, periods=DAYS, freq='D')
+    rate = np.clip(rng.pareto(1.5, skus) * 0.1, 0.005, 0.95)
+    weekday = np.array([1.1, 1.15, 1.1, 1.15, 0.9, 0.0, 0.6])
+    # Products launch throughout the year, a third of them before it starts
+    launch = np.maximum(rng.integers(-DAYS // 2, DAYS, skus), 0)
+
+    sold = rng.random((skus, DAYS)) < np.minimum(rate[:, None] * weekday[days.weekday][None, :], 1)
+    sold &= np.arange(DAYS)[None, :] >= launch[:, None]
+    product, day = np.nonzero(sold)
+    quantity = np.maximum(1, np.round(rng.lognormal(np.log(rate * 40 + 1), 0.8)[product]))
+    codes = (100000 + np.arange(skus)).astype(str)
+    return pd.DataFrame({
+        'stockcode': codes[product],
+        'description': np.char.add('PRODUCT ', codes)[product],
+        'date': days[day],
+        'quantity': quantity.astype(np.int64)
+    })
+
+
+def per_product(quantities, days, alpha=product_forecast.SIZE_ALPHA, beta=product_forecast.PROBABILITY_BETA):
+    """Fit the same model with a plain loop over products and days on Python scalars, no NumPy per step."""
+    weekdays = days.weekday.tolist()
+    sizes, probabilities = [], []
+    for row in quantities.tolist():
+        size, probability, started = None, [None] * 7, False
+        for value, weekday in zip(row, weekdays):
+            sold = value > 0
+            started = started or sold
+            if sold:
+                size = value if size is None else size + alpha * (value - size)
+            if started:
+                current = probability[weekday]
+                probability[weekday] = float(sold) if current is None else current + beta * (sold - current)
+        sizes.append(size or 0.0)
+        probabilities.append([value or 0.0 for value in probability])
+    return {'size': np.array(sizes), 'probability': np.array(probabilities), 'last_day': days[-1]}
+
+
+def bench(skus, args):
+    """Time every forecasting step for one catalogue size; return the stage timings."""
+    rows = product_days(skus, args.seed)
+    timings = {}
+
+    def timed(stage, run):
+        best = None
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            result = run()
+            seconds = time.perf_counter() - start
+            best = seconds if best is None else min(best, seconds)
+        timings[stage] = round(best, 3)
+        return result
+
+    products, days, quantities = timed('matrix', lambda: product_forecast.demand_matrix(rows))
+    state = timed('fit', lambda: product_forecast.fit(quantities, days))
+    timed('daily', lambda: product_forecast.daily_predictions(products, state))
+    timed('weekly', lambda: product_forecast.weekly_predictions(products, state))
+
+    if args.loop_skus:
+        # The vectorised fit must match the scalar loop product for product
+        sample = min(args.loop_skus, skus)
+        start = time.perf_counter()
+        looped = per_product(quantities[:sample], days)
+        per_sku = (time.perf_counter() - start) / sample
+        np.testing.assert_allclose(looped['size'], state['size'][:sample])
+        np.testing.assert_allclose(looped['probability'], state['probability'][:sample])
+        timings['loop_fit_estimate'] = round(per_sku * skus, 3)
+
+    return {'skus': skus, 'product_days': len(rows), 'days': len(days), 'timings': timings}
+
+
+def main():
+    """Benchmark the vectorised product forecasting model against catalogue size."""
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument('--skus', type=int, nargs='+', default=[1000, 5000, 10000, 50000])
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=3, help='Runs per stage; the best is reported')
+    parser.add_argument('--loop-skus', type=int, default=200,
+                        help='Also fit this many products with a scalar loop and extrapolate its time (0 to skip)')
+    parser.add_argument('--output', help='Write results to this JSON file')
+    args = parser.parse_args()
+
+    results = []
+    for skus in args.skus:
+        result = bench(skus, args)
+        results.append(result)
+        timings = result['timings']
+        print(f"{skus:>7,} SKUs ({result['product_days']:,} product-days): "
+              + ', '.join(f"{stage} {seconds:.3f}s" for stage, seconds in timings.items())
+              + (f" ({timings['loop_fit_estimate'] / timings['fit']:.0f}x vectorised speedup)"
+                 if 'loop_fit_estimate' in timings and timings['fit'] else ""))
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'seed': args.seed, 'results': results}, f, indent=4)
+
+
+if __name__ == "__main__":
+    main()
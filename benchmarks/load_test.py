@@ -0,0 +1,230 @@
+import os
+import json
+import time
+import random
+import argparse
+import threading
+import multiprocessing
+from datetime import timedelta
+import numpy as np
+from dotenv import load_dotenv # type: ignore
+
+APP_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'streamlit_app.py')
+PAGES = ["Home", "Overview", "Sales", "Insights", "Product Forecasting", "Sales Forecasting", "Customer Segmentation"]
+# Session-state key the patched option_menu reads the current page from
+PAGE_KEY = '_load_test_page'
+
+
+def rss_mb():
+    """Current resident set size of this process in MB."""
+    with open('/proc/self/status', 'r') as f:
+        for line in f:
+            if line.startswith('VmRSS:'):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+def patch_navigation():
+    """Make option_menu return the page stored in each session's state instead of drawing a menu."""
+    import streamlit as st # type: ignore
+    import streamlit_option_menu # type: ignore
+
+    def option_menu(menu_title, options, *args, **kwargs):
+        return st.session_state.get(PAGE_KEY, options[kwargs.get('default_index', 0)])
+    streamlit_option_menu.option_menu = option_menu
+
+
+def patch_runtime():
+    """Give every AppTest one shared runtime, as sessions on a real server have.
+
+    AppTest installs and clears a global mock runtime around each run, which
+    breaks when runs overlap, so lookups are pinned to a single instance.
+    """
+    from unittest.mock import MagicMock
+    from streamlit.runtime import Runtime # type: ignore
+    from streamlit.runtime.caching.storage.dummy_cache_storage import MemoryCacheStorageManager # type: ignore
+    from streamlit.runtime.media_file_manager import MediaFileManager # type: ignore
+    from streamlit.runtime.memory_media_file_storage import MemoryMediaFileStorage # type: ignore
+
+    runtime = MagicMock(spec=Runtime)
+    runtime.media_file_mgr = MediaFileManager(MemoryMediaFileStorage("/mock/media"))
+    runtime.cache_storage_manager = MemoryCacheStorageManager()
+    Runtime.instance = classmethod(lambda cls: runtime)
+    Runtime.exists = classmethod(lambda cls: True)
+
+
+def random_date(widget, rng, earliest=None):
+    """A random day within a date_input's bounds, optionally no earlier than `earliest`."""
+    low = max(widget.min, earliest) if earliest else widget.min
+    return low + timedelta(days=rng.randint(0, max((widget.max - low).days, 0)))
+
+
+def interactions(app, rng):
+    """Widget changes a user could make on the current page, as (kind, change) pairs.
+
+    Each change sets one widget (or one date range) and returns the widget to
+    rerun from, so only the chosen interaction touches the session.
+    """
+    candidates = []
+
+    # Date ranges stay ordered, as they would be when picked in the browser
+    starts = [widget for widget in app.date_input if widget.label == 'Start Date']
+    ends = [widget for widget in app.date_input if widget.label == 'End Date']
+    if starts and ends:
+        def change_range(start=starts[0], end=ends[0]):
+            first = random_date(start, rng)
+            start.set_value(first)
+            return end.set_value(random_date(end, rng, earliest=first))
+        candidates.append(('date_range', change_range))
+    for widget in app.date_input:
+        if widget.label not in ('Start Date', 'End Date'):
+            candidates.append(('date', lambda widget=widget: widget.set_value(random_date(widget, rng))))
+
+    for widget in app.selectbox:
+        candidates.append(('selectbox', lambda widget=widget: widget.set_value(rng.choice(widget.options))))
+    for widget in app.slider:
+        steps = int((widget.max - widget.min) / widget.step)
+        candidates.append(('slider', lambda widget=widget, steps=steps:
+                           widget.set_value(widget.min + widget.step * rng.randint(0, steps))))
+    for widget in app.checkbox:
+        candidates.append(('checkbox', lambda widget=widget: widget.set_value(not widget.value)))
+    for widget in app.radio:
+        candidates.append(('radio', lambda widget=widget: widget.set_value(rng.choice(widget.options))))
+    return candidates
+
+
+def run_session(session, args, samples):
+    """Drive one headless session: open a page, then navigate and change widgets with think time."""
+    from streamlit.testing.v1 import AppTest # type: ignore
+
+    rng = random.Random(args.seed * 10007 + session)
+    app = AppTest.from_file(APP_PATH, default_timeout=args.timeout)
+
+    def rerun(kind, run):
+        start = time.perf_counter()
+        result = run()
+        samples.append({
+            'session': session,
+            'page': app.session_state[PAGE_KEY],
+            'action': kind,
+            'seconds': time.perf_counter() - start,
+            'exceptions': len(result.exception)
+        })
+        return result
+
+    app.session_state[PAGE_KEY] = rng.choice(PAGES)
+    app = rerun('navigate', app.run)
+    for _ in range(args.actions):
+        time.sleep(rng.uniform(0, 2 * args.think))
+        candidates = interactions(app, rng)
+        if not candidates or rng.random() < args.navigate:
+            app.session_state[PAGE_KEY] = rng.choice(PAGES)
+            app = rerun('navigate', app.run)
+        else:
+            kind, change = rng.choice(candidates)
+            app = rerun(kind, change().run)
+
+
+def measure(sessions, args, results):
+    """Run `sessions` concurrent sessions in this process and report latency and memory."""
+    load_dotenv()
+    patch_navigation()
+    patch_runtime()
+    from streamlit.testing.v1 import AppTest # type: ignore
+
+    # Warm the shared caches once so the run measures steady-state reruns
+    warmup = AppTest.from_file(APP_PATH, default_timeout=args.timeout)
+    cold = {}
+    for page in PAGES:
+        warmup.session_state[PAGE_KEY] = page
+        start = time.perf_counter()
+        warmup.run()
+        cold[page] = round(time.perf_counter() - start, 3)
+    del warmup
+
+    baseline = rss_mb()
+    peak = [baseline]
+    done = threading.Event()
+    def sample_memory():
+        while not done.wait(0.1):
+            peak[0] = max(peak[0], rss_mb())
+    sampler = threading.Thread(target=sample_memory, daemon=True)
+    sampler.start()
+
+    samples = []
+    threads = [threading.Thread(target=run_session, args=(i, args, samples)) for i in range(sessions)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    done.set()
+    peak[0] = max(peak[0], rss_mb())
+
+    seconds = np.array([sample['seconds'] for sample in samples])
+    by_page = {}
+    for page in PAGES:
+        page_seconds = [sample['seconds'] for sample in samples if sample['page'] == page]
+        if page_seconds:
+            by_page[page] = {
+                'reruns': len(page_seconds),
+                'p50_ms': round(float(np.percentile(page_seconds, 50)) * 1000, 1),
+                'p95_ms': round(float(np.percentile(page_seconds, 95)) * 1000, 1)
+            }
+
+    results.put({
+        'sessions': sessions,
+        'reruns': len(samples),
+        'reruns_per_second': round(len(samples) / elapsed, 2),
+        'p50_ms': round(float(np.percentile(seconds, 50)) * 1000, 1),
+        'p95_ms': round(float(np.percentile(seconds, 95)) * 1000, 1),
+        'p99_ms': round(float(np.percentile(seconds, 99)) * 1000, 1),
+        'max_ms': round(float(seconds.max()) * 1000, 1),
+        'exceptions': sum(sample['exceptions'] for sample in samples),
+        'baseline_rss_mb': round(baseline, 1),
+        'peak_rss_mb': round(peak[0], 1),
+        'rss_per_session_mb': round((peak[0] - baseline) / sessions, 1),
+        'cold_page_seconds': cold,
+        'pages': by_page
+    })
+
+
+def main():
+    """Load-test streamlit_app.py with concurrent headless sessions and report rerun latency and memory."""
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument('--sessions', type=int, nargs='+', default=[1, 5, 10, 20],
+                        help='Concurrent session counts to test, each in a fresh process')
+    parser.add_argument('--actions', type=int, default=20, help='Interactions per session after the first page')
+    parser.add_argument('--think', type=float, default=0.5, help='Mean think time between interactions (s)')
+    parser.add_argument('--navigate', type=float, default=0.3, help='Chance an interaction switches page')
+    parser.add_argument('--backend', default='duckdb', help="DATA_BACKEND for the run ('duckdb' or 'postgres')")
+    parser.add_argument('--timeout', type=float, default=300, help='Per-rerun timeout (s)')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='Write results to this JSON file')
+    args = parser.parse_args()
+
+    # Spawned children inherit the environment, so the backend applies to every run
+    os.environ['DATA_BACKEND'] = args.backend
+
+    context = multiprocessing.get_context('spawn')
+    results = []
+    for sessions in args.sessions:
+        queue = context.Queue()
+        process = context.Process(target=measure, args=(sessions, args, queue))
+        process.start()
+        result = queue.get()
+        process.join()
+        results.append(result)
+        print(f"{sessions:>3} sessions: {result['reruns']} reruns, {result['reruns_per_second']:.1f}/s, "
+              f"p50 {result['p50_ms']:.0f} ms, p95 {result['p95_ms']:.0f} ms, p99 {result['p99_ms']:.0f} ms, "
+              f"{result['rss_per_session_mb']:.1f} MB/session (peak RSS {result['peak_rss_mb']:.0f} MB)"
+              + (f", {result['exceptions']} exception(s)" if result['exceptions'] else ""))
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'backend': args.backend, 'actions': args.actions, 'think': args.think, 'results': results}, f, indent=4)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+import os
+import ast
+import sys
+import json
+import time
+import argparse
+import multiprocessing
+from dotenv import load_dotenv # type: ignore
+
+APP_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'streamlit_app.py')
+PAGES = ["Home", "Overview", "Sales", "Insights", "Product Forecasting", "Sales Forecasting", "Customer Segmentation"]
+# Libraries the app should only import once a page needs them
+HEAVY_MODULES = ['matplotlib', 'plotly.express', 'sqlalchemy', 'psycopg2', 'duckdb']
+
+
+def measure_imports(results):
+    """Time streamlit_app.py's module-level imports in a fresh interpreter."""
+    sys.path.insert(0, os.path.dirname(APP_PATH))
+    with open(APP_PATH, 'r') as f:
+        tree = ast.parse(f.read())
+    imports = [node for node in tree.body if isinstance(node, (ast.Import, ast.ImportFrom))]
+    code = compile(ast.Module(body=imports, type_ignores=[]), APP_PATH, 'exec')
+
+    start = time.perf_counter()
+    exec(code, {})
+    elapsed = time.perf_counter() - start
+
+    results.put({
+        'import_seconds': round(elapsed, 3),
+        'heavy_modules': [name for name in HEAVY_MODULES if name in sys.modules]
+    })
+
+
+def measure_page(page, timeout, results):
+    """Run the app once for one page, timing its first page element and the whole script."""
+    load_dotenv()
+    import streamlit as st # type: ignore
+    import streamlit_option_menu # type: ignore
+    from streamlit.testing.v1 import AppTest # type: ignore
+
+    # Pick the page without a browser, and note when the page's title is emitted
+    streamlit_option_menu.option_menu = lambda *args, **kwargs: page
+    marks = {}
+    title = st.title
+    def timed_title(*args, **kwargs):
+        marks.setdefault('first_render', time.perf_counter())
+        return title(*args, **kwargs)
+    st.title = timed_title
+
+    app = AppTest.from_file(APP_PATH, default_timeout=timeout)
+    start = time.perf_counter()
+    app.run()
+    elapsed = time.perf_counter() - start
+
+    results.put({
+        'page': page,
+        'first_render_seconds': round(marks.get('first_render', time.perf_counter()) - start, 3),
+        'script_seconds': round(elapsed, 3),
+        'exceptions': [str(exception.value) for exception in app.exception],
+        'heavy_modules': [name for name in HEAVY_MODULES if name in sys.modules]
+    })
+
+
+def run_isolated(target, *args):
+    """Run target in a spawned process so every measurement starts cold."""
+    context = multiprocessing.get_context('spawn')
+    queue = context.Queue()
+    process = context.Process(target=target, args=(*args, queue))
+    process.start()
+    result = queue.get()
+    process.join()
+    return result
+
+
+def main():
+    """Benchmark streamlit_app.py's import time and time-to-first-render per page."""
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument('--pages', nargs='+', default=PAGES)
+    parser.add_argument('--timeout', type=float, default=300)
+    parser.add_argument('--output', help='Write results to this JSON file')
+    args = parser.parse_args()
+
+    imports = run_isolated(measure_imports)
+    print(f"module-level imports: {imports['import_seconds']:.2f}s "
+          f"(heavy: {', '.join(imports['heavy_modules']) or 'none'})")
+
+    pages = []
+    for page in args.pages:
+        result = run_isolated(measure_page, page, args.timeout)
+        pages.append(result)
+        print(f"{page:>22}: first render {result['first_render_seconds']:.2f}s, "
+              f"full run {result['script_seconds']:.2f}s"
+              + (f", {len(result['exceptions'])} exception(s)" if result['exceptions'] else ""))
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'imports': imports, 'pages': pages}, f, indent=4)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,278 @@
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import subprocess
+from contextlib import contextmanager
+import numpy as np
+import pandas as pd
+from dotenv import load_dotenv # type: ignore
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, REPO_DIR)
+
+import process
+import load_data
+import migrate_schema
+import matviews
+from database import fetch_dataframe, DASHBOARD_QUERY
+from aggregates import CountryRollup, insights_summary, profile_dataset
+from synthetic_data import write_dataset
+
+DATA_DIR = os.path.join(BENCH_DIR, 'data')
+RESULTS_DIR = os.path.join(BENCH_DIR, 'results')
+SCALES = ['1M', '10M', '50M']
+
+# Tables the load benchmark creates in its own schema, in the layout migrate_schema.py produces
+BENCHMARK_SCHEMA = """
+CREATE TABLE customer (customerid integer PRIMARY KEY, country varchar(100));
+CREATE TABLE product (stockcode varchar(20) PRIMARY KEY, description varchar(255));
+CREATE TABLE time (
+    timeid serial PRIMARY KEY, day integer, month integer, year integer, hour integer, minute integer,
+    CONSTRAINT time_minute_key UNIQUE (year, month, day, hour, minute)
+);
+CREATE TABLE sales (
+    invoiceno varchar(20),
+    customerid integer REFERENCES customer,
+    stockcode varchar(20) REFERENCES product,
+    timeid integer REFERENCES time,
+    quantity integer,
+    unitprice numeric(10, 2),
+    totalprice numeric(12, 2),
+    saledate date NOT NULL,
+    occurrence integer NOT NULL DEFAULT 1,
+    saleid bigserial,
+    CONSTRAINT sales_line_key UNIQUE (invoiceno, stockcode, timeid, quantity, unitprice, occurrence, saledate)
+) PARTITION BY RANGE (saledate);
+"""
+
+
+def parse_rows(scale):
+    """Row count for a scale label such as 1M, 250k or 100000."""
+    multipliers = {'k': 1000, 'm': 1000000}
+    suffix = scale[-1].lower()
+    if suffix in multipliers:
+        return int(float(scale[:-1]) * multipliers[suffix])
+    return int(scale)
+
+
+@contextmanager
+def timed(timings, stage):
+    """Record the wall-clock seconds of the enclosed block under timings[stage]."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[stage] = round(time.perf_counter() - start, 3)
+        print(f"  {stage:<28} {timings[stage]:>9.3f}s", flush=True)
+
+
+def git_revision():
+    """Commit hash of the checked-out tree and whether tracked files have local changes."""
+    def git(*args):
+        return subprocess.run(['git', *args], cwd=REPO_DIR, capture_output=True, text=True).stdout.strip()
+    return {'commit': git('rev-parse', 'HEAD') or None, 'dirty': bool(git('status', '--porcelain', '--untracked-files=no'))}
+
+
+def connection_overrides():
+    """load_data.connect() arguments from the DB_* variables the dashboard uses."""
+    names = {'host': 'DB_HOST', 'port': 'DB_PORT', 'database': 'DB_NAME', 'user': 'DB_USER',
+             'password': 'DB_PASSWORD', 'sslmode': 'DB_SSLMODE'}
+    return {key: os.environ[name] for key, name in names.items() if os.getenv(name)}
+
+
+def bench_etl(raw_path, cleaned_path, timings):
+    """Time process.py's read, clean and derive steps and the cleaned CSV write."""
+    with timed(timings, 'etl.read_raw'):
+        raw = process.read_raw(raw_path)
+    with timed(timings, 'etl.clean'):
+        cleaned = process.clean_data(raw)
+    with timed(timings, 'etl.derive'):
+        cleaned = process.add_derived_columns(cleaned)
+    with timed(timings, 'etl.write_csv'):
+        cleaned.to_csv(cleaned_path, index=False)
+    return len(raw), len(cleaned)
+
+
+def bench_load(cleaned_path, schema, timings):
+    """Time load_data.py into a scratch schema, then the dashboard query over the result."""
+    from sqlalchemy import create_engine # type: ignore
+
+    overrides = {**connection_overrides(), 'options': f'-c search_path={schema}'}
+    conn = load_data.connect(**overrides)
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute(f'DROP SCHEMA IF EXISTS "{schema}" CASCADE; CREATE SCHEMA "{schema}";')
+            cursor.execute(BENCHMARK_SCHEMA)
+        conn.commit()
+
+        with timed(timings, 'load.read_cleaned'):
+            cleaned = pd.read_csv(cleaned_path)
+        cursor = conn.cursor()
+        with timed(timings, 'load.customers'):
+            load_data.load_customers(cursor, cleaned)
+            conn.commit()
+        with timed(timings, 'load.products'):
+            load_data.load_products(cursor, cleaned)
+            conn.commit()
+        with timed(timings, 'load.time'):
+            time_map = load_data.load_time(cursor, cleaned)
+            conn.commit()
+        with timed(timings, 'load.sales'):
+            load_data.load_sales(cursor, cleaned, time_map)
+            conn.commit()
+        with timed(timings, 'load.indexes'):
+            migrate_schema.create_indexes(cursor)
+            conn.commit()
+        with timed(timings, 'load.matviews'):
+            matviews.refresh_views(conn)
+        cursor.close()
+    finally:
+        conn.close()
+
+    engine = create_engine('postgresql+psycopg2://', creator=lambda: load_data.connect(**overrides))
+    try:
+        with timed(timings, 'query.dashboard'), engine.connect() as connection:
+            data = fetch_dataframe(connection, DASHBOARD_QUERY)
+    finally:
+        engine.dispose()
+    return data
+
+
+def dashboard_frame(cleaned):
+    """What DASHBOARD_QUERY returns for cleaned rows, computed in pandas when the load is skipped."""
+    keys = ['Description', 'StockCode', 'Quantity', 'UnitPrice', 'TotalPrice', 'Country', 'Year', 'Month', 'Day', 'Date']
+    data = cleaned.groupby(keys, sort=False).agg(
+        total_orders=('InvoiceNo', 'nunique'),
+        unique_customers=('CustomerID', 'nunique')
+    ).reset_index()
+    data.columns = ['product_name', 'stockcode', 'quantity', 'unitprice', 'totalprice', 'country',
+                    'year', 'month', 'day', 'date', 'total_orders', 'unique_customers']
+    return data.sort_values(['year', 'month', 'day'], kind='stable').reset_index(drop=True)
+
+
+def overview_page(data, start, end):
+    """The Overview page's pandas work for one date range."""
+    mask = (data['date'] >= start) & (data['date'] <= end)
+    filtered = data[mask]
+    previous = data[(data['date'] >= start - (end - start)) & (data['date'] < start)]
+    kpis = [frame[column].sum() for frame in (filtered, previous)
+            for column in ('totalprice', 'total_orders', 'unique_customers')]
+    trend = filtered.groupby(pd.Grouper(key='date', freq='M'))['totalprice'].sum()
+    top_products = filtered.groupby('product_name')['totalprice'].sum().nlargest(5)
+    return kpis, trend, top_products
+
+
+def sales_page(data, rollup, start, end):
+    """The Sales page's pandas work: every trend granularity, the monthly views, countries and products."""
+    filtered = data[(data['date'] >= start) & (data['date'] <= end)]
+    return [
+        filtered.groupby('date')['totalprice'].sum(),
+        filtered.groupby(pd.Grouper(key='date', freq='W'))['totalprice'].sum(),
+        filtered.groupby(pd.Grouper(key='date', freq='M'))['totalprice'].sum(),
+        filtered.groupby('year')['totalprice'].sum(),
+        filtered.groupby(['year', 'month'])['totalprice'].sum(),
+        filtered.groupby('month')['totalprice'].sum(),
+        rollup.totals(start, end),
+        filtered.groupby('product_name').agg({'totalprice': 'sum', 'quantity': 'sum', 'total_orders': 'sum'})
+    ]
+
+
+def bench_pages(data, timings):
+    """Time each dashboard page's aggregations over the full date range."""
+    start, end = data['date'].min(), data['date'].max()
+
+    with timed(timings, 'pages.home_profile'):
+        profile_dataset(data)
+    with timed(timings, 'pages.country_rollup'):
+        rollup = CountryRollup(data)
+    with timed(timings, 'pages.overview'):
+        overview_page(data, start, end)
+        rollup.totals(start, end)
+    with timed(timings, 'pages.sales'):
+        sales_page(data, rollup, start, end)
+    with timed(timings, 'pages.insights'):
+        insights_summary(data)
+
+
+def run_scale(scale, args):
+    """Generate (or reuse) one scale's dataset and run every selected stage on it."""
+    rows = parse_rows(scale)
+    os.makedirs(DATA_DIR, exist_ok=True)
+    raw_path = os.path.join(DATA_DIR, f'online_retail_{scale}_seed{args.seed}.csv')
+    cleaned_path = os.path.join(DATA_DIR, f'cleaned_{scale}_seed{args.seed}.csv')
+    timings = {}
+    result = {'rows': rows, 'timings': timings}
+
+    print(f"{scale} ({rows:,} rows)")
+    if not os.path.exists(raw_path):
+        with timed(timings, 'generate'):
+            write_dataset(raw_path, rows, seed=args.seed)
+
+    result['raw_rows'], result['cleaned_rows'] = bench_etl(raw_path, cleaned_path, timings)
+
+    if args.skip_load:
+        data = dashboard_frame(pd.read_csv(cleaned_path, parse_dates=['Date'], date_format='%Y-%m-%d'))
+    else:
+        data = bench_load(cleaned_path, args.schema, timings)
+    result['dashboard_rows'] = len(data)
+
+    bench_pages(data, timings)
+    return result
+
+
+def compare(current, baseline_path):
+    """Print each stage's time against a previous results file."""
+    with open(baseline_path, 'r') as f:
+        baseline = json.load(f)
+    print(f"\nvs {baseline_path} ({(baseline.get('commit') or '?')[:10]})")
+    for scale, result in current['scales'].items():
+        before = baseline['scales'].get(scale, {}).get('timings', {})
+        for stage, seconds in result['timings'].items():
+            if stage in before and before[stage] > 0:
+                print(f"  {scale:>4} {stage:<28} {before[stage]:>9.3f}s -> {seconds:>9.3f}s "
+                      f"({before[stage] / seconds if seconds else np.inf:.2f}x)")
+
+
+def main():
+    """Benchmark the ETL, the database load and the dashboard aggregations on synthetic data."""
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument('--scales', nargs='+', default=SCALES, help='Row counts, e.g. 1M 10M 50M or 250k')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--skip-load', action='store_true', help='Skip the Postgres load and dashboard query')
+    parser.add_argument('--schema', default='benchmark', help='Scratch Postgres schema for the load (dropped and recreated)')
+    parser.add_argument('--output', help='Results JSON (default benchmarks/results/<commit>.json)')
+    parser.add_argument('--compare', help='Previous results JSON to compare against')
+    args = parser.parse_args()
+
+    load_dotenv()
+    revision = git_revision()
+    results = {
+        **revision,
+        'created': pd.Timestamp.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'numpy': np.__version__,
+        'host': platform.node(),
+        'cpus': os.cpu_count(),
+        'seed': args.seed,
+        'scales': {}
+    }
+    for scale in args.scales:
+        results['scales'][scale] = run_scale(scale, args)
+
+    output = args.output or os.path.join(RESULTS_DIR, f"{(revision['commit'] or 'unknown')[:12]}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(results, f, indent=4)
+    print(f"\nResults written to {output}")
+
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
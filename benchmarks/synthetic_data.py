@@ -0,0 +1,125 @@
+import os
+import argparse
+import numpy as np
+import pandas as pd
+
+COLUMNS = ['InvoiceNo', 'StockCode', 'Description', 'Quantity', 'InvoiceDate', 'UnitPrice', 'CustomerID', 'Country']
+# Approximate country shares of the original Online Retail export
+COUNTRIES = {
+    'United Kingdom': 0.914, 'Germany': 0.0175, 'France': 0.0158, 'EIRE': 0.0151, 'Spain': 0.0047,
+    'Netherlands': 0.0044, 'Belgium': 0.0038, 'Switzerland': 0.0037, 'Portugal': 0.0028,
+    'Australia': 0.0023, 'Norway': 0.002, 'Italy': 0.0015, 'Channel Islands': 0.0014,
+    'Finland': 0.0013, 'Cyprus': 0.0012, 'Sweden': 0.0009, 'Unspecified': 0.0008,
+    'Austria': 0.0007, 'Denmark': 0.0007, 'Japan': 0.0007, 'Poland': 0.0006, 'Israel': 0.0005,
+    'USA': 0.0005, 'Hong Kong': 0.0005, 'Singapore': 0.0004, 'Iceland': 0.0003, 'Canada': 0.0003
+}
+WORDS = ['WHITE', 'HANGING', 'HEART', 'T-LIGHT', 'HOLDER', 'RED', 'RETROSPOT', 'LUNCH', 'BAG', 'VINTAGE',
+         'JUMBO', 'SHOPPER', 'CAKE', 'CASES', 'REGENCY', 'TEACUP', 'PARTY', 'BUNTING', 'GLASS', 'STAR',
+         'LANTERN', 'SET', 'OF', '3', '6', 'PINK', 'BLUE', 'CHRISTMAS', 'DOORMAT', 'NIGHT', 'LIGHT', 'BOX']
+START = pd.Timestamp('2010-12-01')
+DAYS = 374
+LINES_PER_INVOICE = 20.9
+
+
+def catalogue(rows, rng):
+    """Stock codes, descriptions and base prices; the catalogue grows with the row count."""
+    size = int(4000 * max(1.0, (rows / 540000) ** 0.5))
+    codes = np.char.add((10000 + np.arange(size)).astype(str), rng.choice(['', '', '', 'A', 'B', 'C'], size))
+    descriptions = [' '.join(rng.choice(WORDS, rng.integers(2, 6))) + f' {i}' for i in range(size)]
+    prices = np.round(np.exp(rng.normal(0.9, 0.9, size)), 2)
+    # Long-tailed demand: the best seller is a fraction of a percent of all lines
+    popularity = rng.permutation(1 / (np.arange(size) + 20.0) ** 0.9)
+    return codes, np.asarray(descriptions, dtype=object), prices, popularity / popularity.sum()
+
+
+def customers(rows, rng):
+    """Customer IDs with a home country each; the customer base grows linearly with rows."""
+    size = max(4372, rows // 124)
+    ids = 12346 + np.arange(size)
+    countries = rng.choice(list(COUNTRIES), size, p=np.asarray(list(COUNTRIES.values())) / sum(COUNTRIES.values()))
+    activity = rng.pareto(1.2, size) + 1
+    return ids, countries, activity / activity.sum()
+
+
+def generate_chunks(rows, chunk_rows=1000000, seed=0):
+    """Yield DataFrames with the Online Retail columns, rows in total, invoice by invoice.
+
+    Lines of one invoice share InvoiceNo, InvoiceDate, CustomerID and Country.
+    Like the original export it includes cancellations (C-prefixed invoices with
+    negative quantities), lines without a CustomerID or Description, zero prices
+    and heavy-tailed quantities, so the cleaning rules have work to do.
+    """
+    rng = np.random.default_rng(seed)
+    codes, descriptions, base_prices, product_p = catalogue(rows, rng)
+    customer_ids, customer_countries, customer_p = customers(rows, rng)
+
+    produced = 0
+    next_invoice = 536365
+    while produced < rows:
+        n = min(chunk_rows, rows - produced)
+
+        # Invoices of geometric length until the chunk is full
+        lengths = rng.geometric(1 / LINES_PER_INVOICE, n // 10 + 10)
+        lengths = lengths[:np.searchsorted(lengths.cumsum(), n) + 1]
+        lengths[-1] -= lengths.sum() - n
+        invoices = len(lengths)
+
+        invoice_no = (next_invoice + np.arange(invoices)).astype(str)
+        cancelled = rng.random(invoices) < 0.017
+        invoice_no = np.where(cancelled, np.char.add('C', invoice_no), invoice_no)
+        next_invoice += invoices
+
+        # Trading days in order across the whole dataset, during shop hours
+        day = (produced + np.cumsum(lengths) - lengths) * DAYS // rows
+        minutes = rng.integers(7 * 60 + 30, 20 * 60, invoices)
+        invoice_date = START + pd.to_timedelta(day, unit='D') + pd.to_timedelta(minutes, unit='m')
+
+        customer = rng.choice(len(customer_ids), invoices, p=customer_p)
+        invoice_customer = np.where(rng.random(invoices) < 0.25, np.nan, customer_ids[customer].astype(float))
+
+        product = rng.choice(len(codes), n, p=product_p)
+        quantity = np.maximum(1, np.round(rng.lognormal(1.6, 1.1, n))).astype(np.int64)
+        line_cancelled = np.repeat(cancelled, lengths)
+        quantity = np.where(line_cancelled, -quantity, quantity)
+        price = np.round(base_prices[product] * rng.choice([1.0, 1.0, 1.0, 0.85, 1.25], n), 2)
+        price[rng.random(n) < 0.002] = 0.0
+        description = descriptions[product].copy()
+        description[rng.random(n) < 0.003] = None
+
+        yield pd.DataFrame({
+            'InvoiceNo': np.repeat(invoice_no, lengths),
+            'StockCode': codes[product],
+            'Description': description,
+            'Quantity': quantity,
+            'InvoiceDate': np.repeat(invoice_date.to_numpy(), lengths),
+            'UnitPrice': price,
+            'CustomerID': np.repeat(invoice_customer, lengths),
+            'Country': np.repeat(customer_countries[customer], lengths)
+        }, columns=COLUMNS)
+        produced += n
+
+
+def write_dataset(path, rows, chunk_rows=1000000, seed=0):
+    """Write a synthetic export to CSV one chunk at a time, so any size fits in memory."""
+    tmp_path = path + '.tmp'
+    for i, chunk in enumerate(generate_chunks(rows, chunk_rows, seed)):
+        chunk.to_csv(tmp_path, mode='w' if i == 0 else 'a', header=i == 0, index=False)
+    os.replace(tmp_path, path)
+    return path
+
+
+def main():
+    """Write a synthetic Online Retail CSV with the original export's columns."""
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument('--rows', type=int, default=1000000)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--chunk-rows', type=int, default=1000000)
+    parser.add_argument('--output', required=True, help='CSV file to write')
+    args = parser.parse_args()
+
+    write_dataset(args.output, args.rows, args.chunk_rows, args.seed)
+    print(f"Wrote {args.rows:,} rows to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
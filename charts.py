@@ -0,0 +1,107 @@
+import os
+import numpy as np
+import pandas as pd
+import plotly.express as px # type: ignore
+import plotly.graph_objects as go # type: ignore
+
+# Above this many points the scatter switches from SVG to WebGL (scattergl)
+WEBGL_THRESHOLD = int(os.getenv('SCATTER_WEBGL_THRESHOLD', '5000'))
+# Above this many points "Auto" renders a density view and "Points" is downsampled
+MAX_SCATTER_POINTS = int(os.getenv('SCATTER_MAX_POINTS', '200000'))
+# Smallest segments are always kept whole when downsampling
+MIN_POINTS_PER_SEGMENT = 1000
+
+SCATTER_LABELS = {
+    'total_sales': 'Total Sales ($)',
+    'order_frequency': 'Order Frequency',
+    'Cluster Label': 'Customer Segment'
+}
+
+
+def downsample_segments(customer_df, max_points):
+    """Sample customers down to max_points, keeping every segment visible."""
+    if len(customer_df) <= max_points:
+        return customer_df
+
+    fraction = max_points / len(customer_df)
+    samples = []
+    for _, segment in customer_df.groupby('Cluster Label'):
+        size = max(int(len(segment) * fraction), min(len(segment), MIN_POINTS_PER_SEGMENT))
+        samples.append(segment.sample(n=min(size, len(segment)), random_state=0))
+    return pd.concat(samples)
+
+
+def customer_density(customer_df, bins=80):
+    """Pre-aggregate customers into log-spaced 2D bins and plot the counts as a heatmap."""
+    sales = customer_df['total_sales'].to_numpy(dtype=float)
+    frequency = customer_df['order_frequency'].to_numpy(dtype=float)
+
+    # Spending and frequency are heavy-tailed, so bin them on a log scale
+    sales = np.clip(sales, 0.01, None)
+    frequency = np.clip(frequency, 1, None)
+    x_edges = np.geomspace(sales.min(), sales.max() * 1.0001, bins + 1)
+    y_edges = np.geomspace(frequency.min(), frequency.max() * 1.0001, bins + 1)
+    counts, _, _ = np.histogram2d(sales, frequency, bins=[x_edges, y_edges])
+
+    fig = go.Figure(go.Heatmap(
+        x=np.sqrt(x_edges[:-1] * x_edges[1:]),
+        y=np.sqrt(y_edges[:-1] * y_edges[1:]),
+        z=np.where(counts.T > 0, counts.T, np.nan),
+        colorscale='Viridis',
+        colorbar={'title': 'Customers'},
+        hovertemplate='Total Sales: $%{x:,.0f}<br>Order Frequency: %{y:,.0f}<br>Customers: %{z:,}<extra></extra>'
+    ))
+
+    # Mark each segment's centre so clusters stay identifiable without every point
+    centres = customer_df.groupby('Cluster Label')[['total_sales', 'order_frequency']].median()
+    colors = px.colors.qualitative.Set3
+    for i, (label, centre) in enumerate(centres.iterrows()):
+        fig.add_trace(go.Scatter(
+            x=[centre['total_sales']],
+            y=[centre['order_frequency']],
+            mode='markers',
+            marker={'size': 14, 'symbol': 'x', 'color': colors[i % len(colors)], 'line': {'width': 1}},
+            name=label
+        ))
+
+    fig.update_layout(
+        title='Customer Density by Sales and Order Frequency (log scale)',
+        xaxis={'type': 'log', 'title': SCATTER_LABELS['total_sales']},
+        yaxis={'type': 'log', 'title': SCATTER_LABELS['order_frequency']},
+        legend={'title': SCATTER_LABELS['Cluster Label']}
+    )
+    return fig
+
+
+def customer_scatter(customer_df, mode="Auto"):
+    """Build the segmentation chart, picking SVG, WebGL or a density view by size."""
+    if mode == "Density" or (mode == "Auto" and len(customer_df) > MAX_SCATTER_POINTS):
+        return customer_density(customer_df)
+
+    points = downsample_segments(customer_df, MAX_SCATTER_POINTS)
+    title = 'Customer Segments by Sales and Order Frequency'
+    if len(points) < len(customer_df):
+        title += f' (sample of {len(points):,} of {len(customer_df):,})'
+
+    return px.scatter(
+        points,
+        x='total_sales',
+        y='order_frequency',
+        color='Cluster Label',
+        title=title,
+        labels=SCATTER_LABELS,
+        color_discrete_sequence=px.colors.qualitative.Set3,
+        render_mode='webgl' if len(points) > WEBGL_THRESHOLD else 'svg'
+    )
+
+
+def binned_histogram(counts, edges, title, x_label):
+    """Draw a histogram from precomputed bin counts so only the bins reach the browser."""
+    fig = go.Figure(go.Bar(
+        x=(edges[:-1] + edges[1:]) / 2,
+        y=counts,
+        width=np.diff(edges),
+        hovertemplate=f'{x_label}: %{{x:,.2f}}<br>Count: %{{y:,}}<extra></extra>'
+    ))
+    fig.update_layout(title=title, xaxis_title=x_label, yaxis_title='count', bargap=0)
+    return fig
@@ -0,0 +1,376 @@
+import os
+import re
+import logging
+import argparse
+import tempfile
+import threading
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+import urllib.parse
+import pandas as pd
+from sqlalchemy import create_engine, text # type: ignore
+from dotenv import load_dotenv # type: ignore
+from perf import span
+
+logger = logging.getLogger(__name__)
+
+# Where dashboard queries run: 'postgres' (live database) or 'duckdb' (Parquet snapshot)
+DATA_BACKEND = os.getenv('DATA_BACKEND', 'postgres')
+PARQUET_SNAPSHOT_DIR = os.getenv(
+    'PARQUET_SNAPSHOT_DIR',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'snapshots', 'parquet')
+)
+SNAPSHOT_TABLES = ['customer', 'product', 'time', 'sales']
+
+# Read the dashboard from materialized views the load pipeline refreshes (Postgres only; see matviews.py)
+USE_MATVIEWS = os.getenv('DASHBOARD_MATVIEWS', 'false').lower() in ('1', 'true', 'yes')
+MATERIALIZED_VIEWS = ['dashboard_rows', 'daily_sales', 'product_daily', 'country_daily', 'customer_summary']
+
+# Connections kept open by the shared engine, and threads per page for concurrent queries
+DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', '8'))
+QUERY_WORKERS = int(os.getenv('QUERY_WORKERS', '8'))
+
+# How query results are pulled from Postgres: 'client', 'server' or 'copy'
+FETCH_MODE = os.getenv('DB_FETCH_MODE', 'server')
+FETCH_CHUNKSIZE = int(os.getenv('DB_FETCH_CHUNKSIZE', '50000'))
+
+# Base query behind every dashboard page
+DASHBOARD_QUERY = """
+WITH base_data AS (
+    SELECT 
+        pd.description AS product_name,
+        pd.stockcode,
+        sls.quantity::integer as quantity,
+        sls.unitprice::double precision as unitprice,
+        sls.totalprice::double precision as totalprice,
+        c.country,
+        t.year,
+        t.month,
+        t.day,
+        sls.saledate,
+        sls.invoiceno,
+        sls.customerid
+    FROM 
+        sales sls 
+    JOIN 
+        product pd ON sls.stockcode = pd.stockcode 
+    JOIN 
+        customer c ON c.customerid = sls.customerid 
+    JOIN 
+        time t ON t.timeid = sls.timeid
+)
+SELECT 
+    product_name,
+    stockcode,
+    quantity,
+    unitprice,
+    totalprice,
+    country,
+    year,
+    month,
+    day,
+    saledate::timestamp AS date,
+    COUNT(DISTINCT invoiceno)::integer as total_orders,
+    COUNT(DISTINCT customerid)::integer as unique_customers
+FROM 
+    base_data
+GROUP BY 
+    product_name, stockcode, quantity, unitprice, 
+    totalprice, country, year, month, day, saledate
+ORDER BY 
+    year, month, day;
+"""
+
+# DASHBOARD_QUERY's rows as precomputed by the dashboard_rows materialized view
+DASHBOARD_MATVIEW_QUERY = """
+SELECT
+    product_name,
+    stockcode,
+    quantity,
+    unitprice,
+    totalprice,
+    country,
+    year,
+    month,
+    day,
+    date,
+    total_orders,
+    unique_customers
+FROM
+    dashboard_rows
+ORDER BY
+    year, month, day;
+"""
+
+# DASHBOARD_QUERY's rows for just the sales lines loaded in (:watermark, :upto], by saleid (load order)
+DASHBOARD_DELTA_QUERY = DASHBOARD_QUERY.replace(
+    'time t ON t.timeid = sls.timeid',
+    'time t ON t.timeid = sls.timeid\n    WHERE\n        sls.saleid > :watermark AND sls.saleid <= :upto',
+    1
+)
+LOAD_WATERMARK_QUERY = "SELECT COALESCE(MAX(saleid), 0) FROM sales"
+
+# Column types for CSV streams, which carry no type information
+DASHBOARD_DTYPES = {
+    'product_name': str,
+    'stockcode': str,
+    'country': str
+}
+# Timestamp columns in CSV streams and the text layout COPY writes them in
+DASHBOARD_DATES = {
+    'date': '%Y-%m-%d %H:%M:%S'
+}
+
+
+def get_database_url():
+    """Build the PostgreSQL connection URL from the DB_* environment variables."""
+    db_host = os.getenv('DB_HOST')
+    db_port = os.getenv('DB_PORT', '5432')
+    db_name = os.getenv('DB_NAME', 'postgres')
+    db_user = os.getenv('DB_USER', 'postgres')
+    db_pass = os.getenv('DB_PASSWORD')
+
+    return f"postgresql://{db_user}:{urllib.parse.quote_plus(db_pass)}@{db_host}:{db_port}/{db_name}"
+
+
+def create_db_engine(**kwargs):
+    """Create a SQLAlchemy engine for the configured database (SSL required by default)."""
+    return create_engine(
+        get_database_url(),
+        connect_args={
+            'sslmode': os.getenv('DB_SSLMODE', 'require'),
+            'client_encoding': 'utf8'
+        },
+        **kwargs
+    )
+
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def get_engine():
+    """Return the process-wide pooled engine, creating it on first use."""
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            _engine = create_db_engine(pool_size=DB_POOL_SIZE, max_overflow=DB_POOL_SIZE, pool_pre_ping=True)
+        return _engine
+
+
+def fetch_dataframe(connection, query, params=None, mode=None, chunksize=None, dtype=None):
+    """Run a query and build a DataFrame without buffering the whole result as Python tuples.
+
+    'client' is the plain pd.read_sql_query path. 'server' uses a named
+    (server-side) cursor and converts chunksize rows at a time. 'copy' streams
+    COPY ... TO STDOUT as CSV into a spooled temp file and parses it with
+    read_csv; pass dtype for columns whose type CSV can't carry.
+    """
+    mode = mode or FETCH_MODE
+    chunksize = chunksize or FETCH_CHUNKSIZE
+
+    if mode == 'client':
+        return pd.read_sql_query(text(query), connection, params=params)
+
+    if mode == 'server':
+        streaming = connection.execution_options(stream_results=True, max_row_buffer=chunksize)
+        chunks = list(pd.read_sql_query(text(query), streaming, params=params, chunksize=chunksize))
+        if not chunks:
+            return pd.DataFrame()
+        return pd.concat(chunks, ignore_index=True)
+
+    if mode == 'copy':
+        if params:
+            # COPY can't take bind parameters, so render them as literals
+            query = str(text(query).bindparams(**params).compile(
+                dialect=connection.dialect, compile_kwargs={'literal_binds': True}
+            ))
+        copy_sql = f"COPY ({query.strip().rstrip(';')}) TO STDOUT WITH (FORMAT csv, HEADER true)"
+        # Spill to disk past 64 MB so the raw CSV never has to fit in memory
+        with tempfile.SpooledTemporaryFile(max_size=64 * 1024 * 1024) as buffer:
+            cursor = connection.connection.cursor()
+            try:
+                cursor.copy_expert(copy_sql, buffer)
+            finally:
+                cursor.close()
+            buffer.seek(0)
+            data = pd.read_csv(buffer, dtype=dtype if dtype is not None else DASHBOARD_DTYPES)
+        # An explicit format skips pandas' per-column format inference
+        for column, date_format in DASHBOARD_DATES.items():
+            if column in data:
+                data[column] = pd.to_datetime(data[column], format=date_format)
+        return data
+
+    raise ValueError(f"Unknown fetch mode: {mode}")
+
+
+def export_parquet_snapshot(engine, snapshot_dir=None, chunksize=None):
+    """Export every dashboard table to <snapshot_dir>/<table>.parquet, streaming chunk by chunk."""
+    import pyarrow as pa # type: ignore
+    import pyarrow.parquet as pq # type: ignore
+
+    snapshot_dir = snapshot_dir or PARQUET_SNAPSHOT_DIR
+    os.makedirs(snapshot_dir, exist_ok=True)
+
+    for table in SNAPSHOT_TABLES:
+        path = os.path.join(snapshot_dir, f'{table}.parquet')
+        writer = None
+        rows = 0
+        with engine.connect() as connection:
+            streaming = connection.execution_options(stream_results=True, max_row_buffer=chunksize or FETCH_CHUNKSIZE)
+            for chunk in pd.read_sql_query(text(f'SELECT * FROM {table}'), streaming, chunksize=chunksize or FETCH_CHUNKSIZE):
+                batch = pa.Table.from_pandas(chunk, preserve_index=False)
+                if writer is None:
+                    writer = pq.ParquetWriter(path + '.tmp', batch.schema)
+                writer.write_table(batch.cast(writer.schema))
+                rows += len(chunk)
+        if writer is None:
+            logger.warning("Table %s is empty; no snapshot written", table)
+            continue
+        writer.close()
+        # Swap in the finished file so readers never see a partial snapshot
+        os.replace(path + '.tmp', path)
+        logger.info("Exported %d rows from %s to %s", rows, table, path)
+
+
+def duckdb_connection(snapshot_dir=None):
+    """Open an in-process DuckDB database with a view over each table's Parquet snapshot."""
+    import duckdb # type: ignore
+
+    snapshot_dir = snapshot_dir or PARQUET_SNAPSHOT_DIR
+    connection = duckdb.connect()
+    for table in SNAPSHOT_TABLES:
+        path = os.path.join(snapshot_dir, f'{table}.parquet').replace("'", "''")
+        connection.execute(f"CREATE VIEW \"{table}\" AS SELECT * FROM read_parquet('{path}')")
+    return connection
+
+
+def matviews_enabled(backend=None):
+    """Whether dashboard reads should go to the materialized views (they exist only in Postgres)."""
+    return USE_MATVIEWS and (backend or DATA_BACKEND) == 'postgres'
+
+
+def dashboard_query(backend=None):
+    """The base dashboard query for the backend: the materialized view when enabled, else the live CTE."""
+    return DASHBOARD_MATVIEW_QUERY if matviews_enabled(backend) else DASHBOARD_QUERY
+
+
+def run_query(query, params=None, backend=None):
+    """Run a dashboard query on the configured backend and return a DataFrame.
+
+    Queries use SQLAlchemy-style :name parameters on both backends.
+    """
+    backend = backend or DATA_BACKEND
+
+    with span('query', backend=backend) as details:
+        if backend == 'duckdb':
+            connection = duckdb_connection()
+            try:
+                # DuckDB names parameters $name; leave ::casts alone
+                result = connection.execute(re.sub(r'(?<![:\w]):(\w+)', r'$\1', query), params or None).df()
+            finally:
+                connection.close()
+        elif backend == 'postgres':
+            with get_engine().connect() as connection:
+                result = fetch_dataframe(connection, query, params=params)
+        else:
+            raise ValueError(f"Unknown data backend: {backend}")
+        details['rows'] = len(result)
+    return result
+
+
+def data_version(backend=None):
+    """Token that changes whenever the dashboard tables change, for keying cached results.
+
+    On Postgres it is the newest saleid, one indexed lookup: loads only append
+    sales and saleids grow in load order, so every load moves it, whereas the
+    statistics counters lag and reset. The DuckDB backend uses the snapshot
+    files' modification times and sizes.
+    """
+    backend = backend or DATA_BACKEND
+
+    if backend == 'duckdb':
+        parts = []
+        for table in SNAPSHOT_TABLES:
+            stat = os.stat(os.path.join(PARQUET_SNAPSHOT_DIR, f'{table}.parquet'))
+            parts.append(f'{table}:{stat.st_mtime_ns}:{stat.st_size}')
+        return 'duckdb:' + ','.join(parts)
+
+    if backend == 'postgres':
+        query = "SELECT (SELECT MAX(saleid) FROM sales)"
+        if matviews_enabled(backend):
+            # The views trail a load until they're refreshed; customer_summary is refreshed last,
+            # so its newest saleid moves once every view has caught up
+            query += ", (SELECT MAX(last_saleid) FROM customer_summary)"
+        with get_engine().connect() as connection:
+            row = connection.execute(text(query)).fetchone()
+        return 'postgres:' + ':'.join(str(value) for value in row)
+
+    raise ValueError(f"Unknown data backend: {backend}")
+
+
+def fetch_dashboard_snapshot():
+    """Read DASHBOARD_QUERY from Postgres together with the load watermark it covers.
+
+    Both reads share one REPEATABLE READ transaction, so the rows contain
+    exactly the sales lines with saleid up to the returned watermark.
+    """
+    with span('query', backend='postgres', snapshot=True) as details:
+        with get_engine().connect().execution_options(isolation_level='REPEATABLE READ') as connection:
+            watermark = connection.execute(text(LOAD_WATERMARK_QUERY)).scalar()
+            data = fetch_dataframe(connection, DASHBOARD_QUERY)
+        details['rows'] = len(data)
+    return data, watermark
+
+
+def fetch_dashboard_delta(watermark):
+    """DASHBOARD_QUERY's rows for the sales lines loaded after `watermark`, and the new watermark.
+
+    Sales loads take load_data.SALES_LOAD_LOCK for their transaction, so ids
+    commit in order and no line below the visible maximum can appear later.
+    """
+    with span('query', backend='postgres', watermark=watermark) as details:
+        with get_engine().connect() as connection:
+            upto = connection.execute(text(LOAD_WATERMARK_QUERY)).scalar()
+            if upto <= watermark:
+                rows = pd.DataFrame()
+            else:
+                rows = fetch_dataframe(connection, DASHBOARD_DELTA_QUERY, params={'watermark': watermark, 'upto': upto})
+        details['rows'] = len(rows)
+    return rows, upto
+
+
+def run_queries_concurrently(queries, max_workers=None, backend=None):
+    """Run independent queries in parallel and return {name: DataFrame}.
+
+    queries maps a result name to (sql, params). Each runs on its own pooled
+    connection, so a page waits for its slowest query rather than the sum.
+    """
+    workers = min(max_workers or QUERY_WORKERS, len(queries)) or 1
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        # Each task runs in a copy of the caller's context so its spans land in the caller's trace
+        futures = {
+            name: executor.submit(contextvars.copy_context().run, run_query, sql, params, backend)
+            for name, (sql, params) in queries.items()
+        }
+        return {name: future.result() for name, future in futures.items()}
+
+
+def main():
+    """Export the database tables to a Parquet snapshot for the embedded DuckDB backend."""
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument('--output', default=PARQUET_SNAPSHOT_DIR, help='Snapshot directory')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    load_dotenv()
+
+    engine = create_db_engine()
+    try:
+        export_parquet_snapshot(engine, args.output)
+    finally:
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+from collections import OrderedDict
+import threading
+
+
+def figure_key(page, chart, snapshot_version, **widgets):
+    """Build a hashable cache key from the page, chart, data snapshot and widget values."""
+    return (page, chart, snapshot_version, tuple(sorted(widgets.items())))
+
+
+class FigureCache:
+    """Bounded LRU cache of Plotly figures shared across Streamlit reruns."""
+
+    def __init__(self, max_size=64):
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._figures = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_build(self, key, build):
+        """Return the cached figure for key, calling build() only on a miss."""
+        with self._lock:
+            if key in self._figures:
+                self._figures.move_to_end(key)
+                self.hits += 1
+                return self._figures[key]
+            self.misses += 1
+
+        # Build outside the lock so slow figures don't block other sessions
+        figure = build()
+
+        with self._lock:
+            self._figures[key] = figure
+            self._figures.move_to_end(key)
+            while len(self._figures) > self.max_size:
+                self._figures.popitem(last=False)
+        return figure
+
+    def clear(self):
+        """Drop every cached figure."""
+        with self._lock:
+            self._figures.clear()
+
+    def stats(self):
+        """Return hit/miss counters and the current cache size."""
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'size': len(self._figures)}
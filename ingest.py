@@ -0,0 +1,259 @@
+import os
+import time
+import logging
+import argparse
+import threading
+import numpy as np
+import pandas as pd
+from dotenv import load_dotenv # type: ignore
+import process
+import load_data
+from aggregates import LiveAggregates
+from database import create_db_engine
+
+logger = logging.getLogger(__name__)
+
+# Seconds between scans of the drop directory
+POLL_SECONDS = float(os.getenv('LIVE_INGEST_POLL', '2'))
+# Fences saved by process.py's last full run, so every batch is cleaned against the same bounds
+CLEANING_FENCES = os.getenv('CLEANING_FENCES', process.FENCES_FILE)
+# Raw files with the Online Retail export's columns; write elsewhere and move them in when complete
+EXTENSIONS = ('.csv', '.xlsx')
+# Subdirectories a file moves through: claimed by one ingester, then loaded or failed
+PROCESSING, PROCESSED, FAILED = 'processing', 'processed', 'failed'
+
+
+def pending_files(drop_dir):
+    """Raw files waiting in the drop directory, oldest first."""
+    files = []
+    for entry in os.scandir(drop_dir):
+        if entry.is_file() and entry.name.endswith(EXTENSIONS) and not entry.name.startswith('.'):
+            files.append((entry.stat().st_mtime, entry.path))
+    return [path for _, path in sorted(files)]
+
+
+def move(path, drop_dir, subdirectory):
+    """Move a file into one of the drop directory's subdirectories; None if another ingester got it first."""
+    target = os.path.join(drop_dir, subdirectory, os.path.basename(path))
+    if subdirectory != PROCESSING:
+        # Keep every delivery of a file name
+        target = os.path.join(drop_dir, subdirectory, f"{time.strftime('%Y%m%dT%H%M%S')}-{os.path.basename(path)}")
+    try:
+        os.rename(path, target)
+    except FileNotFoundError:
+        return None
+    return target
+
+
+def clean_batch(raw, bounds=None):
+    """process.py's cleaning and derived columns for one batch, against fixed fences when given."""
+    return process.add_derived_columns(process.clean_data(raw, bounds))
+
+
+def dashboard_rows(cleaned, descriptions, countries):
+    """Group cleaned lines the way DASHBOARD_QUERY does, with the stored product and customer attributes."""
+    lines = pd.DataFrame({
+        'product_name': cleaned['StockCode'].map(descriptions),
+        'stockcode': cleaned['StockCode'],
+        'quantity': cleaned['Quantity'].astype('int64'),
+        # The database stores prices as numeric(10, 2) and numeric(12, 2)
+        'unitprice': cleaned['UnitPrice'].astype(float).round(2),
+        'totalprice': cleaned['TotalPrice'].astype(float).round(2),
+        'country': cleaned['CustomerID'].astype('int64').map(countries),
+        'year': cleaned['Year'].astype('int64'),
+        'month': cleaned['Month'].astype('int64'),
+        'day': cleaned['Day'].astype('int64'),
+        'date': cleaned['Date'],
+        'invoiceno': cleaned['InvoiceNo'],
+        'customerid': cleaned['CustomerID']
+    })
+    rows = lines.groupby(LiveAggregates.KEYS, sort=False).agg(
+        total_orders=('invoiceno', 'nunique'),
+        unique_customers=('customerid', 'nunique')
+    ).reset_index()
+    return rows.sort_values(['year', 'month', 'day'], kind='stable').reset_index(drop=True)
+
+
+def stored_lines(cursor, cleaned, time_map):
+    """Mask of the batch's lines already in sales, compared on the sales line key."""
+    cursor.execute(
+        "SELECT invoiceno, stockcode, timeid, quantity, unitprice::double precision, occurrence FROM sales "
+        "WHERE invoiceno = ANY(%s) AND saledate BETWEEN %s AND %s",
+        (cleaned['InvoiceNo'].astype(str).unique().tolist(), cleaned['Date'].min(), cleaned['Date'].max())
+    )
+    stored = set(cursor.fetchall())
+    if not stored:
+        return np.zeros(len(cleaned), dtype=bool)
+
+    minutes = zip(*(cleaned[column].tolist() for column in ['Day', 'Month', 'Year', 'Hour', 'Minute']))
+    keys = zip(
+        cleaned['InvoiceNo'].astype(str).tolist(),
+        cleaned['StockCode'].astype(str).tolist(),
+        [time_map.get(minute) for minute in minutes],
+        cleaned['Quantity'].astype('int64').tolist(),
+        cleaned['UnitPrice'].round(2).tolist(),
+        load_data.line_occurrences(cleaned).tolist()
+    )
+    return np.fromiter((key in stored for key in keys), dtype=bool, count=len(cleaned))
+
+
+def upsert_batch(conn, cleaned):
+    """Load a cleaned batch in one transaction and return its new lines in the dashboard's shape.
+
+    Lines already stored, from an earlier delivery of the same file or a
+    retried one, are skipped by the sales line key and left out of the
+    returned rows. Customers and products already in the database keep their
+    stored country and description, so the returned rows use those, as the
+    dashboard query would. Materialized views are left to the next full load
+    or matviews.py.
+    """
+    cursor = conn.cursor()
+    try:
+        load_data.load_customers(cursor, cleaned)
+        load_data.load_products(cursor, cleaned)
+        time_map = load_data.load_time(cursor, cleaned)
+        # Taken before the check so a concurrent load can't store the same lines in between
+        cursor.execute("SELECT pg_advisory_xact_lock(%s)", (load_data.SALES_LOAD_LOCK,))
+        stored = stored_lines(cursor, cleaned, time_map)
+        load_data.load_sales(cursor, cleaned, time_map)
+
+        cursor.execute(
+            "SELECT stockcode, description FROM product WHERE stockcode = ANY(%s)",
+            (cleaned['StockCode'].unique().tolist(),)
+        )
+        descriptions = dict(cursor.fetchall())
+        cursor.execute(
+            "SELECT customerid, country FROM customer WHERE customerid = ANY(%s)",
+            ([int(customer) for customer in cleaned['CustomerID'].unique()],)
+        )
+        countries = dict(cursor.fetchall())
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+    if stored.any():
+        logger.info("Skipped %d of %d lines that were already loaded", stored.sum(), len(cleaned))
+    return dashboard_rows(cleaned[~stored], descriptions, countries)
+
+
+class Ingester:
+    """Load invoice files dropped into a directory as micro-batches.
+
+    Each file is claimed by renaming it into processing/, so several
+    ingesters can share a directory, then cleaned with process.py's rules,
+    loaded in one transaction and moved to processed/ (or failed/). on_batch
+    receives each loaded batch's dashboard rows. Run it as its own process
+    (python ingest.py DIR): live dashboards pick the loaded lines up from the
+    database, so every server process sees every batch.
+    """
+
+    def __init__(self, drop_dir, on_batch=None, bounds=None):
+        self.drop_dir = drop_dir
+        self.on_batch = on_batch
+        # Loaded batches on_batch hasn't accepted yet, oldest first
+        self.undelivered = []
+        self.bounds = bounds if bounds is not None else process.load_bounds(CLEANING_FENCES)
+        if self.bounds is None:
+            logger.warning("No cleaning fences at %s; each batch's outliers are fenced on its own lines", CLEANING_FENCES)
+        for subdirectory in (PROCESSING, PROCESSED, FAILED):
+            os.makedirs(os.path.join(drop_dir, subdirectory), exist_ok=True)
+
+        # A file left mid-flight may belong to another ingester that is still running, so it isn't taken back here
+        leftover = os.listdir(os.path.join(drop_dir, PROCESSING))
+        if leftover:
+            logger.warning("%d file(s) in %s were interrupted; drop them again to retry (lines already loaded are skipped)",
+                           len(leftover), os.path.join(drop_dir, PROCESSING))
+        self.engine = create_db_engine()
+
+    def ingest_file(self, path):
+        """Clean and load one file; return its dashboard rows, or None if it was skipped or failed."""
+        claimed = move(path, self.drop_dir, PROCESSING)
+        if claimed is None:
+            return None
+
+        start = time.perf_counter()
+        conn = self.engine.raw_connection()
+        try:
+            raw = process.read_raw(claimed)
+            cleaned = clean_batch(raw, self.bounds)
+            rows = upsert_batch(conn, cleaned)
+        except Exception:
+            logger.exception("Failed to ingest %s", os.path.basename(path))
+            move(claimed, self.drop_dir, FAILED)
+            return None
+        finally:
+            conn.close()
+
+        move(claimed, self.drop_dir, PROCESSED)
+        logger.info("Ingested %s: %d lines, %d after cleaning, %d dashboard rows in %.2fs",
+                    os.path.basename(path), len(raw), len(cleaned), len(rows), time.perf_counter() - start)
+        if len(rows):
+            self.deliver((os.path.basename(path), rows))
+        return rows
+
+    def deliver(self, batch=None):
+        """Pass a loaded (file name, rows) batch to on_batch, after any still waiting; return whether all went through.
+
+        The batch is committed before on_batch runs, so a failure there
+        doesn't fail the file: its rows stay in self.undelivered, in order,
+        and are retried with the next delivery.
+        """
+        if self.on_batch is None:
+            return True
+        if batch is not None:
+            self.undelivered.append(batch)
+        while self.undelivered:
+            name, rows = self.undelivered[0]
+            try:
+                self.on_batch(rows)
+            except Exception:
+                logger.exception("Loaded %s, but on_batch failed on its rows; %d batch(es) await redelivery",
+                                 name, len(self.undelivered))
+                return False
+            self.undelivered.pop(0)
+        return True
+
+    def run_once(self):
+        """Retry undelivered batches, then ingest every file currently waiting; return how many were loaded."""
+        self.deliver()
+        return sum(self.ingest_file(path) is not None for path in pending_files(self.drop_dir))
+
+    def watch(self, stop=None, poll=POLL_SECONDS):
+        """Ingest new files every poll seconds until stop is set."""
+        stop = stop or threading.Event()
+        logger.info("Watching %s for invoice files every %.1fs", self.drop_dir, poll)
+        while not stop.is_set():
+            try:
+                self.run_once()
+            except Exception:
+                logger.exception("Error scanning %s", self.drop_dir)
+            stop.wait(poll)
+
+
+def main():
+    """Load invoice files dropped into a directory as micro-batches."""
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument('drop_dir', help='Directory to watch for raw .csv/.xlsx invoice files')
+    parser.add_argument('--once', action='store_true', help='Ingest the files waiting now and exit')
+    parser.add_argument('--poll', type=float, default=POLL_SECONDS, help='Seconds between directory scans')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    load_dotenv()
+
+    ingester = Ingester(args.drop_dir)
+    try:
+        if args.once:
+            ingester.run_once()
+        else:
+            ingester.watch(poll=args.poll)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        ingester.engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,101 +1,191 @@
+import argparse
+import logging
 import pandas as pd
 import psycopg2
+from migrate_schema import ensure_partitions
+from matviews import refresh_views
+from database import matviews_enabled
+
+INPUT_FILE = 'cleaned_data.csv'
+# Advisory lock held by each sales-loading transaction. Loads run one at a time, so saleids
+# commit in order and readers can follow sales by the highest saleid they've seen
+SALES_LOAD_LOCK = 7305
+
+CONNECTION = {
+    'host': "localhost",
+    'database': "OnlineRetaildb",
+    'user': "postgres",
+    'password': "admin",
+    'port': "5432"
+}
+
+
+def connect(**overrides):
+    """Connect to the warehouse database; keyword arguments override the defaults."""
+    return psycopg2.connect(**{**CONNECTION, **overrides})
+
+
+def load_customers(cursor, cleaned_data):
+    """Insert each distinct customer with their country."""
+    customers = cleaned_data[['CustomerID', 'Country']].drop_duplicates()
+
+    customer_insert_query = """
+        INSERT INTO Customer (customerID, country)
+        VALUES (%s, %s)
+        ON CONFLICT (customerID) DO NOTHING;
+    """
+    customer_values = [
+        (row['CustomerID'], row['Country'] if pd.notna(row['Country']) else 'Unknown')
+        for index, row in customers.iterrows()
+    ]
+    cursor.executemany(customer_insert_query, customer_values)
+
+
+def load_products(cursor, cleaned_data):
+    """Insert each distinct stock code with its description."""
+    products = cleaned_data[['StockCode', 'Description']].drop_duplicates()
+
+    product_insert_query = """
+        INSERT INTO Product (stockCode, description)
+        VALUES (%s, %s)
+        ON CONFLICT (stockCode) DO NOTHING;
+    """
+    product_values = [
+        (row['StockCode'], row['Description'])
+        for index, row in products.iterrows()
+    ]
+    cursor.executemany(product_insert_query, product_values)
+
+
+def load_time(cursor, cleaned_data):
+    """Insert time rows and return a {(day, month, year, hour, minute): timeID} lookup.
+
+    Minutes already in the table keep their row; their timeID is looked up instead.
+    """
+    time_data = cleaned_data[['Day', 'Month', 'Year', 'Hour', 'Minute']].drop_duplicates()
+
+    time_insert_query = """
+        INSERT INTO time (day, month, year, hour, minute)
+        VALUES (%s, %s, %s, %s, %s)
+        ON CONFLICT (year, month, day, hour, minute) DO NOTHING
+        RETURNING timeID;
+    """
+    time_select_query = """
+        SELECT timeID FROM time
+        WHERE day = %s AND month = %s AND year = %s AND hour = %s AND minute = %s;
+    """
+    time_values = [
+        (int(row['Day']), int(row['Month']), int(row['Year']), int(row['Hour']), int(row['Minute']))
+        for index, row in time_data.iterrows()
+    ]
+
+    # Insert each time value and store the corresponding timeID in a dictionary for later lookup
+    time_map = {}
+    for index, time_row in enumerate(time_values):
+        cursor.execute(time_insert_query, time_row)
+        inserted = cursor.fetchone()
+        if inserted is None:
+            cursor.execute(time_select_query, time_row)
+            inserted = cursor.fetchone()
+        time_map[time_row] = inserted[0]
+    return time_map
+
+
+def line_occurrences(cleaned_data):
+    """Number identical lines of an invoice 1, 2, ... in file order, for the sales line key.
+
+    Lines are compared as they are stored: same invoice, product, minute,
+    quantity and price (to the cent).
+    """
+    line = cleaned_data[['InvoiceNo', 'StockCode', 'Year', 'Month', 'Day', 'Hour', 'Minute', 'Quantity']].copy()
+    line['UnitPrice'] = cleaned_data['UnitPrice'].round(2)
+    return line.groupby(list(line.columns), sort=False, dropna=False).cumcount() + 1
+
+
+def load_sales(cursor, cleaned_data, time_map):
+    """Insert the sales lines, linked to their time rows, into the monthly saledate partitions.
+
+    Lines already stored (same sales line key) are skipped, so reloading a file adds nothing.
+    Waits for any other sales load to commit first; the lock is held until this transaction ends.
+    """
+    sales_insert_query = """
+        INSERT INTO Sales (invoiceNo, customerID, stockCode, timeID, quantity, unitPrice, totalPrice, saleDate, occurrence)
+        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
+        ON CONFLICT DO NOTHING;
+    """
+
+    cursor.execute("SELECT pg_advisory_xact_lock(%s)", (SALES_LOAD_LOCK,))
+
+    # Every month in the file needs its partition before the first insert
+    sale_dates = pd.to_datetime(cleaned_data['Date'], format='%Y-%m-%d')
+    if len(sale_dates):
+        ensure_partitions(cursor, sale_dates.min().date(), sale_dates.max().date())
+
+    sales_values = []
+    for (index, row), occurrence in zip(cleaned_data.iterrows(), line_occurrences(cleaned_data).tolist()):
+        time_tuple = (row['Day'], row['Month'], row['Year'], row['Hour'], row['Minute'])
+        timeID = time_map.get(time_tuple)
+
+        if timeID:
+            sales_values.append((
+                row['InvoiceNo'],
+                row['CustomerID'],
+                row['StockCode'],
+                timeID,
+                row['Quantity'],
+                row['UnitPrice'],
+                row['TotalPrice'],
+                row['Date'],
+                occurrence
+            ))
+
+    cursor.executemany(sales_insert_query, sales_values)
+
+
+def load_all(conn, cleaned_data):
+    """Load every dimension and then the sales facts, committing after each table, then refresh the views if enabled."""
+    cursor = conn.cursor()
+    try:
+        load_customers(cursor, cleaned_data)
+        conn.commit()
+
+        load_products(cursor, cleaned_data)
+        conn.commit()
+
+        time_map = load_time(cursor, cleaned_data)
+        conn.commit()
+
+        load_sales(cursor, cleaned_data, time_map)
+        conn.commit()
+    finally:
+        cursor.close()
+
+    # Nothing reads the views unless they're enabled; dashboards keep reading the previous rows while they refresh
+    if matviews_enabled():
+        refresh_views(conn)
+
+
+def main():
+    """Load cleaned_data.csv from process.py into the warehouse tables."""
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument('--input', default=INPUT_FILE, help='Cleaned CSV to load')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    # Import cleaned data from ETL
+    cleaned_data = pd.read_csv(args.input)
+
+    # Connect DB
+    conn = connect()
+    try:
+        load_all(conn, cleaned_data)
+    finally:
+        # Close connection
+        conn.close()
+
+    print("Data has been successfully inserted into the database.")
+
 
-# Import cleaned data from ETL
-cleaned_data = pd.read_csv('cleaned_data.csv')
-
-# Connect DB
-conn = psycopg2.connect(
-    host="localhost",
-    database="OnlineRetaildb",
-    user="postgres",
-    password="admin",
-    port="5432"
-)
-cursor = conn.cursor()
-
-# Insert customers
-customers = cleaned_data[['CustomerID', 'Country']].drop_duplicates()
-
-customer_insert_query = """
-    INSERT INTO Customer (customerID, country) 
-    VALUES (%s, %s)
-    ON CONFLICT (customerID) DO NOTHING;
-"""
-customer_values = [
-    (row['CustomerID'], row['Country'] if pd.notna(row['Country']) else 'Unknown')
-    for index, row in customers.iterrows()
-]
-cursor.executemany(customer_insert_query, customer_values)
-conn.commit()
-
-# Insert products
-products = cleaned_data[['StockCode', 'Description']].drop_duplicates()
-
-product_insert_query = """
-    INSERT INTO Product (stockCode, description)
-    VALUES (%s, %s)
-    ON CONFLICT (stockCode) DO NOTHING;
-"""
-product_values = [
-    (row['StockCode'], row['Description'])
-    for index, row in products.iterrows()
-]
-cursor.executemany(product_insert_query, product_values)
-conn.commit()
-
-# Insert time
-time_data = cleaned_data[['Day', 'Month', 'Year', 'Hour', 'Minute']].drop_duplicates()
-
-time_insert_query = """
-    INSERT INTO time (day, month, year, hour, minute)
-    VALUES (%s, %s, %s, %s, %s)
-    ON CONFLICT DO NOTHING
-    RETURNING timeID;
-"""
-time_values = [
-    (int(row['Day']), int(row['Month']), int(row['Year']), int(row['Hour']), int(row['Minute']))
-    for index, row in time_data.iterrows()
-]
-
-# Insert each time value and store the corresponding timeID in a dictionary for later lookup
-time_map = {}
-for index, time_row in enumerate(time_values):
-    cursor.execute(time_insert_query, time_row)
-    timeID = cursor.fetchone()[0]
-    time_map[time_row] = timeID
-
-conn.commit()
-
-# Insert sales
-sales_insert_query = """
-    INSERT INTO Sales (invoiceNo, customerID, stockCode, timeID, quantity, unitPrice, totalPrice)
-    VALUES (%s, %s, %s, %s, %s, %s, %s)
-    ON CONFLICT DO NOTHING;
-"""
-
-sales_values = []
-for index, row in cleaned_data.iterrows():
-    time_tuple = (row['Day'], row['Month'], row['Year'], row['Hour'], row['Minute'])
-    timeID = time_map.get(time_tuple)
-    
-    if timeID:
-        sales_values.append((
-            row['InvoiceNo'], 
-            row['CustomerID'], 
-            row['StockCode'], 
-            timeID, 
-            row['Quantity'], 
-            row['UnitPrice'], 
-            row['TotalPrice']
-        ))
-
-cursor.executemany(sales_insert_query, sales_values)
-conn.commit()
-
-# Close connection
-cursor.close()
-conn.close()
-
-print("Data has been successfully inserted into the database.")
-
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+import time
+import logging
+import argparse
+from dotenv import load_dotenv # type: ignore
+from database import create_db_engine, DASHBOARD_QUERY, MATERIALIZED_VIEWS
+
+logger = logging.getLogger(__name__)
+
+# Each view's query and the unique key REFRESH ... CONCURRENTLY diffs on, in refresh order:
+# the per-day views aggregate dashboard_rows, so it has to be refreshed first
+VIEW_DEFINITIONS = {
+    'dashboard_rows': (
+        DASHBOARD_QUERY.rsplit('ORDER BY', 1)[0],
+        ['product_name', 'stockcode', 'quantity', 'unitprice', 'totalprice', 'country', 'date']
+    ),
+    'daily_sales': ("""
+        SELECT
+            date,
+            year,
+            month,
+            SUM(totalprice::numeric)::double precision AS totalprice,
+            SUM(quantity)::bigint AS quantity,
+            SUM(total_orders)::bigint AS total_orders,
+            SUM(unique_customers)::bigint AS unique_customers
+        FROM
+            dashboard_rows
+        GROUP BY
+            date, year, month
+    """, ['date']),
+    'product_daily': ("""
+        SELECT
+            date,
+            stockcode,
+            product_name,
+            SUM(totalprice::numeric)::double precision AS totalprice,
+            SUM(quantity)::bigint AS quantity,
+            SUM(total_orders)::bigint AS total_orders
+        FROM
+            dashboard_rows
+        GROUP BY
+            date, stockcode, product_name
+    """, ['date', 'stockcode', 'product_name']),
+    'country_daily': ("""
+        SELECT
+            date,
+            country,
+            SUM(totalprice::numeric)::double precision AS totalprice,
+            SUM(total_orders)::bigint AS total_orders,
+            SUM(unique_customers)::bigint AS unique_customers
+        FROM
+            dashboard_rows
+        GROUP BY
+            date, country
+    """, ['date', 'country']),
+    'customer_summary': ("""
+        SELECT
+            sls.customerid,
+            SUM(sls.totalprice)::float AS total_sales,
+            COUNT(*)::integer AS order_frequency,
+            COUNT(DISTINCT sls.invoiceno)::integer AS invoices,
+            MIN(sls.saledate) AS first_purchase,
+            MAX(make_timestamp(t.year, t.month, t.day, t.hour, t.minute, 0)) AS last_seen,
+            MAX(sls.saleid) AS last_saleid
+        FROM
+            sales sls
+        JOIN
+            time t ON t.timeid = sls.timeid
+        GROUP BY
+            sls.customerid
+    """, ['customerid'])
+}
+
+
+def view_columns(cursor, name):
+    """Column names of an existing relation, in order; empty when it doesn't exist."""
+    cursor.execute(
+        "SELECT attname FROM pg_attribute WHERE attrelid = to_regclass(%s) AND attnum > 0 AND NOT attisdropped "
+        "ORDER BY attnum",
+        (name,)
+    )
+    return [row[0] for row in cursor.fetchall()]
+
+
+def create_views(conn):
+    """Create (and populate) any missing materialized views with their unique keys; return the new names.
+
+    A view whose columns no longer match its definition is dropped and
+    created again; views built on it are dropped with it and recreated in turn.
+    """
+    created = []
+    with conn.cursor() as cursor:
+        for name in MATERIALIZED_VIEWS:
+            query, key = VIEW_DEFINITIONS[name]
+            existing = view_columns(cursor, name)
+            if existing:
+                # Plans the definition without running it, for its column names
+                cursor.execute(f"SELECT * FROM ({query}) definition LIMIT 0")
+                if existing == [column.name for column in cursor.description]:
+                    continue
+                logger.info("Materialized view %s is out of date with its definition; recreating it", name)
+                cursor.execute(f"DROP MATERIALIZED VIEW {name} CASCADE")
+            start = time.perf_counter()
+            cursor.execute(f"CREATE MATERIALIZED VIEW {name} AS {query}")
+            cursor.execute(f"CREATE UNIQUE INDEX {name}_key ON {name} ({', '.join(key)})")
+            conn.commit()
+            created.append(name)
+            logger.info("Created materialized view %s in %.2fs", name, time.perf_counter() - start)
+    return created
+
+
+def refresh_views(conn, concurrently=True):
+    """Bring every materialized view up to date after a load and return {view: seconds}.
+
+    CONCURRENTLY computes the new contents next to the old ones and applies
+    the difference, so dashboards keep reading the previous rows meanwhile.
+    Each view is committed as soon as it is refreshed.
+    """
+    created = create_views(conn)
+    timings = {}
+    with conn.cursor() as cursor:
+        for name in MATERIALIZED_VIEWS:
+            if name in created:
+                continue
+            start = time.perf_counter()
+            cursor.execute(f"REFRESH MATERIALIZED VIEW {'CONCURRENTLY ' if concurrently else ''}{name}")
+            conn.commit()
+            timings[name] = time.perf_counter() - start
+            logger.info("Refreshed %s%s in %.2fs", name, ' concurrently' if concurrently else '', timings[name])
+    if timings:
+        logger.info("Refreshed %d materialized views in %.2fs", len(timings), sum(timings.values()))
+    return timings
+
+
+def main():
+    """Create any missing dashboard materialized views and refresh the rest."""
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument('--blocking', action='store_true', help='Refresh without CONCURRENTLY (locks out readers)')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    load_dotenv()
+
+    engine = create_db_engine()
+    conn = engine.raw_connection()
+    try:
+        refresh_views(conn, concurrently=not args.blocking)
+    finally:
+        conn.close()
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,310 @@
+import re
+import json
+import time
+import logging
+import argparse
+from datetime import date
+from dotenv import load_dotenv # type: ignore
+from database import create_db_engine
+
+logger = logging.getLogger(__name__)
+
+# Sales is range-partitioned on the invoice's calendar day, one partition per month
+PARTITION_KEY = 'saledate'
+OLD_SALES = 'sales_unpartitioned'
+
+# Indexes for the dashboard's access patterns; created on the parent, so every partition gets them
+SALES_INDEXES = [
+    "CREATE INDEX IF NOT EXISTS sales_saledate_idx ON sales (saledate)",
+    "CREATE INDEX IF NOT EXISTS sales_stockcode_saledate_idx ON sales (stockcode, saledate)",
+    "CREATE INDEX IF NOT EXISTS sales_customerid_saledate_idx ON sales (customerid, saledate)",
+    "CREATE INDEX IF NOT EXISTS sales_timeid_idx ON sales (timeid)"
+]
+
+# Natural keys that make reloading a file a no-op: one time row per minute, and one sales row per
+# invoice line, where identical lines of an invoice are told apart by their occurrence (1, 2, ...)
+TIME_KEY = ['year', 'month', 'day', 'hour', 'minute']
+SALES_LINE_KEY = ['invoiceno', 'stockcode', 'timeid', 'quantity', 'unitprice', 'occurrence', PARTITION_KEY]
+# Load-order id of each sales line; incremental readers keep the highest one they've seen as their watermark
+LOAD_ORDER_COLUMN = 'saleid'
+
+# Date-filtered query used to check that the planner prunes partitions
+PRUNING_QUERY = """
+SELECT SUM(totalprice) FROM sales WHERE saledate BETWEEN :start AND :end
+"""
+
+
+def next_month(month):
+    return date(month.year + month.month // 12, month.month % 12 + 1, 1)
+
+
+def month_starts(first, last):
+    """First day of every month from first's month through last's, inclusive."""
+    month = date(first.year, first.month, 1)
+    months = []
+    while month <= last:
+        months.append(month)
+        month = next_month(month)
+    return months
+
+
+def partition_name(month):
+    return f'sales_y{month.year}m{month.month:02d}'
+
+
+def is_partitioned(cursor, table='sales'):
+    """Whether `table` on the search path is a partitioned table."""
+    cursor.execute("SELECT c.relkind = 'p' FROM pg_class c WHERE c.oid = to_regclass(%s)", (table,))
+    row = cursor.fetchone()
+    return bool(row and row[0])
+
+
+def ensure_partitions(cursor, first, last):
+    """Create any missing monthly sales partitions covering first..last."""
+    for month in month_starts(first, last):
+        cursor.execute(
+            f"CREATE TABLE IF NOT EXISTS {partition_name(month)} PARTITION OF sales "
+            f"FOR VALUES FROM ('{month.isoformat()}') TO ('{next_month(month).isoformat()}')"
+        )
+
+
+def create_indexes(cursor):
+    for statement in SALES_INDEXES:
+        cursor.execute(statement)
+
+
+def key_constraints(cursor, table):
+    """(name, 'PRIMARY KEY' or 'UNIQUE', [columns]) for each primary key and unique constraint of table."""
+    cursor.execute(
+        """
+        SELECT c.conname, c.contype, array_agg(a.attname::text ORDER BY k.position)
+        FROM pg_constraint c
+        CROSS JOIN unnest(c.conkey) WITH ORDINALITY AS k(attnum, position)
+        JOIN pg_attribute a ON a.attrelid = c.conrelid AND a.attnum = k.attnum
+        WHERE c.conrelid = to_regclass(%s) AND c.contype IN ('p', 'u')
+        GROUP BY c.conname, c.contype
+        """,
+        (table,)
+    )
+    return [(name, 'PRIMARY KEY' if kind == 'p' else 'UNIQUE', columns) for name, kind, columns in cursor.fetchall()]
+
+
+def owned_sequences(cursor, table):
+    """(column, sequence) for each serial column of table."""
+    cursor.execute(
+        """
+        SELECT attname, pg_get_serial_sequence(%s, attname)
+        FROM pg_attribute
+        WHERE attrelid = to_regclass(%s) AND attnum > 0 AND NOT attisdropped
+            AND pg_get_serial_sequence(%s, attname) IS NOT NULL
+        """,
+        (table, table, table)
+    )
+    return cursor.fetchall()
+
+
+def migrate(conn, keep_old=False):
+    """Rebuild sales as a monthly range-partitioned table keyed on saledate.
+
+    Runs in one transaction: the old table is renamed, the partitioned table is
+    created with the same columns plus saledate (taken from the time dimension),
+    the rows are copied, the keys, foreign keys and indexes are recreated and
+    the old table is dropped unless keep_old. A partitioned table's unique keys
+    must include the partition key, so saledate is appended to the primary key
+    and unique constraints. Serial columns keep their sequences, which move to
+    the new table. Does nothing when sales is already partitioned.
+    """
+    with conn.cursor() as cursor:
+        if is_partitioned(cursor):
+            logger.info("sales is already partitioned on %s; nothing to do", PARTITION_KEY)
+            return False
+
+        start = time.perf_counter()
+        cursor.execute(
+            "SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint "
+            "WHERE conrelid = 'sales'::regclass AND contype = 'f'"
+        )
+        foreign_keys = cursor.fetchall()
+        keys = key_constraints(cursor, 'sales')
+
+        cursor.execute(f"ALTER TABLE sales RENAME TO {OLD_SALES}")
+        # Dropped from the old table so their names (and index names) are free for the new one
+        for name in [name for name, _ in foreign_keys] + [name for name, _, _ in keys]:
+            cursor.execute(f'ALTER TABLE {OLD_SALES} DROP CONSTRAINT "{name}"')
+        cursor.execute(
+            f"CREATE TABLE sales (LIKE {OLD_SALES} INCLUDING DEFAULTS, {PARTITION_KEY} date NOT NULL) "
+            f"PARTITION BY RANGE ({PARTITION_KEY})"
+        )
+        # The copied defaults still draw from the old table's sequences; hand them over so dropping it keeps them
+        for column, sequence in owned_sequences(cursor, OLD_SALES):
+            cursor.execute(f'ALTER SEQUENCE {sequence} OWNED BY sales."{column}"')
+
+        cursor.execute("SELECT MIN(make_date(year, month, 1)), MAX(make_date(year, month, 1)) FROM time")
+        first, last = cursor.fetchone()
+        if first is not None:
+            ensure_partitions(cursor, first, last)
+
+        # LEFT JOIN, so a line without a time row fails the NOT NULL instead of vanishing
+        cursor.execute(
+            f"INSERT INTO sales SELECT s.*, make_date(t.year, t.month, t.day) "
+            f"FROM {OLD_SALES} s LEFT JOIN time t ON t.timeid = s.timeid"
+        )
+        rows = cursor.rowcount
+        logger.info("Copied %d sales rows into %d monthly partitions in %.1fs",
+                    rows, len(month_starts(first, last)) if first else 0, time.perf_counter() - start)
+
+        for name, kind, columns in keys:
+            columns = columns + ([PARTITION_KEY] if PARTITION_KEY not in columns else [])
+            cursor.execute(f'ALTER TABLE sales ADD CONSTRAINT "{name}" {kind} ({", ".join(columns)})')
+        for name, definition in foreign_keys:
+            cursor.execute(f'ALTER TABLE sales ADD CONSTRAINT "{name}" {definition}')
+        start = time.perf_counter()
+        create_indexes(cursor)
+        logger.info("Created %d indexes in %.1fs", len(SALES_INDEXES), time.perf_counter() - start)
+
+        if not keep_old:
+            cursor.execute(f"DROP TABLE {OLD_SALES}")
+    conn.commit()
+
+    with conn.cursor() as cursor:
+        cursor.execute("ANALYZE sales")
+    conn.commit()
+    return True
+
+
+def has_constraint(cursor, table, name):
+    cursor.execute("SELECT 1 FROM pg_constraint WHERE conrelid = to_regclass(%s) AND conname = %s", (table, name))
+    return cursor.fetchone() is not None
+
+
+def has_column(cursor, table, column):
+    cursor.execute(
+        "SELECT 1 FROM pg_attribute WHERE attrelid = to_regclass(%s) AND attname = %s AND NOT attisdropped",
+        (table, column)
+    )
+    return cursor.fetchone() is not None
+
+
+def add_load_keys(conn):
+    """Add the keys incremental loads and readers rely on; return whether anything changed.
+
+    Time rows duplicated by earlier loads are merged into the lowest timeid of
+    their minute (sales are repointed first). Sales gains an occurrence column,
+    numbered over the lines already stored, then a unique key on
+    SALES_LINE_KEY, and an indexed bigserial saleid that numbers lines in load
+    order. Runs in one transaction and does nothing when everything exists.
+    """
+    changed = False
+    with conn.cursor() as cursor:
+        if not has_constraint(cursor, 'time', 'time_minute_key'):
+            start = time.perf_counter()
+            duplicates = f"""
+                SELECT timeid, MIN(timeid) OVER (PARTITION BY {', '.join(TIME_KEY)}) AS keep FROM time
+            """
+            cursor.execute(f"UPDATE sales s SET timeid = d.keep FROM ({duplicates}) d "
+                           f"WHERE s.timeid = d.timeid AND d.keep <> d.timeid")
+            repointed = cursor.rowcount
+            cursor.execute(f"DELETE FROM time t USING ({duplicates}) d WHERE t.timeid = d.timeid AND d.keep <> d.timeid")
+            logger.info("Merged %d duplicate time rows (%d sales lines repointed)", cursor.rowcount, repointed)
+            cursor.execute(f"ALTER TABLE time ADD CONSTRAINT time_minute_key UNIQUE ({', '.join(TIME_KEY)})")
+            logger.info("Added the time key in %.1fs", time.perf_counter() - start)
+            changed = True
+
+        if not has_constraint(cursor, 'sales', 'sales_line_key'):
+            start = time.perf_counter()
+            cursor.execute("ALTER TABLE sales ADD COLUMN IF NOT EXISTS occurrence integer NOT NULL DEFAULT 1")
+            line = ', '.join(column for column in SALES_LINE_KEY if column not in ('occurrence', PARTITION_KEY))
+            cursor.execute(f"""
+                UPDATE sales s SET occurrence = d.occurrence
+                FROM (
+                    SELECT tableoid, ctid, ROW_NUMBER() OVER (PARTITION BY {line}) AS occurrence FROM sales
+                ) d
+                WHERE s.tableoid = d.tableoid AND s.ctid = d.ctid AND d.occurrence > 1
+            """)
+            logger.info("Numbered %d repeated sales lines", cursor.rowcount)
+            cursor.execute(f"ALTER TABLE sales ADD CONSTRAINT sales_line_key UNIQUE ({', '.join(SALES_LINE_KEY)})")
+            logger.info("Added the sales line key in %.1fs", time.perf_counter() - start)
+            changed = True
+
+        if not has_column(cursor, 'sales', LOAD_ORDER_COLUMN):
+            start = time.perf_counter()
+            # Existing lines are numbered in storage order; every later insert draws a higher id
+            cursor.execute(f"ALTER TABLE sales ADD COLUMN {LOAD_ORDER_COLUMN} bigserial")
+            cursor.execute(f"CREATE INDEX IF NOT EXISTS sales_{LOAD_ORDER_COLUMN}_idx ON sales ({LOAD_ORDER_COLUMN})")
+            logger.info("Added %s in %.1fs", LOAD_ORDER_COLUMN, time.perf_counter() - start)
+            changed = True
+    conn.commit()
+    return changed
+
+
+def plan_relations(plan):
+    """Names of every relation scanned anywhere in an EXPLAIN (FORMAT JSON) plan."""
+    relations = {plan['Relation Name']} if 'Relation Name' in plan else set()
+    for child in plan.get('Plans', []):
+        relations |= plan_relations(child)
+    return relations
+
+
+def scanned_partitions(cursor, query, params):
+    """Sales partitions the planner keeps for a query with :name parameters."""
+    cursor.execute(
+        'EXPLAIN (FORMAT JSON) ' + re.sub(r'(?<![:\w]):(\w+)', r'%(\1)s', query.strip().rstrip(';')),
+        params
+    )
+    plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return sorted(name for name in plan_relations(plan[0]['Plan']) if name.startswith('sales_y'))
+
+
+def check_pruning(cursor, start, end, query=PRUNING_QUERY):
+    """Check that a date-filtered query scans only the partitions its range overlaps.
+
+    Returns (expected, scanned) partition names; they are equal when pruning works.
+    """
+    expected = [partition_name(month) for month in month_starts(start, end)]
+    cursor.execute(
+        "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+        "WHERE i.inhparent = 'sales'::regclass"
+    )
+    existing = {row[0] for row in cursor.fetchall()}
+    expected = [name for name in expected if name in existing]
+    return expected, scanned_partitions(cursor, query, {'start': start, 'end': end})
+
+
+def main():
+    """Migrate sales to a monthly range-partitioned table keyed on saledate and add the load keys, or check pruning."""
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument('--keep-old', action='store_true', help=f'Keep the unpartitioned table as {OLD_SALES}')
+    parser.add_argument('--check', nargs=2, metavar=('START', 'END'),
+                        help='Only EXPLAIN a query over START..END (YYYY-MM-DD) and report the partitions it scans')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    load_dotenv()
+
+    engine = create_db_engine()
+    conn = engine.raw_connection()
+    try:
+        if args.check:
+            from page_queries import KPI_QUERY
+
+            start, end = (date.fromisoformat(value) for value in args.check)
+            with conn.cursor() as cursor:
+                if not is_partitioned(cursor):
+                    raise SystemExit("sales is not partitioned; run the migration first")
+                for label, query in [('sales range', PRUNING_QUERY), ('overview KPIs', KPI_QUERY)]:
+                    expected, scanned = check_pruning(cursor, start, end, query)
+                    logger.info("%s over %s..%s scans: %s", label, start, end, ', '.join(scanned) or 'none')
+                    if scanned != expected:
+                        raise SystemExit(f"Partition pruning failed for {label}: expected {expected}, planner scans {scanned}")
+        else:
+            migrate(conn, keep_old=args.keep_old)
+            add_load_keys(conn)
+    finally:
+        conn.close()
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,196 @@
+import os
+from datetime import timedelta
+import pandas as pd
+from database import matviews_enabled
+from result_cache import cached_queries
+
+# Let pages run their own aggregates in the database instead of filtering the full snapshot
+PAGE_QUERIES = os.getenv('DASHBOARD_PAGE_QUERIES', 'false').lower() in ('1', 'true', 'yes')
+
+# Same rows as DASHBOARD_QUERY, restricted to :start..:end, so sums match the pandas path
+RANGE_ROWS = """
+WITH base_data AS (
+    SELECT
+        pd.description AS product_name,
+        pd.stockcode,
+        sls.quantity::integer as quantity,
+        sls.unitprice::double precision as unitprice,
+        sls.totalprice::double precision as totalprice,
+        c.country,
+        t.year,
+        t.month,
+        t.day,
+        sls.invoiceno,
+        sls.customerid
+    FROM
+        sales sls
+    JOIN
+        product pd ON sls.stockcode = pd.stockcode
+    JOIN
+        customer c ON c.customerid = sls.customerid
+    JOIN
+        time t ON t.timeid = sls.timeid
+    WHERE
+        sls.saledate BETWEEN :start AND :end
+),
+range_rows AS (
+    SELECT
+        product_name,
+        country,
+        year,
+        month,
+        totalprice,
+        COUNT(DISTINCT invoiceno) as total_orders,
+        COUNT(DISTINCT customerid) as unique_customers
+    FROM
+        base_data
+    GROUP BY
+        product_name, stockcode, quantity, unitprice,
+        totalprice, country, year, month, day
+)
+"""
+
+KPI_QUERY = RANGE_ROWS + """
+SELECT
+    COALESCE(SUM(totalprice), 0)::double precision as totalprice,
+    COALESCE(SUM(total_orders), 0)::bigint as total_orders,
+    COALESCE(SUM(unique_customers), 0)::bigint as unique_customers
+FROM
+    range_rows;
+"""
+
+TREND_QUERY = RANGE_ROWS + """
+SELECT
+    year,
+    month,
+    SUM(totalprice)::double precision as totalprice
+FROM
+    range_rows
+GROUP BY
+    year, month
+ORDER BY
+    year, month;
+"""
+
+TOP_PRODUCTS_QUERY = RANGE_ROWS + """
+SELECT
+    product_name,
+    SUM(totalprice)::double precision as totalprice
+FROM
+    range_rows
+GROUP BY
+    product_name
+ORDER BY
+    totalprice DESC
+LIMIT 5;
+"""
+
+TOP_COUNTRY_QUERY = RANGE_ROWS + """
+SELECT
+    country,
+    SUM(totalprice)::double precision as totalprice
+FROM
+    range_rows
+GROUP BY
+    country
+ORDER BY
+    totalprice DESC
+LIMIT 1;
+"""
+
+
+# The same results from the per-day materialized views (see matviews.py), a few hundred rows per range
+MATVIEW_KPI_QUERY = """
+SELECT
+    COALESCE(SUM(totalprice), 0)::double precision as totalprice,
+    COALESCE(SUM(total_orders), 0)::bigint as total_orders,
+    COALESCE(SUM(unique_customers), 0)::bigint as unique_customers
+FROM
+    daily_sales
+WHERE
+    date BETWEEN :start AND :end;
+"""
+
+MATVIEW_TREND_QUERY = """
+SELECT
+    year,
+    month,
+    SUM(totalprice)::double precision as totalprice
+FROM
+    daily_sales
+WHERE
+    date BETWEEN :start AND :end
+GROUP BY
+    year, month
+ORDER BY
+    year, month;
+"""
+
+MATVIEW_TOP_PRODUCTS_QUERY = """
+SELECT
+    product_name,
+    SUM(totalprice)::double precision as totalprice
+FROM
+    product_daily
+WHERE
+    date BETWEEN :start AND :end
+GROUP BY
+    product_name
+ORDER BY
+    totalprice DESC
+LIMIT 5;
+"""
+
+MATVIEW_TOP_COUNTRY_QUERY = """
+SELECT
+    country,
+    SUM(totalprice)::double precision as totalprice
+FROM
+    country_daily
+WHERE
+    date BETWEEN :start AND :end
+GROUP BY
+    country
+ORDER BY
+    totalprice DESC
+LIMIT 1;
+"""
+
+
+def overview_queries(start, end, previous_start):
+    """The Overview page's independent queries as {name: (sql, params)}."""
+    if matviews_enabled():
+        kpi, trend, top_products, top_country = (
+            MATVIEW_KPI_QUERY, MATVIEW_TREND_QUERY, MATVIEW_TOP_PRODUCTS_QUERY, MATVIEW_TOP_COUNTRY_QUERY
+        )
+    else:
+        kpi, trend, top_products, top_country = KPI_QUERY, TREND_QUERY, TOP_PRODUCTS_QUERY, TOP_COUNTRY_QUERY
+
+    current = {'start': start, 'end': end}
+    return {
+        'kpis': (kpi, current),
+        # The comparison period ends the day before the selected range starts
+        'previous_kpis': (kpi, {'start': previous_start, 'end': start - timedelta(days=1)}),
+        'trend': (trend, current),
+        'top_products': (top_products, current),
+        'top_country': (top_country, current)
+    }
+
+
+def overview_metrics(start, end, previous_start):
+    """Run the Overview queries concurrently (cache misses only) and shape them like the pandas path's results."""
+    results = cached_queries(overview_queries(start, end, previous_start))
+
+    # Monthly buckets labelled by month end, with empty months as zero, as pd.Grouper(freq='M') gives
+    trend = results['trend']
+    trend['date'] = pd.to_datetime(dict(year=trend['year'], month=trend['month'], day=1)) + pd.offsets.MonthEnd(0)
+    trend = trend.set_index('date')['totalprice'].resample('M').sum().reset_index()
+
+    # KPIs stay one-row frames so the counts keep their integer dtype
+    return {
+        'kpis': results['kpis'],
+        'previous_kpis': results['previous_kpis'],
+        'trend': trend,
+        'top_products': results['top_products'],
+        'top_country': results['top_country'].iloc[0] if len(results['top_country']) else None
+    }
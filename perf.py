@@ -0,0 +1,124 @@
+import os
+import json
+import time
+import threading
+import contextvars
+from contextlib import contextmanager
+import pandas as pd
+
+# Append every traced rerun to this file (Chrome trace-event format) when set
+PERF_TRACE_FILE = os.getenv('PERF_TRACE_FILE')
+
+_current = contextvars.ContextVar('perf_trace', default=None)
+
+
+class Trace:
+    """Timing spans recorded during one script run, from any thread that shares its context."""
+
+    def __init__(self, name):
+        self.name = name
+        self.origin = time.perf_counter_ns()
+        # Wall-clock start so traces from several runs and processes line up
+        self.epoch_us = time.time_ns() // 1000
+        self.spans = []
+        self._lock = threading.Lock()
+
+    def add(self, name, start_ns, duration_ns, args):
+        with self._lock:
+            self.spans.append({
+                'name': name,
+                'start_ms': (start_ns - self.origin) / 1e6,
+                'duration_ms': duration_ns / 1e6,
+                'thread': threading.current_thread().name,
+                'tid': threading.get_ident(),
+                'args': args
+            })
+
+    def elapsed_ms(self):
+        """Milliseconds since the trace started."""
+        return (time.perf_counter_ns() - self.origin) / 1e6
+
+    def to_frame(self):
+        """One row per span in start order, for display."""
+        with self._lock:
+            spans = list(self.spans)
+        frame = pd.DataFrame(spans, columns=['name', 'start_ms', 'duration_ms', 'thread', 'args'])
+        frame['args'] = frame['args'].map(lambda args: ', '.join(f'{key}={value}' for key, value in args.items()))
+        return frame.sort_values('start_ms', kind='stable').reset_index(drop=True)
+
+    def chrome_events(self):
+        """Spans as complete ('X') events of the Chrome trace-event format."""
+        with self._lock:
+            spans = list(self.spans)
+        pid = os.getpid()
+        # Metadata events name the threads; 'X' events carry start and duration in microseconds
+        threads = {span['tid']: span['thread'] for span in spans}
+        events = [{
+            'name': 'thread_name', 'ph': 'M', 'pid': pid, 'tid': tid, 'args': {'name': name}
+        } for tid, name in threads.items()]
+        events.extend({
+            'name': span['name'],
+            'cat': self.name,
+            'ph': 'X',
+            'ts': round(self.epoch_us + span['start_ms'] * 1000),
+            'dur': round(span['duration_ms'] * 1000),
+            'pid': pid,
+            'tid': span['tid'],
+            'args': {key: str(value) for key, value in span['args'].items()}
+        } for span in spans)
+        return events
+
+
+def start_trace(name):
+    """Record spans from this context (and contexts copied from it) into a new Trace."""
+    trace = Trace(name)
+    _current.set(trace)
+    return trace
+
+
+def end_trace():
+    """Stop recording in this context and return the finished Trace, if any.
+
+    Adds a root 'run' span covering the whole trace.
+    """
+    trace = _current.get()
+    _current.set(None)
+    if trace is not None:
+        trace.add('run', trace.origin, time.perf_counter_ns() - trace.origin, {'name': trace.name})
+    return trace
+
+
+@contextmanager
+def span(name, /, **args):
+    """Time the enclosed block into the active trace; a no-op when nothing is tracing.
+
+    Yields the span's args dict so the block can attach details it learns
+    along the way, such as a row count or whether a cache hit.
+    """
+    trace = _current.get()
+    if trace is None:
+        yield args
+        return
+    start = time.perf_counter_ns()
+    try:
+        yield args
+    finally:
+        trace.add(name, start, time.perf_counter_ns() - start, args)
+
+
+def export_chrome_trace(trace, path=None):
+    """Append a trace's events to a JSON trace file readable by chrome://tracing and Perfetto.
+
+    The file uses the trace-event "JSON Array Format", whose closing bracket is
+    optional, so runs (and processes) can keep appending to the same file.
+    """
+    path = path or PERF_TRACE_FILE
+    lines = ''.join(json.dumps(event) + ',\n' for event in trace.chrome_events())
+    # Open with O_APPEND and write in one call so concurrent writers don't interleave
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+    try:
+        if os.fstat(fd).st_size == 0:
+            lines = '[\n' + lines
+        os.write(fd, lines.encode('utf-8'))
+    finally:
+        os.close(fd)
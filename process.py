@@ -1,37 +1,198 @@
+import json
+import argparse
+import multiprocessing
+import numpy as np
 import pandas as pd
-data = pd.read_excel('Online Retail.xlsx')
 
-data_clean = data.dropna(subset=['CustomerID', 'Description'])
-data_clean = data_clean[data_clean['Quantity'] > 0]
-data_clean = data_clean[data_clean['UnitPrice'] > 0]
+INPUT_FILE = 'Online Retail.xlsx'
+OUTPUT_FILE = 'cleaned_data.csv'
+# Outlier fences of the last full run, reused to clean micro-batches consistently (see ingest.py)
+FENCES_FILE = 'cleaning_fences.json'
+# InvoiceDate layouts tried in order before falling back to pandas' inference:
+# what to_csv writes for datetimes, then the UCI Online Retail CSV
+DATE_FORMATS = ['%Y-%m-%d %H:%M:%S', '%m/%d/%Y %H:%M']
 
-def remove_outliers(df, column):
-    Q1 = df[column].quantile(0.25)
-    Q3 = df[column].quantile(0.75)
+
+def read_raw(path):
+    """Read the raw Online Retail export (the original .xlsx, or a CSV with the same columns)."""
+    if path.endswith('.csv'):
+        return pd.read_csv(path, dtype={'InvoiceNo': str, 'StockCode': str})
+    return pd.read_excel(path)
+
+
+def iqr_bounds(values):
+    """Lower and upper outlier fences, 1.5 IQR beyond the quartiles."""
+    Q1 = values.quantile(0.25)
+    Q3 = values.quantile(0.75)
     IQR = Q3 - Q1
     lower_bound = Q1 - 1.5 * IQR
     upper_bound = Q3 + 1.5 * IQR
+    return lower_bound, upper_bound
+
+
+def remove_outliers(df, column, bounds=None):
+    lower_bound, upper_bound = bounds if bounds is not None else iqr_bounds(df[column])
     return df[(df[column] >= lower_bound) & (df[column] <= upper_bound)]
 
-data_clean = remove_outliers(data_clean, 'Quantity')
-data_clean = remove_outliers(data_clean, 'UnitPrice')
 
-data_clean['TotalPrice'] = data_clean['Quantity'] * data_clean['UnitPrice']
+def drop_invalid(data):
+    """Drop incomplete, returned and zero-priced lines."""
+    data_clean = data.dropna(subset=['CustomerID', 'Description'])
+    data_clean = data_clean[data_clean['Quantity'] > 0]
+    data_clean = data_clean[data_clean['UnitPrice'] > 0]
+    return data_clean
+
+
+def outlier_bounds(valid):
+    """Quantity and UnitPrice fences of valid lines; UnitPrice's only over lines inside Quantity's."""
+    bounds = {'Quantity': iqr_bounds(valid['Quantity'])}
+    inside = (valid['Quantity'] >= bounds['Quantity'][0]) & (valid['Quantity'] <= bounds['Quantity'][1])
+    bounds['UnitPrice'] = iqr_bounds(valid['UnitPrice'][inside])
+    return bounds
+
+
+def clean_data(data, bounds=None):
+    """Drop incomplete, returned and zero-priced lines, then Quantity and UnitPrice outliers.
+
+    The fences come from the data itself unless bounds gives fixed ones.
+    """
+    data_clean = drop_invalid(data)
+    for column, column_bounds in (bounds or outlier_bounds(data_clean)).items():
+        data_clean = remove_outliers(data_clean, column, column_bounds)
+    return data_clean
+
+
+def parse_invoice_dates(values):
+    """InvoiceDate as datetime64, with an explicit format when one of DATE_FORMATS fits."""
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return values
+    for date_format in DATE_FORMATS:
+        try:
+            return pd.to_datetime(values, format=date_format)
+        except (ValueError, TypeError):
+            continue
+    return pd.to_datetime(values)
+
+
+def date_parts(invoice_dates):
+    """Calendar day, year, month, day, hour and minute of each timestamp, from numpy unit casts.
+
+    Truncating to day, month and year resolution is plain integer arithmetic,
+    so this avoids five separate .dt field extractions.
+    """
+    minutes = invoice_dates.to_numpy().astype('datetime64[m]')
+    days = minutes.astype('datetime64[D]')
+    months = days.astype('datetime64[M]')
+    minute_of_day = (minutes - days).astype('int32')
+    return {
+        'Date': pd.Series(days.astype('datetime64[ns]'), index=invoice_dates.index),
+        'Day': (days - months).astype('int32') + 1,
+        'Month': months.astype('int32') % 12 + 1,
+        'Year': months.astype('int32') // 12 + 1970,
+        'Hour': minute_of_day // 60,
+        'Minute': minute_of_day % 60
+    }
+
+
+def add_derived_columns(data_clean):
+    """Add TotalPrice, the date parts the time dimension is built from and the Date key."""
+    data_clean = data_clean.copy()
+    data_clean['TotalPrice'] = data_clean['Quantity'] * data_clean['UnitPrice']
+
+    data_clean['InvoiceDate'] = parse_invoice_dates(data_clean['InvoiceDate'])
+
+    parts = date_parts(data_clean['InvoiceDate'])
+    for column in ['Day', 'Month', 'Year', 'Hour', 'Minute', 'Date']:
+        data_clean[column] = parts[column]
+    return data_clean
+
+
+# Partitions of the frame being cleaned in parallel; forked workers inherit them instead of unpickling
+_partitions = []
+
+
+def _valid_values(index):
+    """Quantity and UnitPrice of one partition's valid lines, for the global outlier fences."""
+    valid = drop_invalid(_partitions[index])
+    return valid['Quantity'].to_numpy(), valid['UnitPrice'].to_numpy()
+
+
+def _clean_partition(index, bounds):
+    """Clean one partition against the global fences and add its derived columns."""
+    data_clean = drop_invalid(_partitions[index])
+    for column, column_bounds in bounds.items():
+        data_clean = remove_outliers(data_clean, column, column_bounds)
+    return add_derived_columns(data_clean)
+
+
+def process_parallel(data, workers, partitions=None, bounds=None):
+    """process() across a pool of worker processes, with the same output as the serial path.
+
+    Outlier fences depend on every row, so the workers first return the valid
+    lines' Quantity and UnitPrice and the fences are computed globally, in the
+    same order as clean_data(): UnitPrice's only over lines inside Quantity's.
+    The workers then clean and derive their partitions, which are concatenated
+    in input order. Fixed bounds skip the first pass.
+    """
+    global _partitions
+    count = max(1, min(partitions or workers * 4, len(data)))
+    size = max(1, -(-len(data) // count))
+    _partitions = [data.iloc[start:start + size] for start in range(0, len(data), size)] or [data]
+    try:
+        with multiprocessing.get_context('fork').Pool(workers) as pool:
+            if bounds is None:
+                values = pool.map(_valid_values, range(len(_partitions)))
+                bounds = outlier_bounds(pd.DataFrame({
+                    'Quantity': np.concatenate([quantity for quantity, _ in values]),
+                    'UnitPrice': np.concatenate([unit_price for _, unit_price in values])
+                }))
+
+            parts = pool.starmap(_clean_partition, [(index, bounds) for index in range(len(_partitions))])
+    finally:
+        _partitions = []
+    return pd.concat([part for part in parts if len(part)] or parts[:1])
+
+
+def process(data, workers=1, bounds=None):
+    """Run the full cleaning step on a raw frame, in `workers` processes when more than one."""
+    if workers > 1:
+        return process_parallel(data, workers, bounds=bounds)
+    return add_derived_columns(clean_data(data, bounds))
+
+
+def save_bounds(bounds, path=FENCES_FILE):
+    with open(path, 'w') as f:
+        json.dump({column: [float(lower), float(upper)] for column, (lower, upper) in bounds.items()}, f, indent=4)
+
 
-data_clean['InvoiceDate'] = pd.to_datetime(data_clean['InvoiceDate'])
+def load_bounds(path=FENCES_FILE):
+    """Fences saved by the last full run, or None when there are none."""
+    try:
+        with open(path, 'r') as f:
+            return {column: tuple(values) for column, values in json.load(f).items()}
+    except FileNotFoundError:
+        return None
 
 
-data_clean['Day'] = data_clean['InvoiceDate'].dt.day
-data_clean['Month'] = data_clean['InvoiceDate'].dt.month
-data_clean['Year'] = data_clean['InvoiceDate'].dt.year
-data_clean['Hour'] = data_clean['InvoiceDate'].dt.hour
-data_clean['Minute'] = data_clean['InvoiceDate'].dt.minute
+def main():
+    """Clean the raw Online Retail export into cleaned_data.csv for load_data.py."""
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument('--input', default=INPUT_FILE, help='Raw .xlsx or .csv export')
+    parser.add_argument('--output', default=OUTPUT_FILE, help='Cleaned CSV to write')
+    parser.add_argument('--workers', type=int, default=1, help='Clean in this many processes (0 for one per core)')
+    parser.add_argument('--fences', default=FENCES_FILE, help='Where to save the outlier fences for micro-batch ingestion')
+    args = parser.parse_args()
 
+    data = read_raw(args.input)
+    bounds = outlier_bounds(drop_invalid(data))
+    data_clean = process(data, workers=args.workers or multiprocessing.cpu_count(), bounds=bounds)
+    data_clean.to_csv(args.output, index=False)
+    save_bounds(bounds, args.fences)
 
-output_file = 'cleaned_data.csv'
-data_clean.to_csv(output_file, index=False)
+    print(data_clean)
 
-print(data_clean)
+    print(f"Data has been saved to {args.output}")
 
-print(f"Data has been saved to {output_file}")
 
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,206 @@
+import os
+import json
+import time
+import logging
+import argparse
+import numpy as np
+import pandas as pd
+from dotenv import load_dotenv # type: ignore
+from database import run_query
+
+logger = logging.getLogger(__name__)
+
+BASE_PATH = os.path.dirname(os.path.abspath(__file__))
+PRODUCTS_DIR = os.path.join(BASE_PATH, 'forecasting', 'products')
+
+# Smoothing of the demand size on selling days and of the per-weekday selling probability
+SIZE_ALPHA = 0.2
+PROBABILITY_BETA = 0.15
+# A product is forecast to sell on a day when its probability for that weekday reaches this
+SELL_THRESHOLD = 0.5
+DAILY_DAYS = 7
+WEEKLY_WEEKS = 5
+
+# Units sold per product and day
+PRODUCT_DAY_QUERY = """
+SELECT
+    sls.stockcode,
+    pd.description,
+    sls.saledate AS date,
+    CAST(SUM(sls.quantity) AS bigint) AS quantity
+FROM
+    sales sls
+JOIN
+    product pd ON pd.stockcode = sls.stockcode
+GROUP BY
+    sls.stockcode, pd.description, sls.saledate;
+"""
+
+
+def fetch_product_days(backend=None):
+    """Read units sold per stockcode and day from the configured backend.
+
+    Always from sales: product_daily sums the dashboard's grouped rows, where
+    identical invoice lines are already merged, so its quantities run low.
+    """
+    rows = run_query(PRODUCT_DAY_QUERY, backend=backend)
+    rows['date'] = pd.to_datetime(rows['date'])
+    return rows
+
+
+def demand_matrix(rows):
+    """Pivot product-day rows into a dense products x days quantity matrix.
+
+    Returns (products, days, quantities): a frame of stockcode and description
+    per matrix row, the calendar days of the columns (first to last sale, gaps
+    included) and the float32 matrix, zero on days a product didn't sell.
+    """
+    codes, stockcodes = pd.factorize(rows['stockcode'], sort=True)
+    descriptions = rows.groupby(codes)['description'].first().to_numpy()
+    first = rows['date'].min()
+    days = pd.date_range(first, rows['date'].max(), freq='D')
+    offsets = ((rows['date'] - first) // pd.Timedelta(days=1)).to_numpy()
+
+    quantities = np.zeros((len(stockcodes), len(days)), dtype=np.float32)
+    np.add.at(quantities, (codes, offsets), rows['quantity'].to_numpy(dtype=np.float32))
+    products = pd.DataFrame({'stockcode': np.asarray(stockcodes, dtype=object), 'description': descriptions})
+    return products, days, quantities
+
+
+def fit(quantities, days, alpha=SIZE_ALPHA, beta=PROBABILITY_BETA):
+    """Fit a TSB-style intermittent-demand model to every product at once.
+
+    Each product keeps a demand size, smoothed with alpha over the days it
+    sold, and one selling probability per weekday, smoothed with beta over
+    that weekday's occurrences. The recursion steps through the days, but each
+    step updates all products with array operations. A product's recursion
+    starts at its first sale, so new products aren't dragged down by the days
+    before they existed. Returns the model state as float64 arrays.
+    """
+    products = len(quantities)
+    size = np.full(products, np.nan)
+    # Weekday-major, so each day's update touches one contiguous row
+    probability = np.full((7, products), np.nan)
+    started = np.zeros(products, dtype=bool)
+
+    for column, weekday in zip(np.ascontiguousarray(quantities.T), days.weekday):
+        sold = column > 0
+        started |= sold
+
+        first_sale = sold & np.isnan(size)
+        size[first_sale] = column[first_sale]
+        update = sold & ~first_sale
+        size[update] += alpha * (column[update] - size[update])
+
+        current = probability[weekday]
+        first_seen = started & np.isnan(current)
+        seen = started & ~first_seen
+        current[first_seen] = sold[first_seen]
+        current[seen] += beta * (sold[seen] - current[seen])
+
+    return {
+        'size': np.nan_to_num(size),
+        'probability': np.nan_to_num(probability.T),
+        'last_day': days[-1]
+    }
+
+
+def forecast(state, horizon, threshold=SELL_THRESHOLD):
+    """Predict each product's daily units over `horizon` calendar days.
+
+    Returns (will_sell, expected): booleans and expected units (probability
+    times demand size), both products x days.
+    """
+    probability = state['probability'][:, horizon.weekday]
+    expected = probability * state['size'][:, None]
+    return probability >= threshold, expected
+
+
+def daily_predictions(products, state, days=DAILY_DAYS, threshold=SELL_THRESHOLD):
+    """The daily_predictions.json records: one per product and day after the last sale."""
+    horizon = pd.date_range(state['last_day'] + pd.Timedelta(days=1), periods=days, freq='D')
+    will_sell, _ = forecast(state, horizon, threshold)
+    quantity = np.where(will_sell, np.maximum(np.rint(state['size']), 1)[:, None], 0).astype(np.int64)
+
+    return pd.DataFrame({
+        'date': np.tile(horizon.strftime('%Y-%m-%d'), len(products)),
+        'stockcode': np.repeat(products['stockcode'].to_numpy(), len(horizon)),
+        'description': np.repeat(products['description'].to_numpy(), len(horizon)),
+        'will_sell': will_sell.ravel().astype(np.int64),
+        'predicted_quantity': quantity.ravel()
+    })
+
+
+def weekly_predictions(products, state, weeks=WEEKLY_WEEKS, threshold=SELL_THRESHOLD):
+    """The weekly_predictions.json records: one per product and ISO week after the last sale.
+
+    The first week starts the day after the last sale and may be partial;
+    its date is that day, the others' their Monday. Weekly quantities are the
+    expected units summed over the week's days.
+    """
+    start = state['last_day'] + pd.Timedelta(days=1)
+    end = start - pd.Timedelta(days=start.weekday()) + pd.Timedelta(weeks=weeks)
+    horizon = pd.date_range(start, end - pd.Timedelta(days=1), freq='D')
+    _, expected = forecast(state, horizon, threshold)
+
+    week_codes, week_starts = pd.factorize(horizon.to_period('W-SUN'))
+    quantity = np.rint(expected @ np.eye(len(week_starts))[week_codes]).astype(np.int64)
+    first_days = horizon.to_series().groupby(week_codes).min()
+
+    return pd.DataFrame({
+        'stockcode': np.repeat(products['stockcode'].to_numpy(), len(week_starts)),
+        'description': np.repeat(products['description'].to_numpy(), len(week_starts)),
+        'period': np.tile(first_days.dt.isocalendar().week.to_numpy(dtype=np.int64), len(products)),
+        'predicted_quantity': quantity.ravel(),
+        'will_sell': (quantity.ravel() > 0).astype(np.int64),
+        'date': np.tile(first_days.dt.strftime('%Y-%m-%d').to_numpy(), len(products))
+    })
+
+
+def active_products(quantities, active_days):
+    """Mask of products that sold within the last active_days days of the matrix."""
+    return (quantities[:, -active_days:] > 0).any(axis=1)
+
+
+def write_predictions(daily, weekly):
+    """Write daily_predictions.json and weekly_predictions.json in the shapes the dashboard reads."""
+    for name, frame in [('daily_predictions.json', daily), ('weekly_predictions.json', weekly)]:
+        path = os.path.join(PRODUCTS_DIR, name)
+        with open(path + '.tmp', 'w') as f:
+            json.dump(frame.to_dict(orient='records'), f, indent=4)
+        os.replace(path + '.tmp', path)
+
+
+def refresh_forecasts(backend=None, active_days=90):
+    """Fit every product sold in the last active_days days and rewrite the prediction artifacts."""
+    start = time.perf_counter()
+    rows = fetch_product_days(backend)
+    products, days, quantities = demand_matrix(rows)
+    active = active_products(quantities, active_days)
+    products, quantities = products[active].reset_index(drop=True), quantities[active]
+    logger.info("Read %d product-days for %d active products in %.1fs", len(rows), len(products), time.perf_counter() - start)
+
+    start = time.perf_counter()
+    state = fit(quantities, days)
+    daily, weekly = daily_predictions(products, state), weekly_predictions(products, state)
+    logger.info("Fitted %d products over %d days in %.2fs", len(products), len(days), time.perf_counter() - start)
+
+    write_predictions(daily, weekly)
+    logger.info("Wrote %d daily and %d weekly predictions starting %s", len(daily), len(weekly), daily['date'].min())
+    return daily, weekly
+
+
+def main():
+    """Regenerate the product forecasting artifacts from the sales data."""
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument('--backend', help="Data backend to read from ('postgres' or 'duckdb'; default DATA_BACKEND)")
+    parser.add_argument('--active-days', type=int, default=90, help='Forecast products sold within this many days of the last sale')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    load_dotenv()
+    refresh_forecasts(args.backend, args.active_days)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,210 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+import pandas as pd
+from perf import span
+from database import run_query, run_queries_concurrently, data_version
+
+logger = logging.getLogger(__name__)
+
+BASE_PATH = os.path.dirname(os.path.abspath(__file__))
+
+# Shared by every worker process on the host; set RESULT_CACHE=false to bypass it
+RESULT_CACHE = os.getenv('RESULT_CACHE', 'true').lower() in ('1', 'true', 'yes')
+RESULT_CACHE_DIR = os.getenv('RESULT_CACHE_DIR', os.path.join(BASE_PATH, 'cache', 'results'))
+RESULT_CACHE_MAX_BYTES = int(os.getenv('RESULT_CACHE_MAX_BYTES', str(2 * 1024 ** 3)))
+RESULT_CACHE_TTL = int(os.getenv('RESULT_CACHE_TTL', '86400'))
+
+
+def result_key(query, params=None, version=None):
+    """Stable cache key for a query, its parameters and the data version it ran against."""
+    payload = json.dumps([query, params or {}, version], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class ResultCache:
+    """Size-bounded LRU of DataFrames stored as Arrow IPC files with a SQLite index.
+
+    Entries are uncompressed Arrow files, so readers memory-map them and
+    numeric columns come back without a copy. The index tracks sizes, last
+    access and expiry plus hit/miss counters; every process on the host that
+    points at the same directory shares both.
+    """
+
+    def __init__(self, cache_dir=None, max_bytes=None, ttl=None):
+        self.cache_dir = cache_dir or RESULT_CACHE_DIR
+        self.max_bytes = max_bytes if max_bytes is not None else RESULT_CACHE_MAX_BYTES
+        self.ttl = ttl if ttl is not None else RESULT_CACHE_TTL
+        self._local = threading.local()
+        os.makedirs(self.cache_dir, exist_ok=True)
+        with self._index() as index:
+            index.execute("""
+                CREATE TABLE IF NOT EXISTS entries (
+                    key TEXT PRIMARY KEY, size INTEGER, last_access REAL, expires REAL
+                )""")
+            index.execute("CREATE TABLE IF NOT EXISTS counters (name TEXT PRIMARY KEY, value INTEGER)")
+            index.execute("INSERT OR IGNORE INTO counters VALUES ('hits', 0), ('misses', 0)")
+
+    def _index(self):
+        # sqlite3 connections can't be shared across threads, so keep one per thread
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(os.path.join(self.cache_dir, 'index.db'), timeout=30)
+            connection.execute('PRAGMA journal_mode=WAL')
+            self._local.connection = connection
+        return connection
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f'{key}.arrow')
+
+    def _count(self, index, name):
+        index.execute("UPDATE counters SET value = value + 1 WHERE name = ?", (name,))
+
+    def get(self, key):
+        """Return the cached frame for key, or None if it is missing or expired."""
+        import pyarrow as pa # type: ignore
+
+        now = time.time()
+        with span('result_cache.get') as details, self._index() as index:
+            row = index.execute("SELECT expires FROM entries WHERE key = ?", (key,)).fetchone()
+            if row is None or row[0] < now or not os.path.exists(self._path(key)):
+                if row is not None:
+                    self._remove(index, key)
+                self._count(index, 'misses')
+                details['hit'] = False
+                return None
+            index.execute("UPDATE entries SET last_access = ? WHERE key = ?", (now, key))
+            self._count(index, 'hits')
+            details['hit'] = True
+
+            try:
+                with pa.memory_map(self._path(key)) as source:
+                    return pa.ipc.open_file(source).read_all().to_pandas()
+            except FileNotFoundError:
+                # Evicted by another worker between the lookup and the read
+                return None
+
+    def put(self, key, frame):
+        """Store frame under key and evict least recently used entries past max_bytes."""
+        import pyarrow as pa # type: ignore
+
+        with span('result_cache.put', rows=len(frame)):
+            table = pa.Table.from_pandas(frame, preserve_index=False)
+            path = self._path(key)
+            # Write beside the final file and swap it in so readers never map a partial entry
+            tmp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+            with pa.OSFile(tmp_path, 'wb') as sink:
+                with pa.ipc.new_file(sink, table.schema) as writer:
+                    writer.write_table(table)
+            os.replace(tmp_path, path)
+
+        now = time.time()
+        with self._index() as index:
+            index.execute(
+                "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?)",
+                (key, os.path.getsize(path), now, now + self.ttl)
+            )
+            self._evict(index)
+
+    def _remove(self, index, key):
+        index.execute("DELETE FROM entries WHERE key = ?", (key,))
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+    def _evict(self, index):
+        for (key,) in index.execute("SELECT key FROM entries WHERE expires < ?", (time.time(),)).fetchall():
+            self._remove(index, key)
+
+        total = index.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for key, size in index.execute("SELECT key, size FROM entries ORDER BY last_access").fetchall():
+            self._remove(index, key)
+            total -= size
+            logger.info("Evicted cached result %s (%d bytes)", key, size)
+            if total <= self.max_bytes:
+                break
+
+    def get_or_compute(self, key, compute):
+        """Return the cached frame for key, computing and storing it on a miss."""
+        frame = self.get(key)
+        if frame is None:
+            frame = compute()
+            self.put(key, frame)
+        return frame
+
+    def clear(self):
+        """Drop every entry and reset the counters."""
+        with self._index() as index:
+            for (key,) in index.execute("SELECT key FROM entries").fetchall():
+                self._remove(index, key)
+            index.execute("UPDATE counters SET value = 0")
+
+    def stats(self):
+        """Hit/miss counters and current size, shared across processes."""
+        index = self._index()
+        counters = dict(index.execute("SELECT name, value FROM counters").fetchall())
+        entries, size = index.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+        return {'hits': counters['hits'], 'misses': counters['misses'], 'entries': entries, 'bytes': size}
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_result_cache():
+    """Return the process-wide ResultCache, creating it on first use."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = ResultCache()
+        return _cache
+
+
+def cached_query(query, params=None, backend=None):
+    """run_query() through the shared disk cache, keyed by the current data version."""
+    if not RESULT_CACHE:
+        return run_query(query, params, backend)
+    key = result_key(query, params, data_version(backend))
+    return get_result_cache().get_or_compute(key, lambda: run_query(query, params, backend))
+
+
+def cached_queries(queries, backend=None):
+    """run_queries_concurrently() through the shared cache; only the misses hit the database."""
+    if not RESULT_CACHE:
+        return run_queries_concurrently(queries, backend=backend)
+
+    cache = get_result_cache()
+    version = data_version(backend)
+    keys = {name: result_key(sql, params, version) for name, (sql, params) in queries.items()}
+    results = {name: cache.get(key) for name, key in keys.items()}
+
+    missing = {name: queries[name] for name, frame in results.items() if frame is None}
+    if missing:
+        for name, frame in run_queries_concurrently(missing, backend=backend).items():
+            cache.put(keys[name], frame)
+            results[name] = frame
+    return results
+
+
+def cached_json_frame(path, records_key=None):
+    """Parse a JSON artifact into a DataFrame once per file version for every worker.
+
+    records_key picks the list of records out of an object-shaped file.
+    """
+    def parse():
+        with open(path, 'r') as f:
+            records = json.load(f)
+        return pd.DataFrame(records[records_key] if records_key else records)
+
+    if not RESULT_CACHE:
+        return parse()
+    stat = os.stat(path)
+    key = result_key(os.path.abspath(path), {'records_key': records_key}, (stat.st_mtime_ns, stat.st_size))
+    return get_result_cache().get_or_compute(key, parse)
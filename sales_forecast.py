@@ -0,0 +1,224 @@
+import os
+import json
+import time
+import logging
+import argparse
+from itertools import product
+import numpy as np
+import pandas as pd
+from dotenv import load_dotenv # type: ignore
+from database import run_query
+
+logger = logging.getLogger(__name__)
+
+BASE_PATH = os.path.dirname(os.path.abspath(__file__))
+SALES_DIR = os.path.join(BASE_PATH, 'forecasting', 'sales')
+STATE_PATH = os.path.join(SALES_DIR, 'forecast_state.json')
+HORIZONS = [7, 30]
+
+# Smoothing parameters searched on a full fit (level, trend, weekday seasonality); updates reuse the winner
+ALPHAS = [0.05, 0.1, 0.2, 0.3, 0.5]
+BETAS = [0.01, 0.05, 0.1]
+GAMMAS = [0.05, 0.1, 0.2, 0.3]
+# Trend damping, so long horizons level off instead of extrapolating the latest slope
+PHI = 0.98
+# Days used to initialise the level, trend and seasonal terms before smoothing starts
+INIT_DAYS = 14
+
+# Revenue per calendar day after the watermark
+DAILY_REVENUE_QUERY = """
+SELECT
+    saledate AS date,
+    CAST(SUM(totalprice) AS double precision) AS revenue
+FROM
+    sales
+WHERE
+    saledate > CAST(:since AS date)
+GROUP BY
+    saledate;
+"""
+
+
+def fetch_daily_revenue(since, backend=None):
+    """Revenue per calendar day after `since`, with days without sales as zero.
+
+    Read from sales rather than the daily_sales view, which adds up the
+    dashboard's rows (repeated invoice lines merged) and would understate revenue.
+    """
+    rows = run_query(DAILY_REVENUE_QUERY, params={'since': since.strftime('%Y-%m-%d')}, backend=backend)
+    if rows.empty:
+        return pd.Series(dtype=float)
+    revenue = rows.set_index(pd.to_datetime(rows['date']))['revenue'].astype(float)
+    return revenue.reindex(pd.date_range(revenue.index.min(), revenue.index.max(), freq='D'), fill_value=0.0)
+
+
+def initial_state(revenue, candidates):
+    """Starting level, trend and weekday terms from the first INIT_DAYS days, one copy per candidate."""
+    first, second = revenue.iloc[:7].mean(), revenue.iloc[7:INIT_DAYS].mean()
+    season = np.zeros(7)
+    season[revenue.index[:7].weekday] = revenue.iloc[:7].to_numpy() - first
+    return {
+        'level': np.full(candidates, first),
+        'trend': np.full(candidates, (second - first) / 7),
+        'season': np.tile(season, (candidates, 1))
+    }
+
+
+def smooth(state, params, revenue):
+    """Run damped additive Holt-Winters updates for each day of revenue.
+
+    state holds level, trend and per-weekday seasonal arrays with one row per
+    parameter set in params (alpha, beta, gamma arrays), so a grid of
+    candidates is fitted in one pass over the days. Updates state in place
+    and returns the one-step-ahead errors, days x candidates.
+    """
+    alpha, beta, gamma = params
+    level, trend, season = state['level'], state['trend'], state['season']
+    errors = np.empty((len(revenue), len(alpha)))
+
+    for day, (value, weekday) in enumerate(zip(revenue.to_numpy(), revenue.index.weekday)):
+        errors[day] = value - (level + PHI * trend + season[:, weekday])
+        previous = level
+        level = alpha * (value - season[:, weekday]) + (1 - alpha) * (previous + PHI * trend)
+        trend = beta * (level - previous) + (1 - beta) * PHI * trend
+        season[:, weekday] = gamma * (value - level) + (1 - gamma) * season[:, weekday]
+
+    state['level'], state['trend'] = level, trend
+    return errors
+
+
+def fit(revenue):
+    """Fit on the full history: every smoothing candidate at once, keeping the lowest squared error."""
+    grid = np.array(list(product(ALPHAS, BETAS, GAMMAS))).T
+    state = initial_state(revenue, grid.shape[1])
+    errors = smooth(state, grid, revenue.iloc[INIT_DAYS:])
+    best = int(np.argmin((errors ** 2).sum(axis=0)))
+    return {
+        'alpha': float(grid[0, best]),
+        'beta': float(grid[1, best]),
+        'gamma': float(grid[2, best]),
+        'level': float(state['level'][best]),
+        'trend': float(state['trend'][best]),
+        'season': state['season'][best].tolist(),
+        'last_date': revenue.index[-1].strftime('%Y-%m-%d')
+    }, errors[:, best]
+
+
+def update(model, revenue):
+    """Fold new days of revenue into a fitted model without revisiting the history."""
+    state = {
+        'level': np.array([model['level']]),
+        'trend': np.array([model['trend']]),
+        'season': np.array([model['season']])
+    }
+    params = tuple(np.array([model[name]]) for name in ('alpha', 'beta', 'gamma'))
+    errors = smooth(state, params, revenue)
+    model.update({
+        'level': float(state['level'][0]),
+        'trend': float(state['trend'][0]),
+        'season': state['season'][0].tolist(),
+        'last_date': revenue.index[-1].strftime('%Y-%m-%d')
+    })
+    return model, errors[:, 0]
+
+
+def forecast(model, days):
+    """Daily revenue predictions for the `days` days after the model's last date."""
+    dates = pd.date_range(pd.Timestamp(model['last_date']) + pd.Timedelta(days=1), periods=days, freq='D')
+    damping = np.cumsum(PHI ** np.arange(1, days + 1))
+    predicted = model['level'] + damping * model['trend'] + np.asarray(model['season'])[dates.weekday]
+    return pd.DataFrame({
+        'date': dates.strftime('%Y-%m-%d'),
+        'predicted_sales': np.maximum(predicted, 0.0),
+        'is_weekend': dates.weekday >= 5
+    })
+
+
+def write_forecasts(model, horizons=HORIZONS):
+    """Write forecast_<n>days.json and .csv for each horizon in the shapes the dashboard reads."""
+    for days in horizons:
+        predictions = forecast(model, days)
+        artifact = {
+            'metadata': {
+                'forecast_period': f'{days} days',
+                'start_date': predictions['date'].iloc[0],
+                'end_date': predictions['date'].iloc[-1],
+                'total_predicted_sales': float(predictions['predicted_sales'].sum()),
+                'average_daily_sales': float(predictions['predicted_sales'].mean())
+            },
+            'daily_predictions': predictions.to_dict(orient='records')
+        }
+        path = os.path.join(SALES_DIR, f'forecast_{days}days')
+        with open(path + '.json.tmp', 'w') as f:
+            json.dump(artifact, f, indent=4)
+        predictions.to_csv(path + '.csv.tmp', index=False)
+        os.replace(path + '.json.tmp', path + '.json')
+        os.replace(path + '.csv.tmp', path + '.csv')
+
+
+def load_state():
+    """Return the saved forecasting model, or None before the first run."""
+    if not os.path.exists(STATE_PATH):
+        return None
+    with open(STATE_PATH, 'r') as f:
+        return json.load(f)
+
+
+def refresh_forecasts(backend=None, full=False):
+    """Fold days newer than the saved model into it (or fit from scratch) and rewrite the forecasts.
+
+    A latest day of today (or later) may still be taking sales, so it is held
+    back: the model stops the day before, the next run reads that day again
+    in full, and the forecasts start with it. Earlier days are complete.
+    """
+    model = None if full else load_state()
+    since = pd.Timestamp(model['last_date']) if model else pd.Timestamp('1970-01-01')
+    revenue = fetch_daily_revenue(since, backend)
+    if model is not None and not revenue.empty:
+        # Days between the model's last date and the first new sale had no sales
+        revenue = revenue.reindex(pd.date_range(since + pd.Timedelta(days=1), revenue.index.max(), freq='D'), fill_value=0.0)
+    if not revenue.empty and revenue.index[-1] >= pd.Timestamp.today().normalize():
+        revenue = revenue.iloc[:-1]
+
+    start = time.perf_counter()
+    if model is None:
+        if len(revenue) < INIT_DAYS + 1:
+            raise ValueError(f"Need at least {INIT_DAYS + 1} days of sales to fit, found {len(revenue)}")
+        model, errors = fit(revenue)
+        # In-sample one-step errors; the last 30 days show how the chosen model tracks recent sales
+        errors = errors[-30:]
+        logger.info("Fitted on %d days in %.3fs (alpha=%.2f, beta=%.2f, gamma=%.2f)",
+                    len(revenue), time.perf_counter() - start, model['alpha'], model['beta'], model['gamma'])
+    elif revenue.empty:
+        logger.info("No complete days of sales after %s; forecasts are up to date", model['last_date'])
+        return model
+    else:
+        model, errors = update(model, revenue)
+        logger.info("Updated with %d new day(s) in %.3fs", len(revenue), time.perf_counter() - start)
+
+    actual = revenue.iloc[-len(errors):].to_numpy()
+    mae = float(np.abs(errors).mean())
+    logger.info("One-step error over the last %d day(s): MAE %.2f (%.1f%% of mean daily revenue), RMSE %.2f",
+                len(errors), mae, 100 * mae / max(actual.mean(), 1e-9), float(np.sqrt((errors ** 2).mean())))
+
+    write_forecasts(model)
+    with open(STATE_PATH, 'w') as f:
+        json.dump(model, f, indent=4)
+    logger.info("Wrote %s-day forecasts from %s", '/'.join(map(str, HORIZONS)), model['last_date'])
+    return model
+
+
+def main():
+    """Refresh the sales forecasting artifacts from the daily revenue series."""
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument('--full', action='store_true', help='Refit on the full history instead of updating the saved model')
+    parser.add_argument('--backend', help="Data backend to read from ('postgres' or 'duckdb'; default DATA_BACKEND)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    load_dotenv()
+    refresh_forecasts(args.backend, full=args.full)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,8 @@
 import os
+import time
+import json
+import argparse
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
 import subprocess
 import logging
@@ -17,6 +21,23 @@ logging.basicConfig(
 # Load environment variables
 load_dotenv()
 
+DUMP_FILE = 'OnlineRetaildb.sql'
+
+# pg_restore sections in restore order: schema, table data, then indexes, constraints and triggers
+RESTORE_SECTIONS = ['pre-data', 'data', 'post-data']
+
+# Tables checked after a restore; partitioned ones are checked partition by partition
+TABLES = ['customer', 'product', 'sales', 'time']
+
+# Order-independent content checksum: the sum of each row's md5 truncated to 64 bits
+CHECKSUM_QUERY = """
+SELECT COUNT(*), COALESCE(SUM(('x' || left(md5(t::text), 16))::bit(64)::bigint), 0)::text
+FROM ONLY "{relation}" t
+"""
+
+# Fast-path row counts may lag or be estimates; relative difference tolerated against the manifest
+FAST_TOLERANCE = 0.01
+
 def get_connection_string():
     """Create PostgreSQL connection string from environment variables."""
     try:
@@ -33,89 +54,358 @@ def get_connection_string():
         logging.error(f"Error creating connection string: {str(e)}")
         return None
 
-def restore_database():
-    """Restore database from dump file using pg_restore."""
+def default_jobs():
+    """Number of parallel pg_restore jobs: one per core available to this process."""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+def run_pg_restore(conn_string, dump_path, options):
+    """Run pg_restore with the common options and return the completed process."""
+    command = [
+        'pg_restore',
+        '--no-owner',  # Skip object ownership
+        '--no-privileges',  # Skip restoration of access privileges (grant/revoke)
+        '--no-comments',    # Do not output commands to restore comments
+        *options,
+        '-d', conn_string,  # Connection string
+        dump_path  # Input file, or directory for directory-format dumps
+    ]
+    return subprocess.run(command, capture_output=True, text=True)
+
+def clean_database(conn_string, dump_path):
+    """Drop the dump's existing objects before restoring it; return the number of failed drops.
+
+    These are the DROP statements of pg_restore's own clean script (they come
+    before any CREATE), run ahead of the restore: pg_restore --clean only drops
+    objects in the sections being restored, and pre-data tables can't be
+    dropped while post-data foreign keys still reference them. As in
+    pg_restore, a failing drop is skipped; a partition's index, for example,
+    goes away with its parent's.
+    """
+    import psycopg2
+
+    script = subprocess.run(
+        ['pg_restore', '--clean', '--if-exists', '--schema-only', '-f', '-', dump_path],
+        capture_output=True, text=True, check=True
+    ).stdout
+
+    settings, drops = [], []
+    for line in script.splitlines():
+        if line.startswith('CREATE '):
+            break
+        if line.startswith(('SET ', 'SELECT pg_catalog.set_config')):
+            settings.append(line)
+        elif line.startswith('DROP ') or (line.startswith('ALTER ') and ' DROP ' in line):
+            drops.append(line)
+
+    failed = 0
+    conn = psycopg2.connect(conn_string)
+    conn.autocommit = True
+    try:
+        with conn.cursor() as cur:
+            cur.execute('\n'.join(settings))
+            for statement in drops:
+                try:
+                    cur.execute(statement)
+                except psycopg2.Error as e:
+                    failed += 1
+                    logging.debug(f"Skipped {statement} ({str(e).strip()})")
+    finally:
+        conn.close()
+    return failed
+
+def restore_database(dump_path=DUMP_FILE, jobs=1, phased=False):
+    """Restore database from dump file using pg_restore.
+
+    With jobs > 1, pg_restore loads tables and builds indexes in parallel;
+    that needs a directory-format dump (or a seekable custom-format file).
+    With phased, the schema, the data and the indexes and constraints are
+    restored as separate pg_restore runs, each timed in the log.
+    """
     try:
         conn_string = get_connection_string()
         if not conn_string:
             return False
 
-        # Construct pg_restore command
-        command = [
-            'pg_restore',
-            '--no-owner',  # Skip object ownership
-            '--clean',     # Clean (drop) database objects before recreating
-            '--if-exists', # Add IF EXISTS to DROP commands
-            '--no-privileges',  # Skip restoration of access privileges (grant/revoke)
-            '--no-comments',    # Do not output commands to restore comments
-            '-d', conn_string,  # Connection string
-            'OnlineRetaildb.sql'  # Input file
-        ]
-
-        # Execute pg_restore
-        result = subprocess.run(
-            command,
-            capture_output=True,
-            text=True
-        )
+        parallel = [f'--jobs={jobs}'] if jobs > 1 else []
+        logging.info(f"Restoring {dump_path} with {jobs} job(s)" + (" in phases" if phased else ""))
+        total_start = time.perf_counter()
 
-        if result.returncode == 0:
-            logging.info("Database restored successfully")
-            return True
+        # Clean (drop) database objects before recreating
+        start = time.perf_counter()
+        skipped = clean_database(conn_string, dump_path)
+        logging.info(f"Dropped existing objects in {time.perf_counter() - start:.1f}s"
+                     + (f" ({skipped} drop(s) skipped)" if skipped else ""))
+
+        if phased:
+            phases = [(section, [f'--section={section}'] + parallel) for section in RESTORE_SECTIONS]
         else:
-            logging.error(f"Error restoring database: {result.stderr}")
-            return False
+            phases = [('all', parallel)]
+
+        for phase, options in phases:
+            start = time.perf_counter()
+            result = run_pg_restore(conn_string, dump_path, options)
+            if result.returncode != 0:
+                logging.error(f"Error restoring database ({phase}): {result.stderr}")
+                return False
+            logging.info(f"Restored {phase} in {time.perf_counter() - start:.1f}s")
+
+        logging.info(f"Database restored successfully in {time.perf_counter() - total_start:.1f}s")
+        return True
 
     except Exception as e:
         logging.error(f"Error in restore_database: {str(e)}")
         return False
 
-def verify_restore():
-    """Verify that the database was restored correctly."""
-    try:
-        import psycopg2
-
-        # Create connection
-        conn = psycopg2.connect(
-            host=os.getenv('DB_HOST'),
-            port=os.getenv('DB_PORT'),
-            dbname=os.getenv('DB_NAME'),
-            user=os.getenv('DB_USER'),
-            password=os.getenv('DB_PASSWORD'),
-            sslmode='require'
+def connect_db():
+    """Open a psycopg2 connection from the DB_* environment variables."""
+    import psycopg2
+
+    return psycopg2.connect(
+        host=os.getenv('DB_HOST'),
+        port=os.getenv('DB_PORT'),
+        dbname=os.getenv('DB_NAME'),
+        user=os.getenv('DB_USER'),
+        password=os.getenv('DB_PASSWORD'),
+        sslmode=os.getenv('DB_SSLMODE', 'require')
+    )
+
+def manifest_path(dump_path):
+    """Manifest written next to a dump file or directory."""
+    return dump_path.rstrip('/') + '.manifest.json'
+
+def table_relations(cur):
+    """Map each table to the relations holding its rows: its partitions, or the table itself."""
+    relations = {}
+    for table in TABLES:
+        cur.execute(
+            "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+            "WHERE i.inhparent = to_regclass(%s) ORDER BY c.relname",
+            (table,)
         )
+        partitions = [row[0] for row in cur.fetchall()]
+        relations[table] = partitions or [table]
+    return relations
 
-        # Create cursor
-        cur = conn.cursor()
+def relation_checksum(relation, snapshot=None):
+    """Row count and content checksum of one relation, on its own connection."""
+    conn = connect_db()
+    try:
+        if snapshot:
+            conn.set_session(isolation_level='REPEATABLE READ')
+        with conn.cursor() as cur:
+            if snapshot:
+                cur.execute("SET TRANSACTION SNAPSHOT %s", (snapshot,))
+            cur.execute(CHECKSUM_QUERY.format(relation=relation))
+            rows, checksum = cur.fetchone()
+        return {'rows': rows, 'checksum': checksum}
+    finally:
+        conn.close()
 
-        # List of tables to verify
-        tables = ['customer', 'product', 'sales', 'time']
+def checksum_tables(relations, workers, snapshot=None):
+    """Count and checksum every relation concurrently; return {table: {rows, checksum, partitions}}.
 
-        for table in tables:
-            try:
-                cur.execute(f"SELECT COUNT(*) FROM {table}")
-                count = cur.fetchone()[0]
-                logging.info(f"Table {table} has {count} records")
-            except Exception as e:
-                logging.error(f"Error verifying table {table}: {str(e)}")
+    A partitioned table's totals add up its partitions' (the checksum is a sum,
+    so it doesn't depend on how rows are spread across partitions).
+    """
+    names = [relation for table in TABLES for relation in relations[table]]
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        results = dict(zip(names, pool.map(lambda relation: relation_checksum(relation, snapshot), names)))
 
-        cur.close()
+    tables = {}
+    for table in TABLES:
+        parts = {relation: results[relation] for relation in relations[table]}
+        tables[table] = {
+            'rows': sum(part['rows'] for part in parts.values()),
+            'checksum': str(sum(int(part['checksum']) for part in parts.values()))
+        }
+        if relations[table] != [table]:
+            tables[table]['partitions'] = parts
+    return tables
+
+def catalog_counts(cur, relations):
+    """Row counts of every relation from the statistics collector, or planner estimates when it has none.
+
+    A freshly restored relation has neither (n_live_tup 0, reltuples -1), so
+    relations that have never been analyzed are analyzed first; ANALYZE
+    samples rather than scans, which keeps this the fast path.
+    """
+    names = [relation for table in TABLES for relation in relations[table]]
+    cur.execute(
+        "SELECT r.name FROM unnest(%s::text[]) r(name) "
+        "JOIN pg_class c ON c.oid = to_regclass(r.name) WHERE c.reltuples < 0",
+        (names,)
+    )
+    for (relation,) in cur.fetchall():
+        cur.execute(f"ANALYZE {relation}")
+    cur.execute(
+        "SELECT r.name, s.n_live_tup, c.reltuples::bigint "
+        "FROM unnest(%s::text[]) r(name) "
+        "LEFT JOIN pg_class c ON c.oid = to_regclass(r.name) "
+        "LEFT JOIN pg_stat_user_tables s ON s.relid = c.oid",
+        (names,)
+    )
+    counts = {name: (live or max(estimate or 0, 0)) for name, live, estimate in cur.fetchall()}
+
+    tables = {}
+    for table in TABLES:
+        tables[table] = {'rows': sum(counts[relation] for relation in relations[table])}
+        if relations[table] != [table]:
+            tables[table]['partitions'] = {relation: {'rows': counts[relation]} for relation in relations[table]}
+    return tables
+
+def dump_database(dump_path=DUMP_FILE, jobs=1):
+    """Dump the database with pg_dump and write its verification manifest alongside.
+
+    Directory-format dumps (paths without an extension) are written with jobs
+    parallel workers. The dump and the manifest read the same exported snapshot,
+    so the manifest describes exactly what was dumped.
+    """
+    conn_string = get_connection_string()
+    if not conn_string:
+        return False
+
+    directory = not os.path.splitext(dump_path)[1]
+    command = ['pg_dump', '--format=directory' if directory else '--format=custom', '-f', dump_path]
+    if directory and jobs > 1:
+        command.append(f'--jobs={jobs}')
+
+    conn = connect_db()
+    try:
+        conn.set_session(isolation_level='REPEATABLE READ')
+        with conn.cursor() as cur:
+            cur.execute("SELECT pg_export_snapshot()")
+            snapshot = cur.fetchone()[0]
+            relations = table_relations(cur)
+
+            start = time.perf_counter()
+            result = subprocess.run(command + [f'--snapshot={snapshot}', conn_string], capture_output=True, text=True)
+            if result.returncode != 0:
+                logging.error(f"Error dumping database: {result.stderr}")
+                return False
+            logging.info(f"Dumped database to {dump_path} in {time.perf_counter() - start:.1f}s")
+
+            start = time.perf_counter()
+            manifest = {
+                'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                'tables': checksum_tables(relations, jobs, snapshot)
+            }
+        conn.rollback()
+    finally:
         conn.close()
 
+    with open(manifest_path(dump_path), 'w') as f:
+        json.dump(manifest, f, indent=4)
+    logging.info(f"Wrote {manifest_path(dump_path)} in {time.perf_counter() - start:.1f}s")
+    return True
+
+def compare_counts(expected, actual, tolerance=0):
+    """Mismatches between manifest entries and verified ones, as readable strings."""
+    mismatches = []
+    for table, entry in expected.items():
+        found = actual.get(table)
+        if found is None:
+            mismatches.append(f"{table}: missing")
+            continue
+        for relation, part in {table: entry, **entry.get('partitions', {})}.items():
+            got = found if relation == table else found.get('partitions', {}).get(relation)
+            if got is None:
+                mismatches.append(f"{relation}: missing partition of {table}")
+            elif abs(got['rows'] - part['rows']) > tolerance * part['rows']:
+                mismatches.append(f"{relation}: {got['rows']} rows, expected {part['rows']}")
+            elif 'checksum' in got and got['checksum'] != part['checksum']:
+                mismatches.append(f"{relation}: checksum differs")
+        for relation in set(found.get('partitions', {})) - set(entry.get('partitions', {})):
+            mismatches.append(f"{relation}: partition of {table} not in the manifest")
+    return mismatches
+
+def verify_restore(dump_path=DUMP_FILE, thorough=False, workers=1):
+    """Verify that the database was restored correctly; return True when nothing mismatches.
+
+    The fast path compares catalog row counts (statistics, no table scans)
+    with the dump's manifest. The thorough path counts and checksums every
+    table and partition, workers at a time, and compares both exactly. Without
+    a manifest the counts are only logged, and empty tables reported.
+    """
+    try:
+        start = time.perf_counter()
+        manifest = None
+        if os.path.exists(manifest_path(dump_path)):
+            with open(manifest_path(dump_path), 'r') as f:
+                manifest = json.load(f)['tables']
+        else:
+            logging.warning(f"No manifest at {manifest_path(dump_path)}; only checking tables are present and non-empty")
+
+        conn = connect_db()
+        try:
+            with conn.cursor() as cur:
+                relations = table_relations(cur)
+                if not thorough:
+                    tables = catalog_counts(cur, relations)
+        finally:
+            conn.close()
+        if thorough:
+            tables = checksum_tables(relations, workers)
+
+        for table, entry in tables.items():
+            logging.info(f"Table {table} has {'' if thorough else '~'}{entry['rows']} records"
+                         + (f" in {len(entry['partitions'])} partitions" if 'partitions' in entry else ""))
+
+        if manifest is not None:
+            mismatches = compare_counts(manifest, tables, 0 if thorough else FAST_TOLERANCE)
+        else:
+            mismatches = [f"{table}: empty" for table, entry in tables.items() if not entry['rows']]
+        for mismatch in mismatches:
+            logging.error(f"Verification mismatch: {mismatch}")
+
+        logging.info(f"{'Thorough' if thorough else 'Fast'} verification of {sum(map(len, relations.values()))} "
+                     f"relations took {time.perf_counter() - start:.1f}s: {len(mismatches)} mismatch(es)")
+        return not mismatches
+
     except Exception as e:
         logging.error(f"Error verifying restore: {str(e)}")
+        return False
 
 def main():
     """Main function to coordinate database restoration process."""
+    parser = argparse.ArgumentParser(description="Restore the OnlineRetail database from a pg_dump archive.")
+    parser.add_argument('--dump', default=DUMP_FILE, help='Custom-format dump file or directory-format dump')
+    parser.add_argument('--jobs', type=int, help='Parallel restore jobs (default: one per core for directory dumps, else 1)')
+    parser.add_argument('--phased', action='store_true', help='Restore schema, data and indexes/constraints as separate timed phases')
+    parser.add_argument('--verify', choices=['fast', 'thorough'], default='fast',
+                        help='fast: catalog row counts; thorough: exact counts and checksums per table and partition')
+    parser.add_argument('--verify-only', action='store_true', help='Verify the current database against the manifest without restoring')
+    parser.add_argument('--create-dump', action='store_true',
+                        help='Dump the database to --dump (a directory when it has no extension) with a manifest, instead of restoring')
+    args = parser.parse_args()
+
+    directory = os.path.isdir(args.dump) or (args.create_dump and not os.path.splitext(args.dump)[1])
+    jobs = args.jobs or (default_jobs() if directory else 1)
+    thorough = args.verify == 'thorough'
+
     try:
+        if args.create_dump:
+            logging.info("Starting database dump...")
+            if not dump_database(args.dump, jobs=jobs):
+                logging.error("Database dump failed")
+            return
+
+        if args.verify_only:
+            verify_restore(args.dump, thorough=thorough, workers=args.jobs or default_jobs())
+            return
+
         logging.info("Starting database restoration process...")
 
         # Restore database
-        if restore_database():
+        if restore_database(args.dump, jobs=jobs, phased=args.phased):
             # Verify restoration
             logging.info("Verifying database restoration...")
-            verify_restore()
-            logging.info("Database restoration process completed successfully")
+            if verify_restore(args.dump, thorough=thorough, workers=args.jobs or default_jobs()):
+                logging.info("Database restoration process completed successfully")
+            else:
+                logging.error("Database restoration verification failed")
         else:
             logging.error("Database restoration failed")
 
@@ -123,4 +413,4 @@ def main():
         logging.error(f"Error in main process: {str(e)}")
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    main()
@@ -0,0 +1,308 @@
+import os
+import json
+import logging
+import argparse
+import numpy as np
+import pandas as pd
+from sqlalchemy import text # type: ignore
+from dotenv import load_dotenv # type: ignore
+from database import create_db_engine, matviews_enabled
+
+logger = logging.getLogger(__name__)
+
+BASE_PATH = os.path.dirname(os.path.abspath(__file__))
+CUSTOMER_DIR = os.path.join(BASE_PATH, 'forecasting', 'customer')
+STATE_PATH = os.path.join(CUSTOMER_DIR, 'segmentation_state.json')
+
+FEATURES = ['total_sales', 'order_frequency']
+# Segment names ordered from the lowest to the highest total_sales centroid
+SEGMENT_LABELS = ['Low-Value Customers', 'Moderate-Value Customers', 'High-Value Customers']
+
+# Per-customer totals for sales lines loaded after the watermark. saleid follows load order, so
+# lines loaded late for an old invoice time, or for the watermark's own minute, are still picked up
+CUSTOMER_DELTA_QUERY = """
+SELECT
+    customerid,
+    SUM(totalprice)::float AS total_sales,
+    COUNT(*)::integer AS order_frequency,
+    MAX(saleid) AS last_saleid
+FROM
+    sales
+WHERE
+    saleid > :watermark
+GROUP BY
+    customerid;
+"""
+
+
+# Every customer's totals, precomputed by the customer_summary materialized view
+CUSTOMER_SUMMARY_QUERY = """
+SELECT
+    customerid,
+    total_sales,
+    order_frequency,
+    last_saleid
+FROM
+    customer_summary;
+"""
+
+
+def fetch_customer_deltas(engine, watermark=0):
+    """Aggregate total_sales and order_frequency per customer for sales lines with saleid above `watermark`."""
+    # A full rebuild reads the view the load pipeline keeps current instead of scanning all of sales;
+    # its last_saleid covers exactly the lines it summarises, so lines loaded since are picked up next run
+    query = CUSTOMER_SUMMARY_QUERY if watermark == 0 and matviews_enabled('postgres') else CUSTOMER_DELTA_QUERY
+    with engine.connect() as connection:
+        deltas = pd.read_sql_query(text(query), connection, params={'watermark': watermark})
+    deltas['customerid'] = deltas['customerid'].astype(int)
+    return deltas
+
+
+def scale(values, state):
+    """Standardise feature rows with the scaling fixed when the model was bootstrapped."""
+    return (values - np.asarray(state['mean'])) / np.asarray(state['std'])
+
+
+def nearest_centroid(points, centroids):
+    """Index of the closest centroid for every row of points."""
+    distances = ((points[:, None, :] - centroids[None, :, :]) ** 2).sum(axis=2)
+    return distances.argmin(axis=1)
+
+
+def kmeans_plus_plus(points, k, rng):
+    """Pick k well-spread starting centroids (k-means++ seeding)."""
+    centroids = [points[rng.integers(len(points))]]
+    for _ in range(1, k):
+        distances = ((points[:, None, :] - np.asarray(centroids)[None, :, :]) ** 2).sum(axis=2).min(axis=1)
+        probabilities = distances / distances.sum() if distances.sum() > 0 else None
+        centroids.append(points[rng.choice(len(points), p=probabilities)])
+    return np.asarray(centroids, dtype=float)
+
+
+def partial_fit(centroids, counts, batch):
+    """Apply one mini-batch k-means step, moving each centroid by a per-cluster learning rate."""
+    assignments = nearest_centroid(batch, centroids)
+    for cluster in np.unique(assignments):
+        members = batch[assignments == cluster]
+        counts[cluster] += len(members)
+        # Equivalent to Sculley's 1/count step applied to every member of the batch
+        centroids[cluster] += (members.sum(axis=0) - len(members) * centroids[cluster]) / counts[cluster]
+    return centroids, counts
+
+
+def move_points(centroids, counts, old_points, old_clusters, new_points):
+    """Replace customers' points in the model and return (centroids, counts, new clusters).
+
+    Each centroid is the exact mean of the counts[c] points assigned to it, so
+    a customer's old point is subtracted from its cluster before the updated
+    one is added to the nearest centroid; a repeat buyer stays one point.
+    """
+    counts = counts.copy()
+    sums = centroids * counts[:, None]
+    np.subtract.at(sums, old_clusters, old_points)
+    np.subtract.at(counts, old_clusters, 1)
+    clusters = nearest_centroid(new_points, centroids)
+    np.add.at(sums, clusters, new_points)
+    np.add.at(counts, clusters, 1)
+
+    centroids = centroids.copy()
+    occupied = counts > 0
+    centroids[occupied] = sums[occupied] / counts[occupied, None]
+    return centroids, counts, clusters
+
+
+def segment_labels(centroids):
+    """Map cluster indexes to segment names ordered by their total_sales centroid."""
+    order = np.argsort(centroids[:, 0])
+    names = SEGMENT_LABELS if len(centroids) == len(SEGMENT_LABELS) else [f'Segment {i + 1}' for i in range(len(centroids))]
+    return {int(cluster): names[rank] for rank, cluster in enumerate(order)}
+
+
+def bootstrap(customers, k=3, batch_size=1024, passes=5, seed=0):
+    """Fit the initial model from scratch with mini-batches over the full customer table.
+
+    Returns (state, assignments). The mini-batch centroids are finished with
+    one assignment pass, so the saved centroids and counts are the exact means
+    and sizes of the clusters the customers are assigned to, which is what
+    move_points() keeps up to date.
+    """
+    features = customers[FEATURES].to_numpy(dtype=float)
+    std = features.std(axis=0)
+    state = {'mean': features.mean(axis=0).tolist(), 'std': np.where(std > 0, std, 1.0).tolist()}
+    points = scale(features, state)
+
+    rng = np.random.default_rng(seed)
+    sample = points[rng.choice(len(points), size=min(len(points), 10000), replace=False)]
+    centroids = kmeans_plus_plus(sample, k, rng)
+    counts = np.zeros(k)
+
+    for _ in range(passes):
+        order = rng.permutation(len(points))
+        for start in range(0, len(points), batch_size):
+            centroids, counts = partial_fit(centroids, counts, points[order[start:start + batch_size]])
+
+    assignments = nearest_centroid(points, centroids)
+    counts = np.bincount(assignments, minlength=k).astype(float)
+    for cluster in np.flatnonzero(counts):
+        centroids[cluster] = points[assignments == cluster].mean(axis=0)
+
+    state.update({'centroids': centroids.tolist(), 'counts': counts.tolist()})
+    return state, assignments
+
+
+def merge_deltas(customers, deltas):
+    """Add per-customer deltas to the cumulative totals; both features are additive."""
+    return (
+        pd.concat([customers[['customerid'] + FEATURES], deltas[['customerid'] + FEATURES]])
+        .groupby('customerid', as_index=False)[FEATURES].sum()
+        .round({'total_sales': 2})
+    )
+
+
+def segment_summaries(customers, bins=30, top_k=10):
+    """Precompute each segment's headline metrics, histogram bins and top customers."""
+    summaries = {}
+    for label, segment in customers.groupby('Cluster Label'):
+        summaries[label] = {
+            'count': len(segment),
+            'avg_sales': segment['total_sales'].mean(),
+            'avg_frequency': segment['order_frequency'].mean(),
+            'histograms': {feature: np.histogram(segment[feature], bins=bins) for feature in FEATURES},
+            'top_customers': segment.nlargest(top_k, 'total_sales')
+        }
+    return summaries
+
+
+def load_customers():
+    """Read the per-customer totals from the current scatter artifact."""
+    with open(os.path.join(CUSTOMER_DIR, 'scatter_plot_data.json'), 'r') as f:
+        return pd.DataFrame(json.load(f)['data'])
+
+
+def load_state():
+    """Return the saved segmentation model state, or None before the first run."""
+    if not os.path.exists(STATE_PATH):
+        return None
+    with open(STATE_PATH, 'r') as f:
+        return json.load(f)
+
+
+def write_artifacts(customers):
+    """Write the scatter, pie and bar JSON artifacts in the shapes the dashboard reads."""
+    counts = customers['Cluster Label'].value_counts()
+    legend = customers['Cluster Label'].unique().tolist()
+
+    scatter = {
+        'data': customers[['customerid', 'total_sales', 'order_frequency', 'Cluster Label']].to_dict(orient='records'),
+        'chart_type': 'scatter',
+        'x_axis': 'total_sales',
+        'y_axis': 'order_frequency',
+        'legend': legend
+    }
+    pie = {
+        'data': [{'label': label, 'value': int(value)} for label, value in counts.items()],
+        'chart_type': 'pie',
+        'title': 'Customer Segmentation Proportions'
+    }
+    bar = {
+        'data': {label: int(value) for label, value in counts.items()},
+        'chart_type': 'bar',
+        'x_axis': 'Customer Segments',
+        'y_axis': 'Number of Customers'
+    }
+
+    for name, artifact in [('scatter_plot_data.json', scatter), ('pie_chart_data.json', pie), ('bar_chart_data.json', bar)]:
+        path = os.path.join(CUSTOMER_DIR, name)
+        with open(path + '.tmp', 'w') as f:
+            json.dump(artifact, f, indent=4)
+        os.replace(path + '.tmp', path)
+
+
+def refresh_segments(engine, full=False, k=3):
+    """Fold sales loaded after the saved watermark into the segments and rewrite the artifacts."""
+    state = None if full else load_state()
+    if state is not None and not isinstance(state.get('watermark'), int):
+        # Older states kept an invoice timestamp, which can't be mapped to a load position
+        logger.info("Saved watermark %r predates load-order watermarks; rebuilding", state.get('watermark'))
+        state = None
+
+    if state is not None:
+        previous = load_customers()
+        if sum(state['counts']) != len(previous):
+            # Older states counted every mini-batch update rather than the customers in each cluster
+            logger.info("Saved cluster sizes don't match the %d segmented customers; rebuilding", len(previous))
+            state = None
+
+    if state is None:
+        # First run: aggregate every sale once and fit the model from scratch
+        deltas = fetch_customer_deltas(engine)
+        if deltas.empty:
+            logger.info("No sales to segment yet; nothing written")
+            return deltas[['customerid'] + FEATURES]
+        # Rounded as the artifacts store them, so a later update subtracts exactly the point fitted here
+        customers = deltas[['customerid'] + FEATURES].round({'total_sales': 2})
+        state, assignments = bootstrap(customers, k=k)
+        changed = customers
+    else:
+        deltas = fetch_customer_deltas(engine, state['watermark'])
+        if deltas.empty:
+            logger.info("No sales loaded after saleid %d; segments are up to date", state['watermark'])
+            return previous[['customerid'] + FEATURES]
+
+        # New invoice lines are merged without rescanning history
+        customers = merge_deltas(previous, deltas)
+        touched = customers['customerid'].isin(deltas['customerid']).to_numpy()
+        changed = customers[touched]
+        before = previous[previous['customerid'].isin(deltas['customerid'])]
+
+        # The saved labels were named from the saved centroids, so they map back to cluster indexes
+        centroids = np.asarray(state['centroids'], dtype=float)
+        clusters = {label: cluster for cluster, label in segment_labels(centroids).items()}
+        centroids, counts, moved = move_points(
+            centroids,
+            np.asarray(state['counts'], dtype=float),
+            scale(before[FEATURES].to_numpy(dtype=float), state),
+            before['Cluster Label'].map(clusters).to_numpy(dtype=int),
+            scale(changed[FEATURES].to_numpy(dtype=float), state)
+        )
+        state.update({'centroids': centroids.tolist(), 'counts': counts.tolist()})
+
+        # Untouched customers keep their cluster, so the centroids stay the means of their members
+        assignments = customers['customerid'].map(
+            previous.set_index('customerid')['Cluster Label'].map(clusters)
+        ).to_numpy()
+        assignments[touched] = moved
+        assignments = assignments.astype(int)
+
+    labels = segment_labels(np.asarray(state['centroids']))
+    customers = customers.assign(**{'Cluster Label': [labels[int(c)] for c in assignments]})
+    customers['order_frequency'] = customers['order_frequency'].astype(int)
+
+    state['watermark'] = int(deltas['last_saleid'].max())
+    write_artifacts(customers)
+    with open(STATE_PATH, 'w') as f:
+        json.dump(state, f, indent=4)
+
+    logger.info("Updated %d of %d customers; watermark now %s", len(changed), len(customers), state['watermark'])
+    return customers
+
+
+def main():
+    """Refresh the customer segmentation artifacts from the sales table."""
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument('--full', action='store_true', help='Rebuild the model from the full sales history')
+    parser.add_argument('--clusters', type=int, default=3, help='Number of segments when rebuilding')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    load_dotenv()
+
+    engine = create_db_engine()
+    try:
+        refresh_segments(engine, full=args.full, k=args.clusters)
+    finally:
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
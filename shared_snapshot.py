@@ -0,0 +1,93 @@
+import os
+import glob
+import fcntl
+import hashlib
+import logging
+import tempfile
+import pandas as pd
+from perf import span
+
+logger = logging.getLogger(__name__)
+
+# Publish loaded frames once per host and map them read-only in every server process
+SHARED_SNAPSHOT = os.getenv('SHARED_SNAPSHOT', 'true').lower() in ('1', 'true', 'yes')
+SHARED_SNAPSHOT_DIR = os.getenv(
+    'SHARED_SNAPSHOT_DIR',
+    os.path.join('/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir(), 'retail-dashboard')
+)
+
+
+def snapshot_path(name, version):
+    """File holding version `version` of the frame called `name`."""
+    digest = hashlib.sha256(str(version).encode('utf-8')).hexdigest()[:16]
+    return os.path.join(SHARED_SNAPSHOT_DIR, f'{name}-{digest}.arrow')
+
+
+def publish(name, version, build):
+    """Write build()'s frame as an Arrow IPC file unless another process already has.
+
+    An exclusive flock per name makes concurrent first loads build once; the
+    others wait and then attach. The version just superseded is kept, since
+    another process may hold its path from its own publish() and not have
+    attached yet; older ones are unlinked, which is safe because processes
+    still mapping them keep the pages until they let go.
+    """
+    import pyarrow as pa # type: ignore
+
+    path = snapshot_path(name, version)
+    if os.path.exists(path):
+        return path
+
+    os.makedirs(SHARED_SNAPSHOT_DIR, exist_ok=True)
+    with open(os.path.join(SHARED_SNAPSHOT_DIR, f'{name}.lock'), 'w') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            if not os.path.exists(path):
+                table = pa.Table.from_pandas(build(), preserve_index=False)
+                with pa.OSFile(path + '.tmp', 'wb') as sink:
+                    with pa.ipc.new_file(sink, table.schema) as writer:
+                        writer.write_table(table)
+                os.replace(path + '.tmp', path)
+                logger.info("Published %s (%d rows) to %s", name, table.num_rows, path)
+
+                older = [old for old in glob.glob(os.path.join(SHARED_SNAPSHOT_DIR, f'{name}-*.arrow')) if old != path]
+                for old in sorted(older, key=os.path.getmtime, reverse=True)[1:]:
+                    os.remove(old)
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+    return path
+
+
+def attach(path):
+    """Map a published snapshot read-only as a DataFrame backed by the shared pages.
+
+    Numeric and datetime columns become NumPy views onto the mapping, and text
+    columns stay Arrow-backed (string[pyarrow]) instead of being copied into
+    per-process Python str objects.
+    """
+    import pyarrow as pa # type: ignore
+
+    # The mapping stays alive as long as any column still references it
+    table = pa.ipc.open_file(pa.memory_map(path, 'r')).read_all()
+    string_dtype = pd.StringDtype('pyarrow')
+    return table.to_pandas(
+        split_blocks=True,
+        types_mapper=lambda arrow_type: string_dtype if arrow_type == pa.string() else None
+    )
+
+
+def shared_frame(name, version, build):
+    """Return the host-wide shared copy of a frame, building and publishing it on first use."""
+    if not SHARED_SNAPSHOT:
+        return build()
+    for attempt in range(2):
+        with span('shared_snapshot.publish', name=name):
+            path = publish(name, version, build)
+        try:
+            with span('shared_snapshot.attach', name=name):
+                return attach(path)
+        except FileNotFoundError:
+            # Two newer versions were published between publish() and attach(); publish this one again
+            if attempt:
+                raise
+            logger.info("Snapshot %s was pruned before it could be attached; publishing it again", path)
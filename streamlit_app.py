@@ -1,120 +1,181 @@
 from streamlit_option_menu import option_menu # type: ignore
 import streamlit as st # type: ignore
 import pandas as pd # type: ignore
-import matplotlib.pyplot as plt # type: ignore
-import plotly.express as px # type: ignore
-from sqlalchemy import create_engine, text # type: ignore
 from dotenv import load_dotenv # type: ignore
 import os
 import json
-import urllib.parse
+from datetime import datetime
+from figure_cache import FigureCache, figure_key
+from shared_snapshot import shared_frame
+from aggregates import CountryRollup, LiveAggregates, insights_summary, profile_dataset, live_overview_metrics
+from perf import PERF_TRACE_FILE, span, start_trace, end_trace, export_chrome_trace
+
+# Plotting and database libraries are imported by the pages that use them,
+# so the first render doesn't wait on them
 
 # Load environment variables
 load_dotenv()
 
+# Live mode (Postgres): pages fold in sales lines loaded since their snapshot, such as the batches
+# ingest.py loads, polling at most every LIVE_POLL_SECONDS and rebuilding from the database every
+# LIVE_REBUILD_SECONDS to settle the distinct counts batches can only approximate
+LIVE_DASHBOARD = os.getenv('LIVE_DASHBOARD', 'false').lower() in ('1', 'true', 'yes')
+LIVE_POLL_SECONDS = float(os.getenv('LIVE_POLL_SECONDS', '5'))
+LIVE_REBUILD_SECONDS = int(os.getenv('LIVE_REBUILD_SECONDS', '900'))
+
 # Set Page Configuration
 st.set_page_config(page_title="Retail Store Visualization", page_icon="🏪", layout="wide")
 
 st.markdown('<style>div.block-container{padding-top:1rem;}</style>', unsafe_allow_html=True)
 
-def create_connection():
-    try:    
-        # Get Supabase credentials from environment variables
-        db_host = os.getenv('DB_HOST')
-        db_port = os.getenv('DB_PORT', '5432')
-        db_name = os.getenv('DB_NAME', 'postgres')
-        db_user = os.getenv('DB_USER', 'postgres')
-        db_pass = os.getenv('DB_PASSWORD')
-
-        # Create connection URL with proper encoding and SSL
-        DATABASE_URL = f"postgresql://{db_user}:{urllib.parse.quote_plus(db_pass)}@{db_host}:{db_port}/{db_name}"
-        
-        # Create SQLAlchemy engine with SSL requirement
-        engine = create_engine(
-            DATABASE_URL,
-            connect_args={
-                'sslmode': 'require',
-                'client_encoding': 'utf8'
-            }
-        )
-        
-        return engine
+@st.cache_resource(ttl=600)  # Cache for 10 minutes; one read-only frame shared by all sessions
+def load_data(query):
+    from database import data_version
+    from result_cache import cached_query
+
+    try:
+        def build():
+            # Execute the main query on the configured backend (Postgres, or DuckDB over Parquet),
+            # reusing the result another worker already cached for this data version.
+            # The query returns the date column itself, so nothing is rebuilt here.
+            return cached_query(query)
+
+        # Every server process on the host maps the same published copy
+        data = shared_frame('dashboard', (query, data_version()), build)
+
+        # Tag the snapshot so derived results can be cached against it
+        data.attrs['snapshot_version'] = datetime.now().isoformat()
+        return data
     except Exception as e:
-        st.error(f"Error creating database connection: {e}")
+        st.error(f"Error reading from database: {e}")
+        return pd.DataFrame()
+
+@st.cache_data(ttl=600)
+def load_overview_metrics(start, end, previous_start):
+    """Fetch the Overview KPIs, trend and top lists with one concurrent batch of queries."""
+    from page_queries import overview_metrics
+    return overview_metrics(start, end, previous_start)
+
+@st.cache_resource
+def get_figure_cache():
+    return FigureCache(max_size=int(os.getenv('FIGURE_CACHE_SIZE', '64')))
+
+def cached_figure(page, chart, snapshot_version, build, **widgets):
+    """Return the figure for this page state, calling build() only when it isn't cached."""
+    key = figure_key(page, chart, snapshot_version, **widgets)
+
+    def timed_build():
+        with span('figure', page=page, chart=chart):
+            return build()
+
+    return get_figure_cache().get_or_build(key, timed_build)
+
+@st.cache_resource(max_entries=2)
+def get_country_rollup(_data, snapshot_version):
+    """Build the country x day rollup once per data snapshot."""
+    with span('country_rollup'):
+        return CountryRollup(_data)
+
+@st.cache_resource(ttl=LIVE_REBUILD_SECONDS)
+def get_live_aggregates():
+    """Live mode: the dashboard rows and the load watermark they cover, read from the database together."""
+    from database import fetch_dashboard_snapshot
+
+    with span('live_snapshot'):
+        data, watermark = fetch_dashboard_snapshot()
+    return LiveAggregates(data, watermark, version=datetime.now().isoformat())
+
+def live_state():
+    """Live mode: the current aggregates, with the lines loaded since the last poll folded in."""
+    from database import fetch_dashboard_delta
+    return get_live_aggregates().refresh(fetch_dashboard_delta, LIVE_POLL_SECONDS)
+
+def country_rollup(data, snapshot_version):
+    """The country x day rollup for a snapshot; live mode keeps its own current."""
+    if LIVE_DASHBOARD:
+        state = get_live_aggregates().state()
+        if state.version == snapshot_version:
+            return state.countries
+    return get_country_rollup(data, snapshot_version)
+
+@st.cache_data(max_entries=2)
+def get_insights_summary(_data, snapshot_version):
+    """Aggregate every Insights statistic once per data snapshot."""
+    with span('insights_summary'):
+        return insights_summary(_data)
+
+@st.cache_data(max_entries=2)
+def get_dataset_profile(_data, snapshot_version):
+    """Profile the snapshot once for the Home page summary tabs."""
+    with span('dataset_profile'):
+        return profile_dataset(_data)
+
+def dataset_profile(data, snapshot_version):
+    """The Home page profile for a snapshot; live mode folds each batch into its own."""
+    if LIVE_DASHBOARD:
+        state = get_live_aggregates().state()
+        if state.version == snapshot_version:
+            return state.profile
+    return get_dataset_profile(data, snapshot_version)
+
+def artifact_version(*relative_paths):
+    """Version token for forecasting artifacts based on their modification times."""
+    base_path = os.path.dirname(os.path.abspath(__file__))
+    try:
+        return max(os.path.getmtime(os.path.join(base_path, path)) for path in relative_paths)
+    except OSError:
         return None
 
-@st.cache_data(ttl=600)  # Cache for 10 minutes
-def load_data(query):
-    engine = create_connection()
-    if engine:
-        try:
-            with engine.connect() as connection:
-                # Execute the main query
-                data = pd.read_sql_query(text(query), connection)
-                
-                # Create date column after loading the data
-                data['date'] = pd.to_datetime(
-                    dict(
-                        year=data['year'],
-                        month=data['month'],
-                        day=data['day']
-                    )
-                )
-                return data
-        except Exception as e:
-            st.error(f"Error reading from database: {e}")
-            return pd.DataFrame()
-        finally:
-            engine.dispose()
-    return pd.DataFrame()
-
-# Modified query with better performance
-query = """
-WITH base_data AS (
-    SELECT 
-        pd.description AS product_name,
-        pd.stockcode,
-        sls.quantity::integer as quantity,
-        sls.unitprice::float as unitprice,
-        sls.totalprice::float as totalprice,
-        c.country,
-        t.year,
-        t.month,
-        t.day,
-        sls.invoiceno,
-        sls.customerid
-    FROM 
-        sales sls 
-    JOIN 
-        product pd ON sls.stockcode = pd.stockcode 
-    JOIN 
-        customer c ON c.customerid = sls.customerid 
-    JOIN 
-        time t ON t.timeid = sls.timeid
-)
-SELECT 
-    product_name,
-    stockcode,
-    quantity,
-    unitprice,
-    totalprice,
-    country,
-    year,
-    month,
-    day,
-    COUNT(DISTINCT invoiceno)::integer as total_orders,
-    COUNT(DISTINCT customerid)::integer as unique_customers
-FROM 
-    base_data
-GROUP BY 
-    product_name, stockcode, quantity, unitprice, 
-    totalprice, country, year, month, day
-ORDER BY 
-    year, month, day;
-"""
-
-# Load data
-data = load_data(query)
+def get_data():
+    """Load the dashboard snapshot; only the pages that show it pay for the query."""
+    from database import dashboard_query
+    with span('get_data'):
+        if LIVE_DASHBOARD:
+            state = live_state()
+            return state.rows, state.version
+        data = load_data(dashboard_query())
+    return data, data.attrs.get('snapshot_version')
+
+def hit_rate(stats):
+    """Share of lookups served from a cache, as text."""
+    lookups = stats['hits'] + stats['misses']
+    return f"{stats['hits'] / lookups:.0%}" if lookups else "n/a"
+
+def render_performance_panel(trace):
+    """Show this rerun's timing spans and the shared caches' hit rates in the sidebar."""
+    spans = trace.to_frame()
+    with st.sidebar:
+        st.markdown("### ⏱️ Performance")
+        st.metric("Rerun time", f"{trace.elapsed_ms():,.0f} ms")
+
+        # Total time per stage; nested spans (e.g. query inside get_data) overlap
+        stages = spans.groupby('name')['duration_ms'].agg(['count', 'sum']).sort_values('sum', ascending=False)
+        st.dataframe(
+            stages.rename(columns={'count': 'Calls', 'sum': 'Total ms'}).round(1),
+            use_container_width=True
+        )
+        with st.expander("All spans"):
+            st.dataframe(spans.round({'start_ms': 1, 'duration_ms': 1}), use_container_width=True, hide_index=True)
+
+        figure_stats = get_figure_cache().stats()
+        st.caption(f"Figure cache: {hit_rate(figure_stats)} hits "
+                   f"({figure_stats['hits']:,} / {figure_stats['hits'] + figure_stats['misses']:,}), "
+                   f"{figure_stats['size']} figures")
+        from result_cache import RESULT_CACHE, get_result_cache
+        if RESULT_CACHE:
+            result_stats = get_result_cache().stats()
+            st.caption(f"Result cache: {hit_rate(result_stats)} hits "
+                       f"({result_stats['hits']:,} / {result_stats['hits'] + result_stats['misses']:,}), "
+                       f"{result_stats['entries']} entries, {result_stats['bytes'] / 1024 ** 2:,.0f} MB")
+
+        st.download_button(
+            "Download trace",
+            json.dumps({'traceEvents': trace.chrome_events()}),
+            file_name='dashboard-trace.json',
+            mime='application/json',
+            help="Chrome trace-event JSON; open in chrome://tracing or ui.perfetto.dev"
+        )
+
 
 # Sidebar Navigation
 with st.sidebar:
@@ -128,6 +189,10 @@ with st.sidebar:
                                   ],
                            menu_icon="cast", 
                            default_index=0)
+    show_performance = st.toggle("Performance", help="Show where this rerun's time went")
+
+# Time this rerun when the panel is open or traces are being exported
+trace = start_trace(selected) if show_performance or PERF_TRACE_FILE else None
 
 # Use the selected option to display the corresponding content
 if selected == "Home":
@@ -139,6 +204,8 @@ if selected == "Home":
     
     # Data Overview Section
     st.markdown("## Data Overview")
+    data, data_version = get_data()
+    profile = dataset_profile(data, data_version)
     
     # Create tabs for different views of the data
     tab1, tab2, tab3 = st.tabs(["📊 Data Sample", "📈 Summary Statistics", "ℹ️ Data Info"])
@@ -152,7 +219,7 @@ if selected == "Home":
         )
         
         # Display total number of records
-        st.info(f"Total number of records: {len(data):,}")
+        st.info(f"Total number of records: {profile['records']:,}")
         
     with tab2:
         # Display summary statistics
@@ -163,14 +230,14 @@ if selected == "Home":
         
         with col1:
             st.markdown("**Numeric Columns**")
-            numeric_summary = data.describe()[['quantity', 'unitprice', 'totalprice']].round(2)
+            numeric_summary = profile['numeric_summary'].round(2)
             st.dataframe(numeric_summary, use_container_width=True)
             
         with col2:
             st.markdown("**Categorical Columns**")
             categorical_summary = pd.DataFrame({
-                'Country': data['country'].value_counts().head(),
-                'Products': data['product_name'].value_counts().head()
+                'Country': profile['top_values']['country'],
+                'Products': profile['top_values']['product_name']
             })
             st.dataframe(categorical_summary, use_container_width=True)
     
@@ -182,16 +249,16 @@ if selected == "Home":
         info_col1, info_col2, info_col3 = st.columns(3)
         
         with info_col1:
-            st.metric("Total Countries", data['country'].nunique())
-            st.metric("Total Products", data['product_name'].nunique())
+            st.metric("Total Countries", profile['distinct']['country'])
+            st.metric("Total Products", profile['distinct']['product_name'])
             
         with info_col2:
-            st.metric("Date Range", f"{data['date'].min().strftime('%Y-%m-%d')} to {data['date'].max().strftime('%Y-%m-%d')}")
-            st.metric("Total Orders", data['total_orders'].sum())
+            st.metric("Date Range", f"{profile['date_min'].strftime('%Y-%m-%d')} to {profile['date_max'].strftime('%Y-%m-%d')}")
+            st.metric("Total Orders", profile['totals']['total_orders'])
             
         with info_col3:
-            st.metric("Total Revenue", f"${data['totalprice'].sum():,.2f}")
-            st.metric("Unique Customers", data['unique_customers'].sum())
+            st.metric("Total Revenue", f"${profile['totals']['totalprice']:,.2f}")
+            st.metric("Unique Customers", profile['totals']['unique_customers'])
     
     # Data Dictionary
     st.markdown("## Data Dictionary")
@@ -235,38 +302,58 @@ if selected == "Home":
 elif selected == "Overview":
     st.title("📈 Overview ")
     st.markdown("---")
+    import plotly.express as px # type: ignore
+    from page_queries import PAGE_QUERIES
+    if LIVE_DASHBOARD:
+        current_state = live_state()
+        data, data_version = current_state.rows, current_state.version
+    else:
+        data, data_version = get_data()
+    # KPIs, trend and top lists come precomputed from the live aggregates or page queries
+    use_metrics = PAGE_QUERIES or LIVE_DASHBOARD
 
     # Date Filter
     col_date1, col_date2 = st.columns(2)
     with col_date1:
-        start_date = pd.to_datetime(data['date']).min()
-        end_date = pd.to_datetime(data['date']).max()
+        start_date = data['date'].min()
+        end_date = data['date'].max()
         start_filter = st.date_input("Start Date", start_date, min_value=start_date, max_value=end_date)
     with col_date2:
         end_filter = st.date_input("End Date", end_date, min_value=start_date, max_value=end_date)
 
-    # Filter data
-    mask = (data['date'] >= pd.to_datetime(start_filter)) & (data['date'] <= pd.to_datetime(end_filter))
-    filtered_data = data[mask]
-
     # Calculate previous period metrics for comparison
     days_selected = (end_filter - start_filter).days
     previous_start = start_filter - pd.Timedelta(days=days_selected)
-    previous_mask = (data['date'] >= pd.to_datetime(previous_start)) & (data['date'] < pd.to_datetime(start_filter))
-    previous_data = data[previous_mask]
+
+    if LIVE_DASHBOARD:
+        # From the daily, product and country aggregates each loaded batch updates
+        metrics = live_overview_metrics(current_state, start_filter, end_filter, previous_start)
+        current, previous = metrics['kpis'], metrics['previous_kpis']
+    elif PAGE_QUERIES:
+        # KPIs, trend and top lists come from concurrent range queries
+        metrics = load_overview_metrics(start_filter, end_filter, previous_start)
+        current, previous = metrics['kpis'], metrics['previous_kpis']
+    else:
+        # Filter data
+        with span('Overview.filter'):
+            mask = (data['date'] >= pd.to_datetime(start_filter)) & (data['date'] <= pd.to_datetime(end_filter))
+            filtered_data = data[mask]
+            previous_mask = (data['date'] >= pd.to_datetime(previous_start)) & (data['date'] < pd.to_datetime(start_filter))
+            previous_data = data[previous_mask]
+        current, previous = filtered_data, previous_data
 
     # KPIs with Period Comparison
     col1, col2, col3, col4 = st.columns(4)
     
     # Calculate current and previous metrics
-    total_sales = filtered_data['totalprice'].sum()
-    prev_sales = previous_data['totalprice'].sum()
-    total_orders = filtered_data['total_orders'].sum()
-    prev_orders = previous_data['total_orders'].sum()
+    total_sales = current['totalprice'].sum()
+    prev_sales = previous['totalprice'].sum()
+    total_orders = current['total_orders'].sum()
+    prev_orders = previous['total_orders'].sum()
     avg_order_value = total_sales / total_orders if total_orders > 0 else 0
     prev_avg_order = prev_sales / prev_orders if prev_orders > 0 else 0
-    unique_customers = filtered_data['unique_customers'].sum()
-    prev_customers = previous_data['unique_customers'].sum()
+    unique_customers = current['unique_customers'].sum()
+    prev_customers = previous['unique_customers'].sum()
 
     # Display KPIs with deltas
     with col1:
@@ -291,22 +378,36 @@ elif selected == "Overview":
     
     with col_left:
         # Revenue Trend
-        sales_trend = filtered_data.groupby(pd.Grouper(key='date', freq='M'))['totalprice'].sum().reset_index()
-        trend_fig = px.line(sales_trend, 
-                          x='date', 
-                          y='totalprice',
-                          title='Monthly Revenue Trend',
-                          labels={'totalprice': 'Revenue', 'date': 'Month'})
+        def build_trend_fig():
+            if use_metrics:
+                sales_trend = metrics['trend']
+            else:
+                sales_trend = filtered_data.groupby(pd.Grouper(key='date', freq='M'))['totalprice'].sum().reset_index()
+            return px.line(sales_trend, 
+                           x='date', 
+                           y='totalprice',
+                           title='Monthly Revenue Trend',
+                           labels={'totalprice': 'Revenue', 'date': 'Month'})
+
+        trend_fig = cached_figure("Overview", "revenue_trend", data_version, build_trend_fig,
+                                  start=start_filter, end=end_filter)
         st.plotly_chart(trend_fig, use_container_width=True)
 
     with col_right:
         # Top 5 Products
-        top_products = filtered_data.groupby('product_name')['totalprice'].sum().nlargest(5).reset_index()
-        products_fig = px.bar(top_products,
-                            x='product_name',
-                            y='totalprice',
-                            title='Top 5 Products',
-                            labels={'totalprice': 'Revenue', 'product_name': 'Product'})
+        def build_products_fig():
+            if use_metrics:
+                top_products = metrics['top_products']
+            else:
+                top_products = filtered_data.groupby('product_name')['totalprice'].sum().nlargest(5).reset_index()
+            return px.bar(top_products,
+                          x='product_name',
+                          y='totalprice',
+                          title='Top 5 Products',
+                          labels={'totalprice': 'Revenue', 'product_name': 'Product'})
+
+        products_fig = cached_figure("Overview", "top_products", data_version, build_products_fig,
+                                     start=start_filter, end=end_filter)
         st.plotly_chart(products_fig, use_container_width=True)
 
     # Key Insights
@@ -315,13 +416,18 @@ elif selected == "Overview":
     
     with insight_col1:
         st.markdown("**Top Market**")
-        top_country = filtered_data.groupby('country')['totalprice'].sum().nlargest(1)
-        st.info(f"🏆 {top_country.index[0]}\n\n${top_country.values[0]:,.2f} in sales")
+        if use_metrics:
+            top_country = metrics['top_country']
+        else:
+            country_totals = country_rollup(data, data_version).totals(start_filter, end_filter)
+            top_country = country_totals.nlargest(1, 'totalprice').iloc[0]
+        st.info(f"🏆 {top_country['country']}\n\n${top_country['totalprice']:,.2f} in sales")
         
     with insight_col2:
         st.markdown("**Best Seller**")
-        top_product = top_products.iloc[0]
-        st.info(f"🌟 {top_product['product_name']}\n\n${top_product['totalprice']:,.2f} in revenue")
+        # The top products chart's first bar, so a cached chart needs no regrouping
+        top_product = products_fig.data[0]
+        st.info(f"🌟 {top_product.x[0]}\n\n${top_product.y[0]:,.2f} in revenue")
         
     with insight_col3:
         st.markdown("**Period Performance**")
@@ -331,6 +437,8 @@ elif selected == "Overview":
 elif selected == "Sales":
     st.title("📊 Sales Performance")
     st.markdown("---")
+    import plotly.express as px # type: ignore
+    data, data_version = get_data()
     
     # Create tabs for different analyses
     sales_tab1, sales_tab2, sales_tab3 = st.tabs(["📈 Time Analysis", "🌍 Geographic Analysis", "📦 Product Analysis"])
@@ -339,15 +447,16 @@ elif selected == "Sales":
         # Date Filter
         col_date1, col_date2 = st.columns(2)
         with col_date1:
-            start_date = pd.to_datetime(data['date']).min()
-            end_date = pd.to_datetime(data['date']).max()
+            start_date = data['date'].min()
+            end_date = data['date'].max()
             start_filter = st.date_input("Start Date", start_date, min_value=start_date, max_value=end_date)
         with col_date2:
             end_filter = st.date_input("End Date", end_date, min_value=start_date, max_value=end_date)
 
         # Filter data based on date range
-        mask = (data['date'] >= pd.to_datetime(start_filter)) & (data['date'] <= pd.to_datetime(end_filter))
-        filtered_data = data[mask]
+        with span('Sales.filter'):
+            mask = (data['date'] >= pd.to_datetime(start_filter)) & (data['date'] <= pd.to_datetime(end_filter))
+            filtered_data = data[mask]
         
         # Time Analysis Options
         col_options1, col_options2 = st.columns(2)
@@ -363,70 +472,77 @@ elif selected == "Sales":
             )
 
         # Revenue Trend
-        if time_period == "Daily":
-            sales_over_time = filtered_data.groupby('date')['totalprice'].sum().reset_index()
-            x_axis = 'date'
-        elif time_period == "Weekly":
-            sales_over_time = filtered_data.groupby(pd.Grouper(key='date', freq='W'))['totalprice'].sum().reset_index()
-            x_axis = 'date'
-        elif time_period == "Monthly":
-            sales_over_time = filtered_data.groupby(pd.Grouper(key='date', freq='M'))['totalprice'].sum().reset_index()
-            x_axis = 'date'
-        else:  # Yearly
-            sales_over_time = filtered_data.groupby('year')['totalprice'].sum().reset_index()
-            x_axis = 'year'
-
-        # Create chart based on selection
-        if chart_type == "Line":
-            trend_fig = px.line(sales_over_time, x=x_axis, y='totalprice',
+        def build_sales_trend_fig():
+            if time_period == "Daily":
+                sales_over_time = filtered_data.groupby('date')['totalprice'].sum().reset_index()
+                x_axis = 'date'
+            elif time_period == "Weekly":
+                sales_over_time = filtered_data.groupby(pd.Grouper(key='date', freq='W'))['totalprice'].sum().reset_index()
+                x_axis = 'date'
+            elif time_period == "Monthly":
+                sales_over_time = filtered_data.groupby(pd.Grouper(key='date', freq='M'))['totalprice'].sum().reset_index()
+                x_axis = 'date'
+            else:  # Yearly
+                sales_over_time = filtered_data.groupby('year')['totalprice'].sum().reset_index()
+                x_axis = 'year'
+
+            # Create chart based on selection
+            if chart_type == "Line":
+                return px.line(sales_over_time, x=x_axis, y='totalprice',
+                               title=f'Revenue Trends ({time_period})',
+                               labels={'totalprice': 'Revenue', 'date': 'Date'})
+            elif chart_type == "Bar":
+                return px.bar(sales_over_time, x=x_axis, y='totalprice',
                               title=f'Revenue Trends ({time_period})',
                               labels={'totalprice': 'Revenue', 'date': 'Date'})
-        elif chart_type == "Bar":
-            trend_fig = px.bar(sales_over_time, x=x_axis, y='totalprice',
-                             title=f'Revenue Trends ({time_period})',
-                             labels={'totalprice': 'Revenue', 'date': 'Date'})
-        else:  # Area
-            trend_fig = px.area(sales_over_time, x=x_axis, y='totalprice',
-                              title=f'Revenue Trends ({time_period})',
-                              labels={'totalprice': 'Revenue', 'date': 'Date'})
-        
+            else:  # Area
+                return px.area(sales_over_time, x=x_axis, y='totalprice',
+                               title=f'Revenue Trends ({time_period})',
+                               labels={'totalprice': 'Revenue', 'date': 'Date'})
+
+        trend_fig = cached_figure("Sales", "revenue_trend", data_version, build_sales_trend_fig,
+                                  start=start_filter, end=end_filter,
+                                  time_period=time_period, chart_type=chart_type)
         st.plotly_chart(trend_fig, use_container_width=True)
 
         # Monthly Distribution with Year-over-Year Comparison
-        monthly_dist = filtered_data.groupby(['year', 'month'])['totalprice'].sum().reset_index()
         month_names = {
             1: 'Jan', 2: 'Feb', 3: 'Mar', 4: 'Apr', 5: 'May', 6: 'Jun',
             7: 'Jul', 8: 'Aug', 9: 'Sep', 10: 'Oct', 11: 'Nov', 12: 'Dec'
         }
-        monthly_dist['month_name'] = monthly_dist['month'].map(month_names)
-        monthly_dist['year_month'] = monthly_dist['year'].astype(str) + '-' + monthly_dist['month_name']
-        
+
         # Option to compare years
         show_yoy = st.checkbox("Show Year-over-Year Comparison")
-        
-        if show_yoy:
-            month_sales_fig = px.line(
-                monthly_dist,
-                x='month_name',
-                y='totalprice',
-                color='year',
-                title='Monthly Sales Distribution (Year-over-Year)',
-                labels={'totalprice': 'Revenue', 'month_name': 'Month', 'year': 'Year'},
-                markers=True
-            )
-            # Customize layout for better readability
-            month_sales_fig.update_layout(
-                xaxis_title="Month",
-                yaxis_title="Revenue ($)",
-                legend_title="Year"
-            )
-        else:
+
+        def build_month_sales_fig():
+            if show_yoy:
+                monthly_dist = filtered_data.groupby(['year', 'month'])['totalprice'].sum().reset_index()
+                monthly_dist['month_name'] = monthly_dist['month'].map(month_names)
+                monthly_dist['year_month'] = monthly_dist['year'].astype(str) + '-' + monthly_dist['month_name']
+
+                month_sales_fig = px.line(
+                    monthly_dist,
+                    x='month_name',
+                    y='totalprice',
+                    color='year',
+                    title='Monthly Sales Distribution (Year-over-Year)',
+                    labels={'totalprice': 'Revenue', 'month_name': 'Month', 'year': 'Year'},
+                    markers=True
+                )
+                # Customize layout for better readability
+                month_sales_fig.update_layout(
+                    xaxis_title="Month",
+                    yaxis_title="Revenue ($)",
+                    legend_title="Year"
+                )
+                return month_sales_fig
+
             # Original monthly view (aggregated across years)
             monthly_agg = filtered_data.groupby('month')['totalprice'].sum().reset_index()
             monthly_agg['month_name'] = monthly_agg['month'].map(month_names)
             monthly_agg = monthly_agg.sort_values('month')
-            
-            month_sales_fig = px.line(
+
+            return px.line(
                 monthly_agg,
                 x='month_name',
                 y='totalprice',
@@ -434,41 +550,39 @@ elif selected == "Sales":
                 labels={'totalprice': 'Revenue', 'month_name': 'Month'},
                 markers=True
             )
-            
+
+        month_sales_fig = cached_figure("Sales", "monthly_distribution", data_version, build_month_sales_fig,
+                                        start=start_filter, end=end_filter, show_yoy=show_yoy)
         st.plotly_chart(month_sales_fig, use_container_width=True)
 
     with sales_tab2:
-        # Geographic Analysis
+        # Geographic Analysis served from the country x day rollup
+        country_metrics = country_rollup(data, data_version).totals(start_filter, end_filter)
         col_geo1, col_geo2 = st.columns(2)
         
         with col_geo1:
             # Sales by Country Map
-            sales_by_country = filtered_data.groupby('country')['totalprice'].sum().reset_index()
-            country_fig = px.choropleth(
-                sales_by_country,
-                locations='country',
-                locationmode='country names',
-                color='totalprice',
-                title='Sales Distribution by Country',
-                color_continuous_scale='Viridis'
-            )
+            def build_country_fig():
+                return px.choropleth(
+                    country_metrics,
+                    locations='country',
+                    locationmode='country names',
+                    color='totalprice',
+                    title='Sales Distribution by Country',
+                    color_continuous_scale='Viridis'
+                )
+
+            country_fig = cached_figure("Sales", "country_map", data_version, build_country_fig,
+                                        start=start_filter, end=end_filter)
             st.plotly_chart(country_fig, use_container_width=True)
-            
+
         with col_geo2:
             # Country Metrics
             metric_option = st.selectbox(
                 "Select Metric",
                 ["Total Revenue", "Average Order Value", "Total Orders", "Unique Customers"]
             )
-            
-            country_metrics = filtered_data.groupby('country').agg({
-                'totalprice': 'sum',
-                'total_orders': 'sum',
-                'unique_customers': 'sum'
-            }).reset_index()
-            
-            country_metrics['avg_order_value'] = country_metrics['totalprice'] / country_metrics['total_orders']
-            
+
             if metric_option == "Total Revenue":
                 y_col = 'totalprice'
                 title = 'Total Revenue by Country'
@@ -481,14 +595,18 @@ elif selected == "Sales":
             else:
                 y_col = 'unique_customers'
                 title = 'Unique Customers by Country'
-            
-            country_metric_fig = px.bar(
-                country_metrics.sort_values(y_col, ascending=True).tail(10),
-                x=y_col,
-                y='country',
-                orientation='h',
-                title=title
-            )
+
+            def build_country_metric_fig():
+                return px.bar(
+                    country_metrics.sort_values(y_col, ascending=True).tail(10),
+                    x=y_col,
+                    y='country',
+                    orientation='h',
+                    title=title
+                )
+
+            country_metric_fig = cached_figure("Sales", "country_metric", data_version, build_country_metric_fig,
+                                               start=start_filter, end=end_filter, metric=metric_option)
             st.plotly_chart(country_metric_fig, use_container_width=True)
 
     with sales_tab3:
@@ -513,25 +631,31 @@ elif selected == "Sales":
                 sort_col = 'total_orders'
                 title = f'Top {top_n} Products by Number of Orders'
             
-            top_products = filtered_data.groupby('product_name')[sort_col].sum().nlargest(top_n).reset_index()
-            
-            product_fig = px.bar(
-                top_products,
-                x='product_name',
-                y=sort_col,
-                title=title
-            )
-            product_fig.update_layout(xaxis_tickangle=-45)
+            def build_product_fig():
+                top_products = filtered_data.groupby('product_name')[sort_col].sum().nlargest(top_n).reset_index()
+
+                product_fig = px.bar(
+                    top_products,
+                    x='product_name',
+                    y=sort_col,
+                    title=title
+                )
+                product_fig.update_layout(xaxis_tickangle=-45)
+                return product_fig
+
+            product_fig = cached_figure("Sales", "top_products", data_version, build_product_fig,
+                                        start=start_filter, end=end_filter, top_n=top_n, sort_by=sort_by)
             st.plotly_chart(product_fig, use_container_width=True)
             
         with col_prod2:
             # Product Performance Metrics
             st.markdown("### Product Performance Metrics")
-            product_metrics = filtered_data.groupby('product_name').agg({
-                'totalprice': 'sum',
-                'quantity': 'sum',
-                'total_orders': 'sum'
-            }).reset_index()
+            with span('Sales.product_metrics'):
+                product_metrics = filtered_data.groupby('product_name').agg({
+                    'totalprice': 'sum',
+                    'quantity': 'sum',
+                    'total_orders': 'sum'
+                }).reset_index()
             
             product_metrics['avg_price_per_unit'] = product_metrics['totalprice'] / product_metrics['quantity']
             
@@ -584,12 +708,15 @@ elif selected == "Sales":
 elif selected == "Insights":
     st.title("📑 Insights")
     st.markdown("---")
+    import plotly.express as px # type: ignore
+    data, data_version = get_data()
     
     # Calculate key metrics for insights
-    total_revenue = data['totalprice'].sum()
-    total_orders = data['total_orders'].sum()
-    unique_customers = data['unique_customers'].sum()
-    avg_order_value = total_revenue / total_orders if total_orders > 0 else 0
+    summary = get_insights_summary(data, data_version)
+    total_revenue = summary['total_revenue']
+    total_orders = summary['total_orders']
+    unique_customers = summary['unique_customers']
+    avg_order_value = summary['avg_order_value']
 
     # High-level insights in cards
     st.markdown("### 🎯 Key Performance Indicators")
@@ -614,7 +741,7 @@ elif selected == "Insights":
     
     with insight_col1:
         # Top market analysis
-        top_country = data.groupby('country')['totalprice'].sum().nlargest(1)
+        top_country = summary['country_revenue'].head(1)
         st.markdown("**🌍 Top Market**")
         st.info(
             f"**{top_country.index[0]}**\n\n"
@@ -623,7 +750,7 @@ elif selected == "Insights":
     
     with insight_col2:
         # Best selling product
-        top_product = data.groupby('product_name')['totalprice'].sum().nlargest(1)
+        top_product = summary['top_product']
         st.markdown("**🏆 Best Selling Product**")
         st.info(
             f"**{top_product.index[0]}**\n\n"
@@ -632,7 +759,7 @@ elif selected == "Insights":
     
     with insight_col3:
         # Customer engagement
-        avg_customer_value = total_revenue / unique_customers if unique_customers > 0 else 0
+        avg_customer_value = summary['avg_customer_value']
         st.markdown("**👥 Customer Engagement**")
         st.info(
             f"**Average Customer Value**\n\n"
@@ -645,45 +772,50 @@ elif selected == "Insights":
     
     with trend_col1:
         # Monthly sales trend
-        monthly_sales = data.groupby(['year', 'month'])['totalprice'].sum().reset_index()
-        monthly_sales['date'] = pd.to_datetime(monthly_sales[['year', 'month']].assign(day=1))
-        
-        sales_trend_fig = px.line(
-            monthly_sales,
-            x='date',
-            y='totalprice',
-            title='Monthly Sales Trend'
-        )
-        sales_trend_fig.update_layout(
-            xaxis_title="Month",
-            yaxis_title="Sales ($)",
-            showlegend=False
-        )
+        def build_sales_trend_fig():
+            sales_trend_fig = px.line(
+                summary['monthly_sales'],
+                x='date',
+                y='totalprice',
+                title='Monthly Sales Trend'
+            )
+            sales_trend_fig.update_layout(
+                xaxis_title="Month",
+                yaxis_title="Sales ($)",
+                showlegend=False
+            )
+            return sales_trend_fig
+
+        sales_trend_fig = cached_figure("Insights", "monthly_trend", data_version, build_sales_trend_fig)
         st.plotly_chart(sales_trend_fig, use_container_width=True)
-    
+
     with trend_col2:
         # Top 5 countries
-        top_countries = data.groupby('country')['totalprice'].sum().nlargest(5).reset_index()
-        
-        country_fig = px.bar(
-            top_countries,
-            x='country',
-            y='totalprice',
-            title='Top 5 Countries by Revenue'
-        )
-        country_fig.update_layout(
-            xaxis_title="Country",
-            yaxis_title="Revenue ($)",
-            showlegend=False
-        )
+        def build_country_fig():
+            top_countries = summary['country_revenue'].head(5).rename_axis('country').reset_index(name='totalprice')
+
+            country_fig = px.bar(
+                top_countries,
+                x='country',
+                y='totalprice',
+                title='Top 5 Countries by Revenue'
+            )
+            country_fig.update_layout(
+                xaxis_title="Country",
+                yaxis_title="Revenue ($)",
+                showlegend=False
+            )
+            return country_fig
+
+        country_fig = cached_figure("Insights", "top_countries", data_version, build_country_fig)
         st.plotly_chart(country_fig, use_container_width=True)
     
     # Additional insights
     st.markdown("### 💡 Additional Insights")
     
     # Calculate and display product diversity
-    total_products = data['product_name'].nunique()
-    avg_products_per_order = data['quantity'].mean()
+    total_products = summary['total_products']
+    avg_products_per_order = summary['avg_items_per_order']
     
     add_col1, add_col2 = st.columns(2)
     
@@ -696,8 +828,8 @@ elif selected == "Insights":
     
     with add_col2:
         # Calculate customer geographic distribution
-        customer_countries = data['country'].nunique()
-        top_3_countries = data.groupby('country')['totalprice'].sum().nlargest(3)
+        customer_countries = len(summary['country_revenue'])
+        top_3_countries = summary['country_revenue'].head(3)
         
         st.info(
             f"**Geographic Reach**\n\n"
@@ -708,22 +840,28 @@ elif selected == "Insights":
 elif selected == "Product Forecasting":
     st.title("📊 Product Forecasting")
     st.markdown("---")
+    import plotly.express as px # type: ignore
 
     # Load JSON data
-    @st.cache_data
-    def load_forecast_data():
+    @st.cache_resource
+    def load_forecast_data(version):
+        from result_cache import cached_json_frame
+
         try:
             # Specify the absolute paths
             base_path = os.path.dirname(os.path.abspath(__file__))
             daily_path = os.path.join(base_path, 'forecasting', 'products', 'daily_predictions.json')
             weekly_path = os.path.join(base_path, 'forecasting', 'products', 'weekly_predictions.json')
-            
-            # Load the files
-            with open(daily_path, 'r') as daily_file:
-                daily_data = pd.DataFrame(json.load(daily_file))
-            
-            with open(weekly_path, 'r') as weekly_file:
-                weekly_data = pd.DataFrame(json.load(weekly_file))
+
+            def build_daily():
+                daily = cached_json_frame(daily_path)
+                # Convert date to datetime before the frame is shared
+                daily['date'] = pd.to_datetime(daily['date'])
+                return daily
+
+            # Load the files (parsed once per file version, mapped read-only by every process)
+            daily_data = shared_frame('product_daily', version, build_daily)
+            weekly_data = shared_frame('product_weekly', version, lambda: cached_json_frame(weekly_path))
                 
             return daily_data, weekly_data
             
@@ -732,7 +870,9 @@ elif selected == "Product Forecasting":
             return None, None
 
     # Load the data
-    daily_df, weekly_df = load_forecast_data()
+    forecast_version = artifact_version('forecasting/products/daily_predictions.json',
+                                        'forecasting/products/weekly_predictions.json')
+    daily_df, weekly_df = load_forecast_data(forecast_version)
 
     if daily_df is not None and weekly_df is not None:
         tab1, tab2, tab3 = st.tabs(["Daily Forecast", "Weekly Forecast", "Product Analysis"])
@@ -740,9 +880,6 @@ elif selected == "Product Forecasting":
         with tab1:
             st.subheader("📅 Daily Sales Forecast")
             
-            # Convert date to datetime
-            daily_df['date'] = pd.to_datetime(daily_df['date'])
-            
             # Date filter
             min_date = daily_df['date'].min()
             max_date = daily_df['date'].max()
@@ -770,16 +907,21 @@ elif selected == "Product Forecasting":
             
             # Top selling products
             st.markdown("### 🔝 Top Selling Products")
-            top_products = daily_filtered[daily_filtered['will_sell'] == 1].nlargest(10, 'predicted_quantity')
-            
-            fig = px.bar(
-                top_products,
-                x='description',
-                y='predicted_quantity',
-                title=f'Top 10 Products - {selected_date}',
-                labels={'description': 'Product', 'predicted_quantity': 'Predicted Sales'}
-            )
-            fig.update_layout(xaxis_tickangle=-45)
+            def build_daily_top_fig():
+                top_products = daily_filtered[daily_filtered['will_sell'] == 1].nlargest(10, 'predicted_quantity')
+
+                fig = px.bar(
+                    top_products,
+                    x='description',
+                    y='predicted_quantity',
+                    title=f'Top 10 Products - {selected_date}',
+                    labels={'description': 'Product', 'predicted_quantity': 'Predicted Sales'}
+                )
+                fig.update_layout(xaxis_tickangle=-45)
+                return fig
+
+            fig = cached_figure("Product Forecasting", "daily_top", forecast_version, build_daily_top_fig,
+                                date=selected_date)
             st.plotly_chart(fig, use_container_width=True)
             
             # Products table
@@ -814,29 +956,35 @@ elif selected == "Product Forecasting":
             
             # Weekly trend
             st.markdown("### 📈 Weekly Sales Trend")
-            weekly_trend = weekly_df.groupby('period')['predicted_quantity'].sum().reset_index()
-            
-            fig_weekly = px.line(
-                weekly_trend,
-                x='period',
-                y='predicted_quantity',
-                title='Weekly Sales Forecast Trend',
-                labels={'period': 'Week', 'predicted_quantity': 'Predicted Sales'}
+            fig_weekly = cached_figure(
+                "Product Forecasting", "weekly_trend", forecast_version,
+                lambda: px.line(
+                    weekly_df.groupby('period')['predicted_quantity'].sum().reset_index(),
+                    x='period',
+                    y='predicted_quantity',
+                    title='Weekly Sales Forecast Trend',
+                    labels={'period': 'Week', 'predicted_quantity': 'Predicted Sales'}
+                )
             )
             st.plotly_chart(fig_weekly, use_container_width=True)
             
             # Top products for selected week
             st.markdown("### 🏆 Top Products for Selected Week")
-            weekly_top = weekly_filtered[weekly_filtered['will_sell'] == 1].nlargest(10, 'predicted_quantity')
-            
-            fig_top = px.bar(
-                weekly_top,
-                x='description',
-                y='predicted_quantity',
-                title=f'Top 10 Products - Week {selected_period}',
-                labels={'description': 'Product', 'predicted_quantity': 'Predicted Sales'}
-            )
-            fig_top.update_layout(xaxis_tickangle=-45)
+            def build_weekly_top_fig():
+                weekly_top = weekly_filtered[weekly_filtered['will_sell'] == 1].nlargest(10, 'predicted_quantity')
+
+                fig_top = px.bar(
+                    weekly_top,
+                    x='description',
+                    y='predicted_quantity',
+                    title=f'Top 10 Products - Week {selected_period}',
+                    labels={'description': 'Product', 'predicted_quantity': 'Predicted Sales'}
+                )
+                fig_top.update_layout(xaxis_tickangle=-45)
+                return fig_top
+
+            fig_top = cached_figure("Product Forecasting", "weekly_top", forecast_version, build_weekly_top_fig,
+                                    period=selected_period)
             st.plotly_chart(fig_top, use_container_width=True)
         
         with tab3:
@@ -855,21 +1003,29 @@ elif selected == "Product Forecasting":
             
             with col1:
                 st.markdown("### 📊 Daily Forecast")
-                daily_trend = px.line(
-                    product_daily,
-                    x='date',
-                    y='predicted_quantity',
-                    title=f'Daily Sales Forecast - {selected_product}'
+                daily_trend = cached_figure(
+                    "Product Forecasting", "product_daily", forecast_version,
+                    lambda: px.line(
+                        product_daily,
+                        x='date',
+                        y='predicted_quantity',
+                        title=f'Daily Sales Forecast - {selected_product}'
+                    ),
+                    product=selected_product
                 )
                 st.plotly_chart(daily_trend, use_container_width=True)
             
             with col2:
                 st.markdown("### 📈 Weekly Forecast")
-                weekly_trend = px.line(
-                    product_weekly,
-                    x='period',
-                    y='predicted_quantity',
-                    title=f'Weekly Sales Forecast - {selected_product}'
+                weekly_trend = cached_figure(
+                    "Product Forecasting", "product_weekly", forecast_version,
+                    lambda: px.line(
+                        product_weekly,
+                        x='period',
+                        y='predicted_quantity',
+                        title=f'Weekly Sales Forecast - {selected_product}'
+                    ),
+                    product=selected_product
                 )
                 st.plotly_chart(weekly_trend, use_container_width=True)
             
@@ -890,10 +1046,11 @@ elif selected == "Product Forecasting":
 elif selected == "Sales Forecasting":
     st.title("📊 Sales Forecasting")
     st.markdown("---")
+    import plotly.express as px # type: ignore
     
     # Load forecast data
     @st.cache_data
-    def load_sales_forecasts():
+    def load_sales_forecasts(version):
         try:
             base_path = os.path.dirname(os.path.abspath(__file__))
             
@@ -910,7 +1067,10 @@ elif selected == "Sales Forecasting":
             st.error(f"Error loading forecast data: {str(e)}")
             return None, None
 
-    forecast_7d, forecast_30d = load_sales_forecasts()
+    # Keyed on the files' version, so forecasts rewritten by sales_forecast.py are picked up
+    forecast_version = artifact_version('forecasting/sales/forecast_7days.json',
+                                        'forecasting/sales/forecast_30days.json')
+    forecast_7d, forecast_30d = load_sales_forecasts(forecast_version)
 
     if forecast_7d and forecast_30d:
         # Create tabs for different forecast views
@@ -948,26 +1108,29 @@ elif selected == "Sales Forecasting":
             df_7d['date'] = pd.to_datetime(df_7d['date'])
             
             # Daily predictions chart
-            fig_7d = px.line(df_7d, 
-                           x='date', 
-                           y='predicted_sales',
-                           title='7-Day Sales Forecast',
-                           labels={'predicted_sales': 'Predicted Sales ($)', 
-                                 'date': 'Date'})
-            
-            # Add weekend highlighting
-            for idx, row in df_7d.iterrows():
-                if row['is_weekend']:
-                    fig_7d.add_vrect(
-                        x0=row['date'],
-                        x1=pd.to_datetime(row['date']) + pd.Timedelta(days=1),
-                        fillcolor="rgba(128, 128, 128, 0.1)",
-                        layer="below",
-                        line_width=0,
-                        annotation_text="Weekend",
-                        annotation_position="top left"
-                    )
-            
+            def build_7d_fig():
+                fig_7d = px.line(df_7d, 
+                                 x='date', 
+                                 y='predicted_sales',
+                                 title='7-Day Sales Forecast',
+                                 labels={'predicted_sales': 'Predicted Sales ($)', 
+                                         'date': 'Date'})
+
+                # Add weekend highlighting
+                for idx, row in df_7d.iterrows():
+                    if row['is_weekend']:
+                        fig_7d.add_vrect(
+                            x0=row['date'],
+                            x1=pd.to_datetime(row['date']) + pd.Timedelta(days=1),
+                            fillcolor="rgba(128, 128, 128, 0.1)",
+                            layer="below",
+                            line_width=0,
+                            annotation_text="Weekend",
+                            annotation_position="top left"
+                        )
+                return fig_7d
+
+            fig_7d = cached_figure("Sales Forecasting", "forecast_7d", forecast_version, build_7d_fig)
             st.plotly_chart(fig_7d, use_container_width=True)
             
             # Daily breakdown
@@ -994,35 +1157,41 @@ elif selected == "Sales Forecasting":
             view_option = st.radio("View", ["Daily", "Weekly"], horizontal=True)
             
             if view_option == "Daily":
-                fig_30d = px.line(df_30d, 
-                                x='date', 
-                                y='predicted_sales',
-                                title='30-Day Sales Forecast',
-                                labels={'predicted_sales': 'Predicted Sales ($)', 
-                                      'date': 'Date'})
-                
-                # Add weekend highlighting
-                for idx, row in df_30d.iterrows():
-                    if row['is_weekend']:
-                        fig_30d.add_vrect(
-                            x0=row['date'],
-                            x1=pd.to_datetime(row['date']) + pd.Timedelta(days=1),
-                            fillcolor="rgba(128, 128, 128, 0.1)",
-                            layer="below",
-                            line_width=0
-                        )
+                def build_30d_fig():
+                    fig_30d = px.line(df_30d, 
+                                      x='date', 
+                                      y='predicted_sales',
+                                      title='30-Day Sales Forecast',
+                                      labels={'predicted_sales': 'Predicted Sales ($)', 
+                                              'date': 'Date'})
+
+                    # Add weekend highlighting
+                    for idx, row in df_30d.iterrows():
+                        if row['is_weekend']:
+                            fig_30d.add_vrect(
+                                x0=row['date'],
+                                x1=pd.to_datetime(row['date']) + pd.Timedelta(days=1),
+                                fillcolor="rgba(128, 128, 128, 0.1)",
+                                layer="below",
+                                line_width=0
+                            )
+                    return fig_30d
             else:
                 # Weekly aggregation
                 df_30d['week'] = df_30d['date'].dt.strftime('%Y-%W')
-                weekly_data = df_30d.groupby('week')['predicted_sales'].agg(['sum', 'mean']).reset_index()
-                
-                fig_30d = px.bar(weekly_data,
-                                x='week',
-                                y='sum',
-                                title='Weekly Sales Forecast',
-                                labels={'sum': 'Total Weekly Sales ($)',
-                                       'week': 'Week'})
-            
+
+                def build_30d_fig():
+                    weekly_data = df_30d.groupby('week')['predicted_sales'].agg(['sum', 'mean']).reset_index()
+
+                    return px.bar(weekly_data,
+                                  x='week',
+                                  y='sum',
+                                  title='Weekly Sales Forecast',
+                                  labels={'sum': 'Total Weekly Sales ($)',
+                                          'week': 'Week'})
+
+            fig_30d = cached_figure("Sales Forecasting", "forecast_30d", forecast_version, build_30d_fig,
+                                    view=view_option)
             st.plotly_chart(fig_30d, use_container_width=True)
             
             # Summary statistics
@@ -1060,19 +1229,27 @@ elif selected == "Sales Forecasting":
 elif selected == "Customer Segmentation":
     st.title("👥 Customer Segmentation Analysis")
     st.markdown("---")
+    import plotly.express as px # type: ignore
+    from charts import customer_scatter, binned_histogram
+
+    @st.cache_resource
+    def load_customer_data(version):
+        from result_cache import cached_json_frame
+        from segmentation import segment_summaries
 
-    @st.cache_data
-    def load_customer_data():
         try:
             base_path = os.path.dirname(os.path.abspath(__file__))
-            with open(os.path.join(base_path, 'forecasting/customer/scatter_plot_data.json'), 'r') as f:
-                customer_data = json.load(f)
-            return pd.DataFrame(customer_data['data'])
+            scatter_path = os.path.join(base_path, 'forecasting/customer/scatter_plot_data.json')
+            customer_df = shared_frame('customers', version, lambda: cached_json_frame(scatter_path, 'data'))
+
+            # Bin the per-segment distributions once per artifact version
+            return customer_df, segment_summaries(customer_df)
         except Exception as e:
             st.error(f"Error loading customer data: {str(e)}")
-            return None
+            return None, None
 
-    customer_df = load_customer_data()
+    customer_version = artifact_version('forecasting/customer/scatter_plot_data.json')
+    customer_df, segment_summary = load_customer_data(customer_version)
 
     if customer_df is not None:
         # Create tabs for different views
@@ -1096,31 +1273,27 @@ elif selected == "Customer Segmentation":
                 st.metric("Average Order Frequency", f"{avg_frequency:.1f}")
 
             # Segment distribution
-            segment_dist = customer_df['Cluster Label'].value_counts()
-            fig_dist = px.pie(
-                values=segment_dist.values,
-                names=segment_dist.index,
-                title='Customer Segment Distribution',
-                color_discrete_sequence=px.colors.qualitative.Set3
-            )
+            def build_dist_fig():
+                segment_dist = customer_df['Cluster Label'].value_counts()
+                return px.pie(
+                    values=segment_dist.values,
+                    names=segment_dist.index,
+                    title='Customer Segment Distribution',
+                    color_discrete_sequence=px.colors.qualitative.Set3
+                )
+
+            fig_dist = cached_figure("Customer Segmentation", "segment_distribution", customer_version, build_dist_fig)
             st.plotly_chart(fig_dist, use_container_width=True)
 
         with tab2:
             st.subheader("🔍 Customer Behavior Analysis")
 
-            # Scatter plot
-            fig_scatter = px.scatter(
-                customer_df,
-                x='total_sales',
-                y='order_frequency',
-                color='Cluster Label',
-                title='Customer Segments by Sales and Order Frequency',
-                labels={
-                    'total_sales': 'Total Sales ($)',
-                    'order_frequency': 'Order Frequency',
-                    'Cluster Label': 'Customer Segment'
-                },
-                color_discrete_sequence=px.colors.qualitative.Set3
+            # Scatter plot (WebGL or density view for large customer bases)
+            scatter_mode = st.radio("Display", ["Auto", "Points", "Density"], horizontal=True)
+            fig_scatter = cached_figure(
+                "Customer Segmentation", "segment_scatter", customer_version,
+                lambda: customer_scatter(customer_df, scatter_mode),
+                mode=scatter_mode
             )
             st.plotly_chart(fig_scatter, use_container_width=True)
 
@@ -1137,25 +1310,31 @@ elif selected == "Customer Segmentation":
 
             with col1:
                 # Average sales by segment
-                fig_avg_sales = px.bar(
-                    segment_metrics,
-                    x='Cluster Label',
-                    y='Avg Sales',
-                    title='Average Sales by Segment',
-                    color='Cluster Label',
-                    color_discrete_sequence=px.colors.qualitative.Set3
+                fig_avg_sales = cached_figure(
+                    "Customer Segmentation", "avg_sales", customer_version,
+                    lambda: px.bar(
+                        segment_metrics,
+                        x='Cluster Label',
+                        y='Avg Sales',
+                        title='Average Sales by Segment',
+                        color='Cluster Label',
+                        color_discrete_sequence=px.colors.qualitative.Set3
+                    )
                 )
                 st.plotly_chart(fig_avg_sales, use_container_width=True)
 
             with col2:
                 # Average frequency by segment
-                fig_avg_freq = px.bar(
-                    segment_metrics,
-                    x='Cluster Label',
-                    y='Avg Frequency',
-                    title='Average Order Frequency by Segment',
-                    color='Cluster Label',
-                    color_discrete_sequence=px.colors.qualitative.Set3
+                fig_avg_freq = cached_figure(
+                    "Customer Segmentation", "avg_frequency", customer_version,
+                    lambda: px.bar(
+                        segment_metrics,
+                        x='Cluster Label',
+                        y='Avg Frequency',
+                        title='Average Order Frequency by Segment',
+                        color='Cluster Label',
+                        color_discrete_sequence=px.colors.qualitative.Set3
+                    )
                 )
                 st.plotly_chart(fig_avg_freq, use_container_width=True)
 
@@ -1165,11 +1344,11 @@ elif selected == "Customer Segmentation":
             # Segment selector
             selected_segment = st.selectbox(
                 "Select Customer Segment",
-                sorted(customer_df['Cluster Label'].unique())
+                sorted(segment_summary)
             )
 
-            # Filter data for selected segment
-            segment_data = customer_df[customer_df['Cluster Label'] == selected_segment]
+            # Precomputed summary for selected segment
+            segment_info = segment_summary[selected_segment]
 
             # Segment metrics
             col1, col2, col3 = st.columns(3)
@@ -1177,17 +1356,17 @@ elif selected == "Customer Segmentation":
             with col1:
                 st.metric(
                     "Customers in Segment", 
-                    f"{len(segment_data):,}"
+                    f"{segment_info['count']:,}"
                 )
             with col2:
                 st.metric(
                     "Average Sales", 
-                    f"${segment_data['total_sales'].mean():,.2f}"
+                    f"${segment_info['avg_sales']:,.2f}"
                 )
             with col3:
                 st.metric(
                     "Average Order Frequency",
-                    f"{segment_data['order_frequency'].mean():.1f}"
+                    f"{segment_info['avg_frequency']:.1f}"
                 )
 
             # Distribution plots
@@ -1195,29 +1374,34 @@ elif selected == "Customer Segmentation":
 
             with col1:
                 # Sales distribution
-                fig_sales_dist = px.histogram(
-                    segment_data,
-                    x='total_sales',
-                    title=f'Sales Distribution - {selected_segment}',
-                    labels={'total_sales': 'Total Sales ($)'}
+                fig_sales_dist = cached_figure(
+                    "Customer Segmentation", "sales_distribution", customer_version,
+                    lambda: binned_histogram(
+                        *segment_info['histograms']['total_sales'],
+                        title=f'Sales Distribution - {selected_segment}',
+                        x_label='Total Sales ($)'
+                    ),
+                    segment=selected_segment
                 )
                 st.plotly_chart(fig_sales_dist, use_container_width=True)
 
             with col2:
                 # Frequency distribution
-                fig_freq_dist = px.histogram(
-                    segment_data,
-                    x='order_frequency',
-                    title=f'Order Frequency Distribution - {selected_segment}',
-                    labels={'order_frequency': 'Order Frequency'}
+                fig_freq_dist = cached_figure(
+                    "Customer Segmentation", "frequency_distribution", customer_version,
+                    lambda: binned_histogram(
+                        *segment_info['histograms']['order_frequency'],
+                        title=f'Order Frequency Distribution - {selected_segment}',
+                        x_label='Order Frequency'
+                    ),
+                    segment=selected_segment
                 )
                 st.plotly_chart(fig_freq_dist, use_container_width=True)
 
             # Customer table
             st.markdown("### Customer Details")
             st.dataframe(
-                segment_data.sort_values('total_sales', ascending=False)
-                .head(10)
+                segment_info['top_customers']
                 .style.format({
                     'total_sales': '${:,.2f}',
                     'order_frequency': '{:,.0f}'
@@ -1225,4 +1409,12 @@ elif selected == "Customer Segmentation":
                 use_container_width=True
             )
     else:
-        st.error("Unable to load customer segmentation data. Please check the file paths and data format.")
\ No newline at end of file
+        st.error("Unable to load customer segmentation data. Please check the file paths and data format.")
+
+# Performance panel and trace export for this rerun
+if trace is not None:
+    end_trace()
+    if PERF_TRACE_FILE:
+        export_chrome_trace(trace)
+    if show_performance:
+        render_performance_panel(trace)
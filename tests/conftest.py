@@ -0,0 +1,87 @@
+import os
+import sys
+import uuid
+import pytest
+from dotenv import load_dotenv # type: ignore
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+sys.path.insert(0, os.path.join(REPO_DIR, 'benchmarks'))
+
+# The layout the OnlineRetail dump restores: unpartitioned sales without load keys, which
+# migrate_schema.py then upgrades
+ORIGINAL_SCHEMA = """
+CREATE TABLE customer (customerid integer PRIMARY KEY, country varchar(100));
+CREATE TABLE product (stockcode varchar(20) PRIMARY KEY, description varchar(255));
+CREATE TABLE time (timeid serial PRIMARY KEY, day integer, month integer, year integer, hour integer, minute integer);
+CREATE TABLE sales (
+    invoiceno varchar(20),
+    customerid integer REFERENCES customer,
+    stockcode varchar(20) REFERENCES product,
+    timeid integer REFERENCES time,
+    quantity integer,
+    unitprice numeric(10, 2),
+    totalprice numeric(12, 2)
+);
+"""
+# Raw lines generated for the loaded test dataset; small enough to load in a few seconds
+DATASET_ROWS = 20000
+
+
+def admin_connection():
+    """Autocommit connection to the DB_* database, or skip the test when Postgres isn't reachable."""
+    psycopg2 = pytest.importorskip('psycopg2')
+    import seed_data
+
+    load_dotenv()
+    if not os.getenv('DB_HOST'):
+        pytest.skip("DB_HOST is not set; no Postgres to test against")
+    try:
+        conn = seed_data.connect_db()
+    except psycopg2.OperationalError as e:
+        pytest.skip(f"Postgres is not reachable: {e}")
+    conn.autocommit = True
+    return conn
+
+
+@pytest.fixture
+def scratch_database(monkeypatch):
+    """Name of a new, empty database that DB_NAME points at for the test; dropped afterwards."""
+    admin = admin_connection()
+    name = f"retail_test_{uuid.uuid4().hex[:8]}"
+    with admin.cursor() as cursor:
+        cursor.execute(f'CREATE DATABASE "{name}"')
+    monkeypatch.setenv('DB_NAME', name)
+    try:
+        yield name
+    finally:
+        with admin.cursor() as cursor:
+            cursor.execute(f'DROP DATABASE IF EXISTS "{name}" WITH (FORCE)')
+        admin.close()
+
+
+@pytest.fixture
+def retail_database(scratch_database):
+    """A scratch database holding a small synthetic dataset, migrated and loaded the way production is."""
+    import process
+    import seed_data
+    import load_data
+    import migrate_schema
+    from synthetic_data import generate_chunks
+
+    conn = seed_data.connect_db()
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute(ORIGINAL_SCHEMA)
+        conn.commit()
+        migrate_schema.migrate(conn)
+        migrate_schema.add_load_keys(conn)
+        cleaned = process.process(next(generate_chunks(DATASET_ROWS)))
+        load_data.load_all(conn, cleaned)
+        with conn.cursor() as cursor:
+            migrate_schema.create_indexes(cursor)
+            cursor.execute("ANALYZE")
+        conn.commit()
+    finally:
+        conn.close()
+    return scratch_database
@@ -0,0 +1,34 @@
+from datetime import date
+
+import seed_data
+import migrate_schema
+from page_queries import KPI_QUERY
+
+
+def test_date_range_queries_scan_only_matching_partitions(retail_database):
+    conn = seed_data.connect_db()
+    try:
+        with conn.cursor() as cursor:
+            assert migrate_schema.is_partitioned(cursor)
+            for query in (migrate_schema.PRUNING_QUERY, KPI_QUERY):
+                expected, scanned = migrate_schema.check_pruning(cursor, date(2011, 3, 10), date(2011, 4, 20), query)
+                assert expected == ['sales_y2011m03', 'sales_y2011m04']
+                assert scanned == expected
+
+                expected, scanned = migrate_schema.check_pruning(cursor, date(2011, 6, 1), date(2011, 6, 30), query)
+                assert scanned == expected == ['sales_y2011m06']
+    finally:
+        conn.close()
+
+
+def test_migrate_keeps_keys_and_sequences(retail_database):
+    conn = seed_data.connect_db()
+    try:
+        with conn.cursor() as cursor:
+            assert migrate_schema.has_constraint(cursor, 'sales', 'sales_line_key')
+            assert migrate_schema.has_constraint(cursor, 'time', 'time_minute_key')
+            assert [column for column, _ in migrate_schema.owned_sequences(cursor, 'sales')] == ['saleid']
+            cursor.execute("SELECT to_regclass(%s)", (migrate_schema.OLD_SALES,))
+            assert cursor.fetchone()[0] is None
+    finally:
+        conn.close()
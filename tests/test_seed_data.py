@@ -0,0 +1,52 @@
+import json
+import shutil
+import pytest
+
+import seed_data
+
+pytestmark = pytest.mark.skipif(not shutil.which('pg_dump') or not shutil.which('pg_restore'),
+                                reason="pg_dump and pg_restore are not on PATH")
+
+
+def test_dump_then_verify_round_trip(retail_database, tmp_path):
+    dump_path = str(tmp_path / 'retail')
+    assert seed_data.dump_database(dump_path, jobs=2)
+
+    with open(seed_data.manifest_path(dump_path)) as f:
+        tables = json.load(f)['tables']
+    assert set(tables) == set(seed_data.TABLES)
+    assert tables['sales']['rows'] > 0
+    assert tables['sales']['rows'] == sum(part['rows'] for part in tables['sales']['partitions'].values())
+
+    assert seed_data.verify_restore(dump_path, thorough=True, workers=2)
+    assert seed_data.verify_restore(dump_path)
+
+
+def test_phased_parallel_restore_into_an_existing_database(retail_database, tmp_path):
+    dump_path = str(tmp_path / 'retail')
+    assert seed_data.dump_database(dump_path, jobs=2)
+
+    # Diverge from the dump, so the restore has existing objects and rows to replace
+    conn = seed_data.connect_db()
+    try:
+        with conn.cursor() as cur:
+            cur.execute("DELETE FROM sales WHERE saledate < '2011-06-01'")
+            cur.execute("INSERT INTO customer VALUES (99999, 'Nowhere')")
+        conn.commit()
+    finally:
+        conn.close()
+    assert not seed_data.verify_restore(dump_path, thorough=True, workers=2)
+
+    assert seed_data.restore_database(dump_path, jobs=2, phased=True)
+
+    with open(seed_data.manifest_path(dump_path)) as f:
+        expected = json.load(f)['tables']
+    conn = seed_data.connect_db()
+    try:
+        with conn.cursor() as cur:
+            tables = seed_data.checksum_tables(seed_data.table_relations(cur), workers=2)
+    finally:
+        conn.close()
+    assert {table: entry['rows'] for table, entry in tables.items()} == \
+        {table: entry['rows'] for table, entry in expected.items()}
+    assert seed_data.compare_counts(expected, tables) == []
@@ -0,0 +1,90 @@
+import numpy as np
+import pandas as pd
+
+import segmentation
+
+
+def blobs(rng, per_cluster=200):
+    """Customers in three well-separated groups of total_sales and order_frequency."""
+    centres = [(1000.0, 10.0), (5000.0, 50.0), (9000.0, 90.0)]
+    frames = [
+        pd.DataFrame({
+            'total_sales': rng.normal(sales, sales * 0.05, per_cluster).round(2),
+            'order_frequency': rng.normal(orders, orders * 0.05, per_cluster)
+        })
+        for sales, orders in centres
+    ]
+    customers = pd.concat(frames, ignore_index=True)
+    customers.insert(0, 'customerid', np.arange(len(customers)) + 12346)
+    return customers
+
+
+def test_partial_fit_moves_centroids_to_the_running_mean():
+    centroids = np.array([[0.0, 0.0], [10.0, 10.0]])
+    counts = np.zeros(2)
+    first = np.array([[1.0, 1.0], [3.0, 1.0]])
+    second = np.array([[2.0, 4.0], [9.0, 9.0]])
+
+    centroids, counts = segmentation.partial_fit(centroids, counts, first)
+    centroids, counts = segmentation.partial_fit(centroids, counts, second)
+
+    np.testing.assert_allclose(counts, [3, 1])
+    np.testing.assert_allclose(centroids[0], np.vstack([first, second[:1]]).mean(axis=0))
+    np.testing.assert_allclose(centroids[1], [9.0, 9.0])
+
+
+def test_bootstrap_centroids_are_the_means_of_the_assigned_customers():
+    customers = blobs(np.random.default_rng(1))
+    state, assignments = segmentation.bootstrap(customers, k=3)
+
+    points = segmentation.scale(customers[segmentation.FEATURES].to_numpy(dtype=float), state)
+    centroids = np.asarray(state['centroids'])
+    assert sum(state['counts']) == len(customers)
+    np.testing.assert_allclose(state['counts'], np.bincount(assignments, minlength=3))
+    for cluster in range(3):
+        np.testing.assert_allclose(centroids[cluster], points[assignments == cluster].mean(axis=0))
+
+    # Each generated group lands in a cluster of its own
+    groups = assignments.reshape(3, -1)
+    assert all(len(set(group)) == 1 for group in groups)
+    assert len({group[0] for group in groups}) == 3
+    labels = segmentation.segment_labels(centroids)
+    assert [labels[group[0]] for group in groups] == segmentation.SEGMENT_LABELS
+
+
+def test_merge_deltas_adds_totals_and_appends_new_customers():
+    customers = pd.DataFrame({'customerid': [1, 2], 'total_sales': [10.0, 20.0], 'order_frequency': [1, 2]})
+    deltas = pd.DataFrame({
+        'customerid': [2, 3], 'total_sales': [5.005, 7.0], 'order_frequency': [3, 1], 'last_saleid': [8, 9]
+    })
+
+    merged = segmentation.merge_deltas(customers, deltas)
+
+    assert merged['customerid'].tolist() == [1, 2, 3]
+    assert merged['total_sales'].tolist() == [10.0, 25.0, 7.0]
+    assert merged['order_frequency'].tolist() == [1, 5, 1]
+
+
+def test_move_points_counts_a_repeat_buyer_once():
+    customers = blobs(np.random.default_rng(2))
+    state, assignments = segmentation.bootstrap(customers, k=3)
+    centroids, counts = np.asarray(state['centroids']), np.asarray(state['counts'])
+
+    # The same customer buys again on every refresh
+    for _ in range(5):
+        before = customers.iloc[[0]]
+        deltas = before.assign(total_sales=50.0, order_frequency=2)
+        customers = segmentation.merge_deltas(customers, deltas)
+        after = customers.iloc[[0]]
+        centroids, counts, moved = segmentation.move_points(
+            centroids, counts,
+            segmentation.scale(before[segmentation.FEATURES].to_numpy(dtype=float), state),
+            assignments[:1],
+            segmentation.scale(after[segmentation.FEATURES].to_numpy(dtype=float), state)
+        )
+        assignments[:1] = moved
+
+    assert counts.sum() == len(customers)
+    points = segmentation.scale(customers[segmentation.FEATURES].to_numpy(dtype=float), state)
+    for cluster in range(3):
+        np.testing.assert_allclose(centroids[cluster], points[assignments == cluster].mean(axis=0))